@@ -1,48 +1,32 @@
+import sys
+from pathlib import Path
 import pandas as pd
 import seaborn as sns
 import matplotlib.pyplot as plt
 import plotly.express as px
 
-data_path = r'C:\Users\lucia.otiepkova\robotdreams\rd-python-industrial-automation\datasets\steel_copper_welding\V1.csv'
-df = pd.read_csv(data_path)
-rename_columns = {
-    'power (W)': 'Power',
-    'welding speed (m/min)': 'WeldingSpeed',
-    'gas flow rate (l/min)': 'GasFlowRate',
-    'focal position (mm)': 'FocalPosition',
-    'angular position (°)': 'AngularPosition',
-    'material thickness (mm)': 'MaterialThickness',
-    'weld number': 'WeldNumber',
-    'cross section positon in the weld (mm)': 'CrossSectionPosition',
-    'cracking in the weld metal': 'Cracking',
-    'weld seam width steel (µm)': 'WeldWidthSteel',
-    'weld seam width copper (µm)': 'WeldWidthCopper',
-    'weld depth copper (µm)': 'WeldDepthCopper',
-    'gap': 'Gap'
-}
+# Shared schema registry lives with the ETL container, the effect analysis with the modules both containers use
+sys.path.append(str(Path(__file__).resolve().parents[2] / 'Homework_3' / 'python_container'))
+sys.path.append(str(Path(__file__).resolve().parents[2] / 'Homework_3' / 'shared'))
+import welding_schema
+import welding_loader
+import welding_plots
+import welding_effects
 
-df.rename(columns=rename_columns, inplace=True)
+data_path = Path(__file__).resolve().parents[1] / 'datasets' / 'steel_copper_welding' / 'V1.csv'
+# Canonical names and compact dtypes, from the columnar cache after the first run
+df = welding_loader.load(data_path)
 
-factors = ['Power', 'WeldingSpeed', 'AngularPosition', 'FocalPosition', 'GasFlowRate', 'MaterialThickness']
+factors = welding_schema.FACTORS
 
-# scatter plot 
-fig = px.scatter(
-    df,
-    x='WeldNumber',
-    y='WeldDepthCopper',
-    color='Cracking',
-    facet_col='CrossSectionPosition',
-    title='Weld Depth Over Weld Numbers (Faceted by Cross-Section Position)'
-)
+# Effect strengths, linear model of the weld depth and logistic model of cracking (bootstrapped)
+effects = welding_effects.analyze(df, factors)
+for name, table in effects.items():
+    print(f"\n{name.replace('_', ' ').title()}:")
+    print(table.round(3).to_string())
 
-fig.update_layout(
-    xaxis_title='Weld Number',
-    yaxis_title='Weld Depth (Copper)',
-    legend_title='Cracking',
-    margin=dict(t=50, l=50, r=50, b=50)
-)
-
-fig.for_each_annotation(lambda a: a.update(text=a.text.split("=")[-1]))  # Simplify facet labels
+# scatter plot (WebGL or server-side binned automatically for large datasets)
+fig = welding_plots.weld_scatter(df)
 fig.show()
 
 
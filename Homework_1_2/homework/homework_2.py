@@ -1,8 +1,18 @@
 import requests
+from requests.adapters import HTTPAdapter
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import matplotlib
 import matplotlib.pyplot as plt
 import json
 import os
+import time
+import random
+import hashlib
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 
 ''' From NREL's official documentation I used these data https://developer.nrel.gov/docs/solar/pvwatts/v8/
 and used  DEMO_KEY
@@ -10,10 +20,241 @@ and used  DEMO_KEY
 I decided to fetch column ac_monthly (the usable electricity that comes out of your solar system) and 
 capacity factor (how much energy you ACTUALLY get vs. how much you could get if the system ran at full power 24/7 all year)   
 '''
+class TokenBucket:
+    '''Thread-safe token bucket: at most `capacity` requests at once, refilled at `rate` per second.'''
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class NRELFetcher:
+    '''
+    Shared request engine for PVWatts calls: pooled session, token-bucket rate
+    limit, retries with jittered exponential backoff and an on-disk response
+    cache keyed by the canonicalized request parameters (without the API key).
+    '''
+
+    # Hourly quotas: DEMO_KEY allows 30 requests per hour, a signed-up key 1000
+    DEMO_KEY_RATE_PER_HOUR = 30
+    API_KEY_RATE_PER_HOUR = 1000
+    RETRY_STATUS = {429, 500, 502, 503, 504}
+
+    def __init__(self, api_key='DEMO_KEY', max_workers=8, rate_per_hour=None, burst=None,
+                 max_retries=4, backoff=1.0, timeout=30, cache_dir=None, use_cache=True):
+        if rate_per_hour is None:
+            rate_per_hour = self.DEMO_KEY_RATE_PER_HOUR if api_key == 'DEMO_KEY' else self.API_KEY_RATE_PER_HOUR
+        self.api_key = api_key
+        self.max_workers = max_workers
+        self.bucket = TokenBucket(rate_per_hour / 3600, burst or max_workers)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.use_cache = use_cache
+        self.cache_dir = cache_dir or os.path.join(os.path.dirname(os.path.abspath(__file__)), '.nrel_cache')
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.network_calls = 0
+        self.cache_hits = 0
+        self._stats_lock = threading.Lock()
+
+    def _count(self, stat):
+        with self._stats_lock:
+            setattr(self, stat, getattr(self, stat) + 1)
+
+    @staticmethod
+    def cache_key(url, params):
+        canonical = {k: (round(v, 6) if isinstance(v, float) else v)
+                     for k, v in params.items() if k != 'api_key'}
+        raw = json.dumps({'url': url, 'params': canonical}, sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def _cache_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _read_cache(self, key):
+        try:
+            with open(self._cache_path(key), encoding='utf-8') as f:
+                return json.load(f)['response']
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _write_cache(self, key, url, params, data):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = f"{self._cache_path(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'url': url, 'params': {k: v for k, v in params.items() if k != 'api_key'},
+                       'response': data}, f)
+        os.replace(tmp_path, self._cache_path(key))
+
+    def get(self, url, params):
+        '''Return the JSON response for one request, or None if it failed.'''
+        key = self.cache_key(url, params)
+        if self.use_cache:
+            data = self._read_cache(key)
+            if data is not None:
+                self._count('cache_hits')
+                return data
+
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire()
+            retry_after = None
+            try:
+                self._count('network_calls')
+                response = self.session.get(url, params=params, timeout=self.timeout)
+                if response.status_code == 200:
+                    data = response.json()
+                    if self.use_cache and not data.get('errors'):
+                        self._write_cache(key, url, params, data)
+                    return data
+                if response.status_code not in self.RETRY_STATUS:
+                    print(f"Error fetching data: {response.status_code}")
+                    print(response.text)
+                    return None
+                retry_after = response.headers.get('Retry-After')
+                print(f"Request returned {response.status_code} (attempt {attempt + 1})")
+            except requests.exceptions.RequestException as e:
+                print(f"Request failed (attempt {attempt + 1}): {e}")
+
+            if attempt < self.max_retries:
+                # Full jitter: random wait up to the exponential backoff
+                delay = random.uniform(0, self.backoff * 2 ** attempt)
+                if retry_after and retry_after.isdigit():
+                    delay = max(delay, float(retry_after))
+                time.sleep(delay)
+        return None
+
+    def fetch_all(self, analyzers):
+        '''Fetch data for many analyzers concurrently; returns the ones that succeeded.'''
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            ok = list(pool.map(lambda a: a.fetch_data(fetcher=self), analyzers))
+        print(f"Fetched {sum(ok)}/{len(analyzers)} sites "
+              f"({self.network_calls} network calls, {self.cache_hits} from cache)")
+        return [a for a, success in zip(analyzers, ok) if success]
+
+    def fetch_sites(self, sites, timeframe='monthly', **params):
+        '''
+        Fetch PVWatts estimates for a list of sites, each a dict with 'lat', 'lon'
+        and optional parameter overrides (e.g. 'tilt', 'azimuth'); `params`
+        apply to every site.
+        '''
+        analyzers = []
+        for site in sites:
+            site = dict(site)
+            analyzer = NRELSolarDataAnalyzer(api_key=self.api_key, lat=site.pop('lat'), lon=site.pop('lon'),
+                                             name=site.pop('name', None), timeframe=timeframe)
+            analyzer.params.update(params)
+            analyzer.params.update(site)
+            analyzers.append(analyzer)
+        return self.fetch_all(analyzers)
+
+    @staticmethod
+    def parameter_grid(sites, **param_values):
+        '''Expand sites by every combination of parameter values, e.g. tilt=[10, 20], azimuth=[90, 180].'''
+        names = list(param_values)
+        return [{**site, **dict(zip(names, combo))}
+                for site in sites
+                for combo in itertools.product(*(param_values[n] for n in names))]
+
+
+MONTHS = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+
+# PVWatts hourly output arrays -> column names (W, W/m2, °C)
+HOURLY_FIELDS = {
+    'ac': 'AC_W',
+    'dc': 'DC_W',
+    'poa': 'POA_W_m2',
+    'tamb': 'Temp_Amb_C',
+    'tcell': 'Temp_Cell_C',
+}
+HOURS_PER_YEAR = 8760
+# PVWatts simulates a typical (non-leap) year
+HOURLY_INDEX = pd.date_range('2023-01-01', periods=HOURS_PER_YEAR, freq='h')
+_MONTH_STARTS = np.searchsorted(HOURLY_INDEX.month, np.arange(1, 13))
+
+
+class HourlyResults:
+    '''
+    Hourly PVWatts results for many sites as float32 arrays of shape
+    (sites, 8760), one per field. Rollups are reductions over reshaped
+    arrays, so 500 sites aggregate in milliseconds. Saved as an uncompressed
+    Arrow IPC file that loads memory-mapped without copying.
+    '''
+
+    def __init__(self, names, arrays):
+        self.names = list(names)
+        self.arrays = arrays
+
+    @classmethod
+    def from_analyzers(cls, analyzers):
+        hourly = [a for a in analyzers if a.hourly is not None]
+        if not hourly:
+            # No site has hourly data (none fetched with timeframe='hourly'): an empty result
+            arrays = {column: np.empty((0, HOURS_PER_YEAR), dtype=np.float32) for column in HOURLY_FIELDS.values()}
+            return cls([], arrays)
+        arrays = {column: np.stack([a.hourly[column].to_numpy() for a in hourly])
+                  for column in HOURLY_FIELDS.values()}
+        return cls([a.name for a in hourly], arrays)
+
+    def save(self, path):
+        # Site-major rows: row s * 8760 + h is hour h of site s
+        table = pa.table({column: values.reshape(-1) for column, values in self.arrays.items()},
+                         metadata={'sites': json.dumps(self.names)})
+        with pa.OSFile(str(path), 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+    @classmethod
+    def load(cls, path):
+        source = pa.memory_map(str(path), 'r')
+        table = pa.ipc.open_file(source).read_all()
+        names = json.loads(table.schema.metadata[b'sites'])
+        arrays = {column: table.column(column).combine_chunks().to_numpy(zero_copy_only=True)
+                                              .reshape(len(names), HOURS_PER_YEAR)
+                  for column in table.column_names}
+        return cls(names, arrays)
+
+    def monthly_kwh(self, column='AC_W'):
+        values = np.add.reduceat(self.arrays[column], _MONTH_STARTS, axis=1, dtype=np.float64) / 1000
+        return pd.DataFrame(values, index=self.names, columns=MONTHS)
+
+    def daily_kwh(self, column='AC_W'):
+        values = self.arrays[column].reshape(len(self.names), -1, 24).sum(axis=2, dtype=np.float64) / 1000
+        return pd.DataFrame(values, index=self.names, columns=HOURLY_INDEX[::24].date)
+
+    def peak_hours(self, column='AC_W'):
+        '''Hour of day with the highest output for every site and day, plus each site's annual peak.'''
+        days = self.arrays[column].reshape(len(self.names), -1, 24)
+        daily_peak = pd.DataFrame(days.argmax(axis=2), index=self.names, columns=HOURLY_INDEX[::24].date)
+        annual = self.arrays[column].argmax(axis=1)
+        annual_peak = pd.DataFrame({
+            'Peak_Time': HOURLY_INDEX[annual],
+            'Peak_W': self.arrays[column][np.arange(len(self.names)), annual],
+        }, index=self.names)
+        return daily_peak, annual_peak
+
+
 class NRELSolarDataAnalyzer:
    
-    def __init__(self, api_key='DEMO_KEY', lat=34.0522, lon=-118.2437):
+    def __init__(self, api_key='DEMO_KEY', lat=34.0522, lon=-118.2437, name=None, timeframe='monthly'):
         self.base_url = "https://developer.nrel.gov/api/pvwatts/v8.json"
+        self.name = name or f"{lat:.4f}, {lon:.4f}"
         self.params = {
             'api_key': api_key,
             'lat': lat,
@@ -25,28 +266,27 @@ class NRELSolarDataAnalyzer:
             'module_type': 1,       # Premium module
             'losses': 14            # System losses
         }
+        if timeframe == 'hourly':
+            self.params['timeframe'] = 'hourly'   # adds 8760-point hourly arrays to the outputs
+        self.timeframe = timeframe
         self.data = None
         self.df = None
+        self.hourly = None
         self.script_dir = os.path.dirname(os.path.abspath(__file__))
         
     
-    def fetch_data(self):
-        print("Fetching data from NREL API...")
-        try:
-            response = requests.get(self.base_url, params=self.params)
-            
-            if response.status_code == 200:
-                self.data = response.json()
-                print("Data fetched successfully!")
-                return True
-            else:
-                print(f"Error fetching data: {response.status_code}")
-                print(response.text)
-                return False
-                
-        except requests.exceptions.RequestException as e:
-            print(f"Request failed: {e}")
+    def fetch_data(self, fetcher=None):
+        print(f"Fetching data from NREL API ({self.name})...")
+        fetcher = fetcher or NRELFetcher(api_key=self.params['api_key'], max_workers=1)
+        self.data = fetcher.get(self.base_url, self.params)
+        if self.data is None:
+            return False
+        if self.data.get('errors'):
+            print(f"Error fetching data: {self.data['errors']}")
+            self.data = None
             return False
+        print("Data fetched successfully!")
+        return True
     
     def process_data(self):
         if self.data is None:
@@ -55,10 +295,16 @@ class NRELSolarDataAnalyzer:
         
         outputs = self.data['outputs']
         
+        if self.timeframe == 'hourly':
+            # Compact float32 columns on a datetime index
+            self.hourly = pd.DataFrame(
+                {column: np.asarray(outputs[field], dtype=np.float32) for field, column in HOURLY_FIELDS.items()},
+                index=HOURLY_INDEX
+            )
+        
         # Create a comprehensive pandas DataFrame with all monthly data
         self.df = pd.DataFrame({
-            'Month': ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 
-                      'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'],
+            'Month': MONTHS,
             'AC_Output_kWh': outputs['ac_monthly'],
             'DC_Output_kWh': outputs['dc_monthly']
         })
@@ -79,7 +325,7 @@ class NRELSolarDataAnalyzer:
                color='skyblue', edgecolor='navy')
         ax.set_xlabel('Month', fontsize=12)
         ax.set_ylabel('AC Output (kWh)', fontsize=12)
-        ax.set_title('Monthly Solar Energy Production - Los Angeles', 
+        ax.set_title(f'Monthly Solar Energy Production - {self.name}', 
                      fontsize=14, fontweight='bold')
         ax.grid(axis='y', alpha=0.3)
         
@@ -104,7 +350,7 @@ class NRELSolarDataAnalyzer:
         ax.grid(True, alpha=0.3)
         ax.legend()
     
-    def visualize(self, save_image=False, save_path='nrel_solar_data.png'):
+    def visualize(self, save_image=False, save_path='nrel_solar_data.png', show=True):
         if self.df is None:
             print("No dataframe available. Please process data first.")
             return
@@ -113,7 +359,18 @@ class NRELSolarDataAnalyzer:
         self.create_bar_chart(axes[0])
         self.create_line_chart(axes[1])
         plt.tight_layout()
-        plt.show()
+        
+        if save_image:
+            if not os.path.isabs(save_path):
+                save_path = os.path.join(self.script_dir, save_path)
+            fig.savefig(save_path)
+            print(f"Chart saved to '{save_path}'")
+        
+        # Non-interactive backends (Agg on a headless server) cannot show a window
+        if show and matplotlib.get_backend().lower() not in ('agg', 'pdf', 'svg', 'ps', 'cairo', 'template'):
+            plt.show()
+        else:
+            plt.close(fig)
     
     def save_to_csv(self, file_path='nrel_solar_data.csv'):
         if self.df is None:
@@ -136,12 +393,73 @@ class NRELSolarDataAnalyzer:
         return True
 
 
+# -----------------------------
+# Headless batch rendering
+# -----------------------------
+# One figure per worker process, cleared and redrawn for every report
+_render_figure = None
+_render_axes = None
+
+
+def _init_render_worker(figsize, dpi):
+    global _render_figure, _render_axes
+    plt.switch_backend('Agg')
+    _render_figure, _render_axes = plt.subplots(2, 1, figsize=figsize, dpi=dpi)
+
+
+def _render_report(job):
+    name, df, output_dir, formats = job
+    analyzer = NRELSolarDataAnalyzer(name=name)
+    analyzer.df = df
+    for ax in _render_axes:
+        ax.clear()
+    analyzer.create_bar_chart(_render_axes[0])
+    analyzer.create_line_chart(_render_axes[1])
+    _render_figure.tight_layout()
+
+    stem = ''.join(c if c.isalnum() or c in '-_.' else '_' for c in name)
+    paths = []
+    for fmt in formats:
+        path = os.path.join(output_dir, f"{stem}.{fmt}")
+        _render_figure.savefig(path, format=fmt)
+        paths.append(path)
+    return paths
+
+
+def render_reports(analyzers, output_dir, formats=('png',), workers=None, figsize=(12, 10), dpi=100):
+    '''
+    Render the bar and line chart of many analyzers (or (name, df) pairs) to
+    image files on a process pool with the non-interactive Agg backend.
+    Returns the written paths.
+    '''
+    os.makedirs(output_dir, exist_ok=True)
+    jobs = []
+    for item in analyzers:
+        name, df = (item.name, item.df) if isinstance(item, NRELSolarDataAnalyzer) else item
+        if df is not None:
+            jobs.append((name, df, output_dir, tuple(formats)))
+
+    start = time.perf_counter()
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_render_worker,
+                             initargs=(figsize, dpi)) as pool:
+        paths = [p for result in pool.map(_render_report, jobs, chunksize=max(1, len(jobs) // (workers * 4)))
+                 for p in result]
+    elapsed = time.perf_counter() - start
+
+    charts = 2 * len(jobs) * len(formats)
+    print(f"Rendered {len(jobs)} reports ({charts} charts, {len(paths)} files) in {elapsed:.1f} s "
+          f"- {charts / elapsed if elapsed > 0 else 0:.1f} charts/sec")
+    return paths
+
+
 def main():
     # Create analyzer instance for Los Angeles
     analyzer = NRELSolarDataAnalyzer(
         api_key='DEMO_KEY',
         lat=34.0522,    # Los Angeles latitude
-        lon=-118.2437   # Los Angeles longitude
+        lon=-118.2437,  # Los Angeles longitude
+        name='Los Angeles'
     )
     
     analyzer.run_analysis(save_csv=True, save_image=False)
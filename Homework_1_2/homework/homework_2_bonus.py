@@ -1,100 +1,545 @@
 import requests
+import numpy as np
 import pandas as pd
-import plotly.express as px
 import plotly.graph_objects as go
-from dash import Dash, dcc, html, Input, Output
+import plotly.io as pio
+from dash import Dash, dcc, html, Input, Output, State, Patch
 import dash_bootstrap_components as dbc
+import io
 import os
+import sys
+import json
+import gzip
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
 
 '''
 Script Fetches Czech wage data and creates an interactive web app with filters
 '''
 
-class CZSODashApp:
-    
-    def __init__(self, dataset_id='110080'):
+ALL_GENDERS = 'Všechny'   # rows without POHLAVI_txt (both genders)
+MEAN_STAT = 'Průměr'      # rows without SPKVANTIL_txt (average wage)
+REGION_COLUMN = 'uzemi_txt'
+
+# Datasets offered in the dashboard, first one shown on start (ids from vdb.czso.cz)
+DATASETS = ['110080', '110079']
+
+
+def trace_column(df):
+    '''
+    Column the traces are split by: the region, or for national tables the
+    text column with the most distinct values (e.g. the industry).
+    '''
+    if REGION_COLUMN in df.columns and df[REGION_COLUMN].nunique() > 1:
+        return REGION_COLUMN
+    candidates = [c for c in df.columns if c.endswith('_txt') and c not in ('POHLAVI_txt', 'SPKVANTIL_txt')]
+    return max(candidates, key=lambda c: df[c].nunique(), default=REGION_COLUMN)
+
+
+def _labels(df, column, default):
+    if column not in df.columns:
+        return pd.Series(default, index=df.index, dtype=object)
+    return df[column].astype(object).where(df[column].notna(), default)
+
+
+class WageCube:
+    '''
+    Wage table indexed once for the dashboard callback.
+
+    Rows are sorted by (gender, statistic, region, year), so every
+    (gender, statistic, region) combination is one contiguous slice of the
+    year/value arrays. Filtering is then dictionary lookups plus a binary
+    search on the years - no string comparisons and no copies of the table.
+    '''
+
+    def __init__(self, df, region_column=REGION_COLUMN):
+        self.region_column = region_column
+        frame = pd.DataFrame({
+            'gender': _labels(df, 'POHLAVI_txt', ALL_GENDERS),
+            'stat': _labels(df, 'SPKVANTIL_txt', MEAN_STAT),
+            'region': df[region_column].astype(str),
+            'year': df['rok'].astype('int16'),
+            'value': df['hodnota'].astype('float64'),
+        })
+        frame = frame[frame['value'].notna()].sort_values(['gender', 'stat', 'region', 'year'], kind='stable')
+
+        self.years = frame['year'].to_numpy()
+        self.values = frame['value'].to_numpy()
+
+        # (gender, stat, region) -> (start, stop) into the sorted arrays
+        self.slices = {}
+        self.regions = {}   # (gender, stat) -> regions in sorted order
+        for (gender, stat, region), positions in frame.groupby(['gender', 'stat', 'region'], sort=False).indices.items():
+            self.slices[(gender, stat, region)] = (int(positions[0]), int(positions[-1]) + 1)
+            self.regions.setdefault((gender, stat), []).append(region)
+
+        # Filter options, so the source table does not have to be kept
+        self.region_names = sorted({region for _, _, region in self.slices})
+        self.genders = [ALL_GENDERS] + sorted({g for g, _ in self.regions if g != ALL_GENDERS})
+        self.stats = [MEAN_STAT] + sorted({s for _, s in self.regions if s != MEAN_STAT})
+        self.year_list = sorted(int(y) for y in np.unique(self.years))
+        # Arrays plus roughly 300 bytes per index entry (key tuple, bounds, dict slot)
+        self.nbytes = self.years.nbytes + self.values.nbytes + 300 * len(self.slices)
+
+    def select(self, regions, gender, stat, year_from, year_to):
+        '''Return [(region, start, stop)] ranges matching the filters.'''
+        if not regions:
+            regions = self.regions.get((gender, stat), [])
+        ranges = []
+        for region in regions:
+            bounds = self.slices.get((gender, stat, region))
+            if bounds is None:
+                continue
+            start, stop = bounds
+            years = self.years[start:stop]
+            lo = start + int(np.searchsorted(years, year_from, side='left'))
+            hi = start + int(np.searchsorted(years, year_to, side='right'))
+            if hi > lo:
+                ranges.append((region, lo, hi))
+        return ranges
+
+    def frame(self, ranges):
+        '''Small DataFrame (rok, hodnota, uzemi_txt) for the selected ranges, used for plotting.'''
+        if not ranges:
+            return pd.DataFrame({'rok': [], 'hodnota': [], 'uzemi_txt': []})
+        return pd.DataFrame({
+            'rok': np.concatenate([self.years[lo:hi] for _, lo, hi in ranges]).astype(int),
+            'hodnota': np.concatenate([self.values[lo:hi] for _, lo, hi in ranges]),
+            'uzemi_txt': np.repeat([r for r, _, _ in ranges], [hi - lo for _, lo, hi in ranges]),
+        })
+
+
+class FigureCache:
+    '''
+    Bounded cache of built Plotly figures, keyed by the normalized filter tuple.
+
+    Figures are stored gzip-compressed on disk, so every worker process on the
+    host shares them; a small in-process LRU sits in front of the disk.
+    '''
+
+    def __init__(self, directory, max_entries=512, memory_entries=64):
+        self.directory = Path(directory)
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return self.directory / f"{hashlib.sha1(repr(key).encode()).hexdigest()}.json.gz"
+
+    def get(self, key):
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+        try:
+            with gzip.open(self._path(key), 'rt', encoding='utf-8') as f:
+                figure = json.load(f)
+        except (OSError, ValueError):
+            return None
+        self._remember(key, figure)
+        return figure
+
+    def set(self, key, figure):
+        figure = json.loads(pio.to_json(figure, validate=False))
+        self._remember(key, figure)
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            tmp_path = self._path(key).with_suffix(f'.{os.getpid()}.tmp')
+            with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+                json.dump(figure, f)
+            os.replace(tmp_path, self._path(key))
+            self._evict()
+        except OSError as e:
+            print(f"⚠ Warning: Could not write figure cache: {e}")
+        return figure
+
+    def _remember(self, key, figure):
+        with self._lock:
+            self._memory[key] = figure
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def _evict(self):
+        files = list(self.directory.glob('*.json.gz'))
+        if len(files) <= self.max_entries:
+            return
+        files.sort(key=lambda f: f.stat().st_mtime)
+        for f in files[:len(files) - self.max_entries]:
+            f.unlink(missing_ok=True)
+
+
+def package_show(dataset_id):
+    '''``result`` of the CZSO package_show call for a dataset, None on failure.'''
+    url = "https://vdb.czso.cz/pll/eweb/package_show"
+    response = requests.get(url, params={'id': dataset_id}, timeout=30)
+    if response.status_code != 200:
+        print(f"Failed to fetch metadata for dataset {dataset_id}")
+        return None
+    return response.json().get('result', {})
+
+
+class CZSODataset:
+    '''
+    One CZSO table: download with conditional refresh, local cache and the
+    WageCube the dashboard filters on.
+    '''
+
+    def __init__(self, dataset_id, cache_dir, offline=False, metadata=package_show):
         self.dataset_id = dataset_id
+        self.offline = offline   # use the local cache only, no network requests
+        self.cache_dir = Path(cache_dir)
+        self.metadata = metadata
         self.df = None
-        self.app = None
-        self.csv_filepath = None
-        
-    def fetch_data(self):
-        print(f"Fetching data for dataset {self.dataset_id}...")
-        url = "https://vdb.czso.cz/pll/eweb/package_show"
-        response = requests.get(url, params={'id': self.dataset_id})
-        
-        if response.status_code != 200:
-            print("Failed to fetch metadata")
-            return False
-        
-        metadata = response.json()
-        result = metadata.get('result', {})
-       
+        self.cube = None
+        self.data_version = None
+        self.nbytes = 0
+
+    @property
+    def cache_table_path(self):
+        return self.cache_dir / f"czso_{self.dataset_id}.parquet"
+
+    @property
+    def cache_meta_path(self):
+        return self.cache_dir / f"czso_{self.dataset_id}.json"
+
+    def _load_cache_meta(self):
+        try:
+            with open(self.cache_meta_path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_cache(self, meta):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.df.to_parquet(self.cache_table_path, index=False)
+        with open(self.cache_meta_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, indent=2)
+
+    def _load_cached_table(self, reason):
+        self.df = pd.read_parquet(self.cache_table_path)
+        print(f"✓ Loaded cached data ({reason}): {self.cache_table_path}")
+        return True
+
+    def _fetch_csv_url(self):
+        result = self.metadata(self.dataset_id)
+        if result is None:
+            return None
+
         resources = result.get('resources', [])
-        csv_url = None
-        
         for resource in resources:
             if 'csv' in resource.get('format', '').lower():
-                csv_url = resource.get('url')
-                break
-        
-        if not csv_url:
-            print("No CSV found")
-            return False
-        
-        print(f"Downloading from: {csv_url}")
-        
-        script_dir = Path(__file__).parent.resolve()
-        self.csv_filepath = script_dir / f"czso_data_{self.dataset_id}.csv"
+                return resource.get('url')
         
+        print("No CSV found")
+        return None
+
+    @staticmethod
+    def _decode_csv(content):
+        # Detect the encoding on the downloaded bytes instead of downloading again
+        for encoding in ('utf-8', 'windows-1250'):
+            try:
+                content.decode(encoding)
+                return encoding
+            except UnicodeDecodeError:
+                continue
+        return 'latin-1'
+
+    def fetch_data(self):
+        """Load the dataset, from the local cache when it is still current.
+
+        The parsed, typed table is cached as Parquet next to a JSON file with the
+        CSV url, ETag/Last-Modified and content hash. On the next start the CSV is
+        revalidated with a conditional request; ``offline`` skips the network.
+        """
+        print(f"Fetching data for dataset {self.dataset_id}...")
+        meta = self._load_cache_meta()
+        has_cache = self.cache_table_path.exists() and bool(meta)
+
+        if self.offline:
+            if not has_cache:
+                print("Offline mode but no cached data found")
+                return False
+            self._load_cached_table('offline')
+            return self._prepare()
+
         try:
-            self.df = pd.read_csv(csv_url, encoding='utf-8')
-        except:
-            self.df = pd.read_csv(csv_url, encoding='windows-1250')
+            csv_url = self._fetch_csv_url()
+            if not csv_url:
+                if has_cache:
+                    return self._load_cached_table('metadata unavailable') and self._prepare()
+                return False
+
+            headers = {}
+            if has_cache and meta.get('csv_url') == csv_url:
+                if meta.get('etag'):
+                    headers['If-None-Match'] = meta['etag']
+                if meta.get('last_modified'):
+                    headers['If-Modified-Since'] = meta['last_modified']
+
+            print(f"Downloading from: {csv_url}")
+            response = requests.get(csv_url, headers=headers, timeout=60)
+        except requests.exceptions.RequestException as e:
+            print(f"Request failed: {e}")
+            if has_cache:
+                return self._load_cached_table('network unavailable') and self._prepare()
+            return False
+
+        if response.status_code == 304:
+            return self._load_cached_table('not modified') and self._prepare()
+        if response.status_code != 200:
+            print(f"Error downloading CSV: {response.status_code}")
+            if has_cache:
+                return self._load_cached_table('download failed') and self._prepare()
+            return False
+
+        content = response.content
+        new_meta = {
+            'csv_url': csv_url,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'sha256': hashlib.sha256(content).hexdigest(),
+            'fetched_at': time.time(),
+        }
+        if has_cache and meta.get('sha256') == new_meta['sha256']:
+            # Server ignored the conditional headers but the content is the same
+            self._load_cached_table('content unchanged')
+            new_meta['encoding'] = meta.get('encoding')
+        else:
+            new_meta['encoding'] = self._decode_csv(content)
+            self.df = pd.read_csv(io.BytesIO(content), encoding=new_meta['encoding'])
+            self._convert_types()
         
         try:
-            self.df.to_csv(self.csv_filepath, index=False, encoding='utf-8')
-            print(f"✓ Data saved to: {self.csv_filepath}")
+            self._save_cache(new_meta)
+            print(f"✓ Data cached in: {self.cache_dir}")
         except Exception as e:
-            print(f"⚠ Warning: Could not save CSV file: {e}")
-        
-        print(f"Data loaded! Shape: {self.df.shape}")
+            print(f"⚠ Warning: Could not write cache: {e}")
         
+        return self._prepare()
+
+    def _convert_types(self):
         # Convert numeric columns to native Python types for Plotly compatibility
         numeric_cols = self.df.select_dtypes(include=['int64', 'float64']).columns
         for col in numeric_cols:
             if self.df[col].dtype == 'int64':
                 self.df[col] = self.df[col].astype('Int64')
-        
+
+    def _prepare(self):
+        print(f"Data loaded! Shape: {self.df.shape}")
+        self.cube = WageCube(self.df, trace_column(self.df))
+        # Cached figures are only valid for the data they were built from
+        self.data_version = self._load_cache_meta().get('sha256') or str(pd.util.hash_pandas_object(self.df).sum())
+        # The cube holds everything the callbacks need, the table itself is released
+        self.df = None
+        self.nbytes = self.cube.nbytes
         return True
+
+
+class DatasetCatalog:
+    '''
+    The registered CZSO datasets, loaded lazily and kept in a memory-bounded LRU.
+
+    Nothing is fetched up front: a dataset is loaded the first time it is
+    selected, and the datasets after it in the catalog are prefetched on a
+    small thread pool meanwhile. Prefetched datasets enter the LRU at its cold
+    end, so they never push out one that is on screen. package_show metadata
+    is cached in memory and on disk (``metadata_ttl`` seconds).
+    '''
+
+    def __init__(self, dataset_ids, cache_dir, offline=False, max_bytes=256 * 2**20,
+                 prefetch_workers=2, prefetch_ahead=2, metadata_ttl=24 * 3600):
+        self.dataset_ids = list(dict.fromkeys(dataset_ids))
+        self.cache_dir = Path(cache_dir)
+        self.offline = offline
+        self.max_bytes = max_bytes
+        self.prefetch_ahead = prefetch_ahead
+        self.metadata_ttl = metadata_ttl
+        self._datasets = OrderedDict()   # dataset id -> CZSODataset, least recently used first
+        self._loading = {}               # dataset id -> Future of the running load
+        self._metadata = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=prefetch_workers, thread_name_prefix='czso-prefetch')
+
+    # -----------------------------
+    # package_show metadata
+    # -----------------------------
+    def _metadata_path(self, dataset_id):
+        return self.cache_dir / f"czso_{dataset_id}.package.json"
+
+    def _cached_metadata(self, dataset_id):
+        if dataset_id in self._metadata:
+            return self._metadata[dataset_id]
+        try:
+            with open(self._metadata_path(dataset_id), encoding='utf-8') as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return None
+        self._metadata[dataset_id] = cached
+        return cached
+
+    def metadata(self, dataset_id):
+        '''package_show ``result`` of a dataset, from the cache while it is fresh.'''
+        cached = self._cached_metadata(dataset_id)
+        if cached and (self.offline or time.time() - cached['fetched_at'] < self.metadata_ttl):
+            return cached['result']
+        if self.offline:
+            return None
+        result = package_show(dataset_id)
+        if result is None:
+            # Stale metadata still points at the right CSV most of the time
+            return cached['result'] if cached else None
+        cached = {'fetched_at': time.time(), 'result': result}
+        self._metadata[dataset_id] = cached
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            with open(self._metadata_path(dataset_id), 'w', encoding='utf-8') as f:
+                json.dump(cached, f)
+        except OSError as e:
+            print(f"⚠ Warning: Could not write metadata cache: {e}")
+        return result
+
+    def title(self, dataset_id):
+        '''Dataset title from cached metadata only, so listing the catalog never waits on the network.'''
+        cached = self._cached_metadata(dataset_id)
+        title = cached and cached['result'].get('title')
+        return f"{dataset_id} - {title}" if title else dataset_id
+
+    # -----------------------------
+    # Loading and the LRU
+    # -----------------------------
+    def get(self, dataset_id):
+        '''The loaded dataset (None if it cannot be loaded); loads it on first use and prefetches the next ones.'''
+        with self._lock:
+            dataset = self._datasets.get(dataset_id)
+            if dataset is not None:
+                self._datasets.move_to_end(dataset_id)
+            future = self._loading.get(dataset_id)
+            load_here = dataset is None and future is None
+            if load_here:
+                future = self._loading[dataset_id] = Future()
+        if load_here:
+            # Loaded in the caller's thread, a selection does not queue behind prefetches
+            self._load(dataset_id, future, cold=False)
+        if dataset is None:
+            dataset = future.result()
+            if dataset is not None:
+                self._touch(dataset_id)
+        self.prefetch(self.likely_next(dataset_id))
+        return dataset
+
+    def likely_next(self, dataset_id):
+        '''The datasets after ``dataset_id`` in catalog order, where users usually go next.'''
+        if dataset_id not in self.dataset_ids:
+            return []
+        i = self.dataset_ids.index(dataset_id)
+        ahead = self.dataset_ids[i + 1:] + self.dataset_ids[:i]
+        return ahead[:self.prefetch_ahead]
+
+    def prefetch(self, dataset_ids):
+        for dataset_id in dataset_ids:
+            with self._lock:
+                if dataset_id in self._datasets or dataset_id in self._loading:
+                    continue
+                # A full LRU would evict the prefetched dataset right away
+                if sum(d.nbytes for d in self._datasets.values()) >= self.max_bytes:
+                    return
+                future = self._loading[dataset_id] = Future()
+            self._executor.submit(self._load, dataset_id, future, True)
+
+    def put(self, dataset, cold=False):
+        '''Add a prepared dataset, evicting least recently used ones beyond ``max_bytes``.'''
+        with self._lock:
+            self._datasets[dataset.dataset_id] = dataset
+            self._datasets.move_to_end(dataset.dataset_id, last=not cold)
+            total = sum(d.nbytes for d in self._datasets.values())
+            # The most recently used dataset stays even if it alone exceeds the budget
+            while total > self.max_bytes and len(self._datasets) > 1:
+                evicted_id, evicted = self._datasets.popitem(last=False)
+                total -= evicted.nbytes
+                print(f"Evicted dataset {evicted_id} ({evicted.nbytes / 2**20:.1f} MB)")
+
+    def _touch(self, dataset_id):
+        with self._lock:
+            if dataset_id in self._datasets:
+                self._datasets.move_to_end(dataset_id)
+
+    def _load(self, dataset_id, future, cold):
+        dataset = None
+        try:
+            dataset = CZSODataset(dataset_id, self.cache_dir, offline=self.offline, metadata=self.metadata)
+            if dataset.fetch_data():
+                self.put(dataset, cold=cold)
+            else:
+                print(f"Failed to load dataset {dataset_id}")
+                dataset = None
+        except Exception as e:
+            print(f"Failed to load dataset {dataset_id}: {e}")
+            dataset = None
+        finally:
+            with self._lock:
+                self._loading.pop(dataset_id, None)
+            future.set_result(dataset)
+        return dataset
+
+    def loaded(self):
+        with self._lock:
+            return list(self._datasets)
+
+    def nbytes(self):
+        with self._lock:
+            return sum(d.nbytes for d in self._datasets.values())
+
+
+class CZSODashApp:
+    
+    def __init__(self, dataset_ids=DATASETS, offline=False, cache_dir=None, max_bytes=256 * 2**20):
+        self.cache_dir = Path(cache_dir) if cache_dir else Path(__file__).parent.resolve() / '.czso_cache'
+        self.catalog = DatasetCatalog(dataset_ids, self.cache_dir, offline=offline, max_bytes=max_bytes)
+        self.app = None
+        self.figure_cache = FigureCache(self.cache_dir / 'figures')
     
     def create_app(self):
        
-        self.app = Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
+        # compress=True gzips callback responses (needs flask-compress)
+        self.app = Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP], compress=True)
         
-        regions = sorted([str(r) for r in self.df['uzemi_txt'].unique()])
-        years = sorted([int(y) for y in self.df['rok'].unique()])
-        genders = ['Všechny'] + sorted([str(g) for g in self.df['POHLAVI_txt'].unique() if pd.notna(g)])
-        stat_types = ['Průměr'] + sorted([str(s) for s in self.df['SPKVANTIL_txt'].unique() if pd.notna(s)])
+        # Filter options come from the selected dataset, which is loaded on first use
+        dataset_ids = self.catalog.dataset_ids
         
         self.app.layout = dbc.Container([
             dbc.Row([
                 dbc.Col([
                     html.H1("📊 Czech Wage Statistics Dashboard", 
                            className="text-center mb-4 mt-4"),
-                    html.P("Průměrná hrubá měsíční mzda a medián mezd v krajích (2011-2024)",
-                          className="text-center text-muted mb-4")
+                    html.P(id='dataset-title', className="text-center text-muted mb-4")
                 ])
             ]),
             
             dbc.Row([
                 dbc.Col([
-                    html.Label("Region:", className="fw-bold"),
+                    html.Label("Dataset:", className="fw-bold"),
+                    dcc.Dropdown(
+                        id='dataset-filter',
+                        options=[{'label': self.catalog.title(d), 'value': d} for d in dataset_ids],
+                        value=dataset_ids[0],
+                        clearable=False
+                    )
+                ], md=12)
+            ], className="mb-4"),
+            
+            dbc.Row([
+                dbc.Col([
+                    html.Label("Region:", id='region-label', className="fw-bold"),
                     dcc.Dropdown(
                         id='region-filter',
-                        options=[{'label': r, 'value': r} for r in regions],
-                        value=[regions[0]],  # Default: first region
+                        options=[],
+                        value=[],
                         multi=True,
                         placeholder="Select regions..."
                     )
@@ -104,7 +549,7 @@ class CZSODashApp:
                     html.Label("Gender:", className="fw-bold"),
                     dcc.Dropdown(
                         id='gender-filter',
-                        options=[{'label': g, 'value': g} for g in genders],
+                        options=[],
                         value='Všechny',
                         placeholder="Select gender..."
                     )
@@ -114,7 +559,7 @@ class CZSODashApp:
                     html.Label("Statistics:", className="fw-bold"),
                     dcc.Dropdown(
                         id='stat-filter',
-                        options=[{'label': s, 'value': s} for s in stat_types],
+                        options=[],
                         value='Průměr',
                         placeholder="Select stat type..."
                     )
@@ -126,10 +571,9 @@ class CZSODashApp:
                     html.Label("Year Range:", className="fw-bold"),
                     dcc.RangeSlider(
                         id='year-slider',
-                        min=min(years),
-                        max=max(years),
-                        value=[min(years), max(years)],
-                        marks={year: str(year) for year in years[::2]},  # Every 2nd year
+                        min=0,
+                        max=1,
+                        value=[0, 1],
                         tooltip={"placement": "bottom", "always_visible": True}
                     )
                 ], md=12)
@@ -149,109 +593,188 @@ class CZSODashApp:
                 dbc.Col([
                     html.Div(id='stats-summary', className="p-3 border rounded bg-light")
                 ], md=6)
-            ])
+            ]),
+            
+            # Filters behind the figures currently shown, used to send partial updates
+            dcc.Store(id='figure-state')
             
         ], fluid=True)
         
+        @self.app.callback(
+            [Output('dataset-title', 'children'),
+             Output('region-label', 'children'),
+             Output('region-filter', 'options'),
+             Output('region-filter', 'value'),
+             Output('gender-filter', 'options'),
+             Output('gender-filter', 'value'),
+             Output('stat-filter', 'options'),
+             Output('stat-filter', 'value'),
+             Output('year-slider', 'min'),
+             Output('year-slider', 'max'),
+             Output('year-slider', 'value'),
+             Output('year-slider', 'marks')],
+            [Input('dataset-filter', 'value')]
+        )
+        def select_dataset(dataset_id):
+            dataset = self.catalog.get(dataset_id)
+            if dataset is None:
+                return (f"⚠️ Dataset {dataset_id} could not be loaded", "Region:",
+                        [], [], [], None, [], None, 0, 1, [0, 1], {})
+            cube = dataset.cube
+            years = cube.year_list
+            if cube.region_column == REGION_COLUMN:
+                label = "Region:"
+            else:
+                label = cube.region_column.removesuffix('_txt').replace('_', ' ').capitalize() + ":"
+            return (self.catalog.title(dataset_id), label,
+                    [{'label': r, 'value': r} for r in cube.region_names], cube.region_names[:1],
+                    [{'label': g, 'value': g} for g in cube.genders], ALL_GENDERS,
+                    [{'label': s, 'value': s} for s in cube.stats], MEAN_STAT,
+                    min(years), max(years), [min(years), max(years)],
+                    {year: str(year) for year in years[::2]})  # Every 2nd year
+        
         @self.app.callback(
             [Output('time-series-chart', 'figure'),
              Output('bar-chart', 'figure'),
-             Output('stats-summary', 'children')],
-            [Input('region-filter', 'value'),
+             Output('stats-summary', 'children'),
+             Output('figure-state', 'data')],
+            [Input('dataset-filter', 'value'),
+             Input('region-filter', 'value'),
              Input('gender-filter', 'value'),
              Input('stat-filter', 'value'),
-             Input('year-slider', 'value')]
+             Input('year-slider', 'value')],
+            [State('figure-state', 'data')]
         )
-        def update_charts(regions, gender, stat_type, year_range):
-            df_filtered = self.df.copy()          
-            year_range = [int(year_range[0]), int(year_range[1])]  
-
-            if regions:
-                df_filtered = df_filtered[df_filtered['uzemi_txt'].isin(regions)]
-            
-            if gender == 'Všechny':
-                df_filtered = df_filtered[df_filtered['POHLAVI_txt'].isna()]
-            else:
-                df_filtered = df_filtered[df_filtered['POHLAVI_txt'] == gender]
-            
-            if stat_type == 'Průměr':
-                df_filtered = df_filtered[df_filtered['SPKVANTIL_txt'].isna()]
-            else:
-                df_filtered = df_filtered[df_filtered['SPKVANTIL_txt'] == stat_type]
+        def update_charts(dataset_id, regions, gender, stat_type, year_range, shown):
+            dataset = self.catalog.get(dataset_id)
+            if dataset is None:
+                return go.Figure(), go.Figure(), self._summary([], [], None, year_range), None
+            cube = dataset.cube
+            year_range = [int(year_range[0]), int(year_range[1])]
+            ranges = cube.select(regions, gender, stat_type, year_range[0], year_range[1])
+            df_filtered = cube.frame(ranges)
             
-            df_filtered = df_filtered[
-                (df_filtered['rok'] >= year_range[0]) & 
-                (df_filtered['rok'] <= year_range[1])
-            ].copy()
+            years = df_filtered['rok'].to_numpy()
+            values = df_filtered['hodnota'].to_numpy()
+            latest_year = int(years.max()) if len(years) else year_range[1]
+            df_latest = df_filtered[years == latest_year].sort_values('hodnota', ascending=True)
             
-            df_filtered['rok'] = df_filtered['rok'].astype(int)
-            df_filtered['hodnota'] = df_filtered['hodnota'].astype(float)
+            # One trace per region over all years; the year range is an axis range
+            trace_regions = [r for r in (regions or cube.regions.get((gender, stat_type), []))
+                             if (gender, stat_type, r) in cube.slices]
+            x_range = [year_range[0] - 0.5, year_range[1] + 0.5]
+            same_series = (shown and shown.get('dataset') == dataset_id
+                           and shown['gender'] == gender and shown['stat'] == stat_type)
             
-            fig_ts = px.line(
-                df_filtered,
-                x='rok',
-                y='hodnota',
-                color='uzemi_txt',
-                markers=True,
-                title='Wage Trends Over Time',
-                labels={'rok': 'Year', 'hodnota': 'Wage (CZK)', 'uzemi_txt': 'Region'}
-            )
-            fig_ts.update_layout(
-                hovermode='x unified',
-                legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
-            )
-            
-            latest_year = int(df_filtered['rok'].max())
-            df_latest = df_filtered[df_filtered['rok'] == latest_year].copy()
-            df_latest = df_latest.sort_values('hodnota', ascending=True)
-            
-            fig_bar = px.bar(
-                df_latest,
-                x='hodnota',
-                y='uzemi_txt',
-                orientation='h',
-                title=f'Wages in {latest_year}',
-                labels={'hodnota': 'Wage (CZK)', 'uzemi_txt': 'Region'},
-                color='hodnota',
-                color_continuous_scale='Blues'
-            )
-            fig_bar.update_layout(showlegend=False)
+            if same_series:
+                # Same statistic: add/remove region traces and move the axis range
+                fig_ts = Patch()
+                current = list(shown['regions'])
+                for index in sorted((i for i, r in enumerate(current) if r not in trace_regions), reverse=True):
+                    del fig_ts['data'][index]
+                    del current[index]
+                for region in trace_regions:
+                    if region not in current:
+                        fig_ts['data'].append(self._region_trace(cube, region, gender, stat_type))
+                        current.append(region)
+                fig_ts['layout']['xaxis']['range'] = x_range
+                trace_regions = current
+            else:
+                key = (dataset.data_version, 'ts', gender, stat_type, tuple(trace_regions))
+                fig_ts = self.figure_cache.get(key)
+                if fig_ts is None:
+                    fig_ts = self.figure_cache.set(key, self._time_series_figure(cube, trace_regions, gender, stat_type))
+                # Copy the layout, the cached figure is shared between requests
+                layout = fig_ts['layout']
+                fig_ts = {**fig_ts, 'layout': {**layout, 'xaxis': {**layout.get('xaxis', {}), 'range': x_range}}}
             
-            if len(df_filtered) > 0:
-                avg_wage = float(df_filtered['hodnota'].mean())
-                min_wage = float(df_filtered['hodnota'].min())
-                max_wage = float(df_filtered['hodnota'].max())
-                growth = None
-                
-                if len(df_filtered['rok'].unique()) > 1:
-                    first_year = int(df_filtered['rok'].min())
-                    last_year = int(df_filtered['rok'].max())
-                    first_val = float(df_filtered[df_filtered['rok'] == first_year]['hodnota'].mean())
-                    last_val = float(df_filtered[df_filtered['rok'] == last_year]['hodnota'].mean())
-                    growth = ((last_val - first_val) / first_val) * 100
-                
-                summary = html.Div([
-                    html.H4("📈 Statistics Summary", className="mb-3"),
-                    html.Hr(),
-                    html.P([html.Strong("Average Wage: "), f"{avg_wage:,.0f} CZK"]),
-                    html.P([html.Strong("Minimum: "), f"{min_wage:,.0f} CZK"]),
-                    html.P([html.Strong("Maximum: "), f"{max_wage:,.0f} CZK"]),
-                    html.P([html.Strong("Data Points: "), f"{len(df_filtered)}"]),
-                    html.Hr(),
-                    html.P([
-                        html.Strong("Growth: "),
-                        f"{growth:+.1f}%" if growth else "N/A",
-                        html.Br(),
-                        html.Small(f"({year_range[0]} → {year_range[1]})", className="text-muted")
-                    ]) if growth else html.Div()
-                ])
+            if same_series and shown.get('bar') and len(df_latest):
+                # Restyle the existing bar trace in place
+                fig_bar = Patch()
+                fig_bar['data'][0]['x'] = df_latest['hodnota'].tolist()
+                fig_bar['data'][0]['y'] = df_latest['uzemi_txt'].tolist()
+                fig_bar['data'][0]['marker']['color'] = df_latest['hodnota'].tolist()
+                fig_bar['layout']['title']['text'] = f'Wages in {latest_year}'
             else:
-                summary = html.Div([
-                    html.H4("⚠️ No Data", className="text-warning"),
-                    html.P("No data matches the selected filters.")
-                ])
+                key = (dataset.data_version, 'bar', gender, stat_type, tuple(sorted(regions or [])), *year_range)
+                fig_bar = self.figure_cache.get(key)
+                if fig_bar is None:
+                    fig_bar = self.figure_cache.set(key, self._bar_figure(df_latest, latest_year))
             
-            return fig_ts, fig_bar, summary
+            summary = self._summary(years, values, latest_year, year_range)
+            state = {'dataset': dataset_id, 'gender': gender, 'stat': stat_type, 'regions': trace_regions, 'bar': bool(len(df_latest))}
+            return fig_ts, fig_bar, summary, state
+    
+    def _region_trace(self, cube, region, gender, stat_type):
+        start, stop = cube.slices[(gender, stat_type, region)]
+        return go.Scatter(
+            x=cube.years[start:stop].astype(int),
+            y=cube.values[start:stop],
+            mode='lines+markers',
+            name=region
+        ).to_plotly_json()
+    
+    def _time_series_figure(self, cube, trace_regions, gender, stat_type):
+        fig_ts = go.Figure([self._region_trace(cube, r, gender, stat_type) for r in trace_regions])
+        fig_ts.update_layout(
+            title='Wage Trends Over Time',
+            xaxis_title='Year',
+            yaxis_title='Wage (CZK)',
+            legend_title_text='Region',
+            hovermode='x unified',
+            legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
+            uirevision='time-series'
+        )
+        return fig_ts
+    
+    def _bar_figure(self, df_latest, latest_year):
+        fig_bar = go.Figure(go.Bar(
+            x=df_latest['hodnota'],
+            y=df_latest['uzemi_txt'],
+            orientation='h',
+            marker=dict(color=df_latest['hodnota'], colorscale='Blues', showscale=True)
+        ))
+        fig_bar.update_layout(
+            title=f'Wages in {latest_year}',
+            xaxis_title='Wage (CZK)',
+            yaxis_title='Region',
+            showlegend=False
+        )
+        return fig_bar
+    
+    def _summary(self, years, values, latest_year, year_range):
+        if len(values) == 0:
+            return html.Div([
+                html.H4("⚠️ No Data", className="text-warning"),
+                html.P("No data matches the selected filters.")
+            ])
+        
+        avg_wage = float(values.mean())
+        min_wage = float(values.min())
+        max_wage = float(values.max())
+        growth = None
+        
+        first_year = int(years.min())
+        if first_year != latest_year:
+            first_val = float(values[years == first_year].mean())
+            last_val = float(values[years == latest_year].mean())
+            growth = ((last_val - first_val) / first_val) * 100
+        
+        return html.Div([
+            html.H4("📈 Statistics Summary", className="mb-3"),
+            html.Hr(),
+            html.P([html.Strong("Average Wage: "), f"{avg_wage:,.0f} CZK"]),
+            html.P([html.Strong("Minimum: "), f"{min_wage:,.0f} CZK"]),
+            html.P([html.Strong("Maximum: "), f"{max_wage:,.0f} CZK"]),
+            html.P([html.Strong("Data Points: "), f"{len(values)}"]),
+            html.Hr(),
+            html.P([
+                html.Strong("Growth: "),
+                f"{growth:+.1f}%" if growth else "N/A",
+                html.Br(),
+                html.Small(f"({year_range[0]} → {year_range[1]})", className="text-muted")
+            ]) if growth else html.Div()
+        ])
     
     def run(self, debug=True, port=8050):
         if self.app is None:
@@ -265,14 +788,17 @@ class CZSODashApp:
         print("Press Ctrl+C to stop the server")
         print(f"{'='*60}\n")
         
+        # Start loading the first dataset while the browser connects (in the
+        # serving process only, the debug reloader's parent never serves)
+        if not debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+            self.catalog.prefetch(self.catalog.dataset_ids[:1])
         self.app.run(debug=debug, port=port)
 
 
 def main():
-    dashboard = CZSODashApp(dataset_id='110080')   
-    if not dashboard.fetch_data():
-        print("Failed to fetch data!")
-        return   
+    # python homework_2_bonus.py [--offline] [dataset_id ...]
+    dataset_ids = [arg for arg in sys.argv[1:] if not arg.startswith('--')] or DATASETS
+    dashboard = CZSODashApp(dataset_ids=dataset_ids, offline='--offline' in sys.argv)
     dashboard.create_app()
     dashboard.run(debug=True, port=8050)
 
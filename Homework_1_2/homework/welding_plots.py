@@ -0,0 +1,147 @@
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+
+'''
+Scatter plots of the welding data that stay interactive for large datasets.
+
+The chart of homework_1 (a measurement against the weld number, coloured by
+cracking and faceted by cross-section position) is drawn in one of three ways,
+picked from the number of points:
+
+    svg     - plain scatter, every point is an SVG element
+    webgl   - the same scatter drawn with WebGL traces
+    binned  - points pre-binned on the server into a 2-D histogram per facet and
+              cracking class; one marker per non-empty bin, sized and shaded by
+              its count
+
+The binned figure holds at most facets x classes x bins_x x bins_y markers, so
+the HTML size and render time do not grow with the number of rows.
+'''
+
+# Switch to WebGL above this many points, and to server-side binning above the second
+WEBGL_THRESHOLD = 5_000
+BIN_THRESHOLD = 200_000
+DEFAULT_BINS = (200, 100)
+
+CRACKING_COLORS = {'yes': 'red', 'no': 'blue'}
+
+
+def render_mode(n_points, webgl_threshold=WEBGL_THRESHOLD, bin_threshold=BIN_THRESHOLD):
+    if n_points > bin_threshold:
+        return 'binned'
+    if n_points > webgl_threshold:
+        return 'webgl'
+    return 'svg'
+
+
+def _edges(values, n_bins):
+    low, high = np.nanmin(values), np.nanmax(values)
+    if low == high:
+        low, high = low - 0.5, high + 0.5
+    return np.linspace(low, high, n_bins + 1)
+
+
+def bin_points(df, x, y, color, facet, bins=DEFAULT_BINS):
+    '''
+    Vectorized 2-D histogram of ``x``/``y`` per facet and colour class.
+
+    All groups are counted in a single ``np.bincount`` over a combined
+    (facet, class, x bin, y bin) index. Returns a frame with one row per
+    non-empty bin: facet, class, bin centres and count.
+    '''
+    bins_x, bins_y = bins
+    frame = df[[x, y, color, facet]].dropna(subset=[x, y])
+    xs = frame[x].to_numpy(dtype='float64')
+    ys = frame[y].to_numpy(dtype='float64')
+    x_edges, y_edges = _edges(xs, bins_x), _edges(ys, bins_y)
+
+    # Bin index by scaling instead of searching the edges; the maximum lands in the last bin
+    ix = np.minimum(((xs - x_edges[0]) / (x_edges[-1] - x_edges[0]) * bins_x).astype('int64'), bins_x - 1)
+    iy = np.minimum(((ys - y_edges[0]) / (y_edges[-1] - y_edges[0]) * bins_y).astype('int64'), bins_y - 1)
+    facet_codes, facets = pd.factorize(frame[facet], sort=True)
+    class_codes, classes = pd.factorize(frame[color].astype('string').fillna('unknown'), sort=True)
+
+    n_classes = len(classes)
+    flat = ((facet_codes * n_classes + class_codes) * bins_x + ix) * bins_y + iy
+    counts = np.bincount(flat, minlength=len(facets) * n_classes * bins_x * bins_y)
+
+    cells = np.flatnonzero(counts)
+    cell_y = cells % bins_y
+    cell_x = (cells // bins_y) % bins_x
+    group = cells // (bins_y * bins_x)
+    x_centres = (x_edges[:-1] + x_edges[1:]) / 2
+    y_centres = (y_edges[:-1] + y_edges[1:]) / 2
+    return pd.DataFrame({
+        facet: np.asarray(facets)[group // n_classes],
+        color: np.asarray(classes)[group % n_classes],
+        x: x_centres[cell_x],
+        y: y_centres[cell_y],
+        'count': counts[cells],
+    })
+
+
+def _binned_figure(df, x, y, color, facet, bins, title):
+    binned = bin_points(df, x, y, color, facet, bins)
+    facets = sorted(binned[facet].unique())
+    fig = make_subplots(rows=1, cols=max(1, len(facets)), shared_yaxes=True,
+                        subplot_titles=[str(f) for f in facets], horizontal_spacing=0.02)
+
+    # Marker size and opacity on a log scale of the bin count, shared by all traces
+    log_counts = np.log1p(binned['count'].to_numpy())
+    scale = log_counts.max() if len(log_counts) and log_counts.max() > 0 else 1.0
+    binned['_size'] = 3 + 7 * log_counts / scale
+    binned['_opacity'] = 0.25 + 0.75 * log_counts / scale
+
+    for col, facet_value in enumerate(facets, start=1):
+        in_facet = binned[binned[facet] == facet_value]
+        for cls, group in in_facet.groupby(color, sort=True):
+            fig.add_trace(go.Scattergl(
+                x=group[x], y=group[y],
+                mode='markers',
+                name=str(cls),
+                legendgroup=str(cls),
+                showlegend=col == 1,
+                customdata=group['count'],
+                hovertemplate=f'{x}=%{{x:.4g}}<br>{y}=%{{y:.4g}}<br>points=%{{customdata}}<extra>{cls}</extra>',
+                marker=dict(color=CRACKING_COLORS.get(cls), size=group['_size'],
+                            opacity=group['_opacity'], symbol='square'),
+            ), row=1, col=col)
+
+    fig.update_layout(title=f"{title} ({int(binned['count'].sum()):,} points, binned)")
+    return fig
+
+
+def weld_scatter(df, x='WeldNumber', y='WeldDepthCopper', color='Cracking', facet='CrossSectionPosition',
+                 title='Weld Depth Over Weld Numbers (Faceted by Cross-Section Position)',
+                 mode=None, bins=DEFAULT_BINS):
+    '''
+    The homework_1 faceted scatter, rendered as SVG, WebGL or binned density
+    depending on the number of points (or the ``mode`` given).
+    '''
+    mode = mode or render_mode(len(df))
+
+    if mode == 'binned':
+        fig = _binned_figure(df, x, y, color, facet, bins, title)
+    else:
+        fig = px.scatter(
+            df,
+            x=x,
+            y=y,
+            color=color,
+            facet_col=facet,
+            color_discrete_map=CRACKING_COLORS,
+            render_mode='webgl' if mode == 'webgl' else 'svg',
+            title=title
+        )
+        fig.for_each_annotation(lambda a: a.update(text=a.text.split("=")[-1]))  # Simplify facet labels
+
+    fig.update_layout(
+        xaxis_title='Weld Number',
+        yaxis_title='Weld Depth (Copper)',
+        legend_title='Cracking',
+        margin=dict(t=50, l=50, r=50, b=50)
+    )
+    return fig
@@ -1,7 +1,22 @@
-from flask import Flask, request, render_template_string
+from flask import Flask, Response, g, jsonify, request, render_template_string
 from pymongo import MongoClient
-import sys, os
+from pymongo.errors import PyMongoError
+from bson import json_util
+from bson.errors import InvalidId
+import os, sys, time, threading
+import io, csv, json, math, base64, binascii, functools
+from urllib.parse import quote
 import pandas as pd
+from query_filters import FilterError, parse_filters, parse_projection, ensure_indexes, explain_summary
+from response_cache import CachedResponse, RedisBackend, ResponseCache, normalize_key
+from metrics import Registry, CommandTimer, SIZE_BUCKETS
+# Modules shared with the ETL: Homework_3/shared in the tree, copied next to this file in the image
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'shared'))
+import sampling_profiler
+import bucket_layout
+from live_feed import LiveFeed, LiveFeedFull, LiveFeedUnavailable
+import arrow_export
+import weld_model
 
 app = Flask(__name__)
 
@@ -11,26 +26,418 @@ MONGO_USER = os.getenv("MONGO_USER")
 MONGO_PASS = os.getenv("MONGO_PASS")
 MONGO_DB = os.getenv("MONGO_DB", "welding_db")
 MONGO_COLLECTION = os.getenv("MONGO_COLLECTION", "welding_data")
+MONGO_SUMMARY_COLLECTION = os.getenv("MONGO_SUMMARY_COLLECTION", "welding_summary")
+MONGO_META_COLLECTION = os.getenv("MONGO_META_COLLECTION", "etl_metadata")
+MONGO_BUCKET_COLLECTION = os.getenv("MONGO_BUCKET_COLLECTION", "welding_welds")
+
+# Layout written by the ETL: "rows" (one document per cross section) or
+# "buckets" (one per weld, flattened back into rows by /data)
+STORAGE_LAYOUT = os.getenv("STORAGE_LAYOUT", "rows")
+
+# Connection pool settings (per worker process)
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "50"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000"))
+MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "30000"))
 
-# Fail if any required credentials are missing
 if not all([MONGO_HOST, MONGO_USER, MONGO_PASS]):
     print("MongoDB credentials missing! Check .env file.")
-    sys.exit(1)
 
 # Connection string
 connection_string = f"mongodb://{MONGO_USER}:{MONGO_PASS}@{MONGO_HOST}:27017/"
 
-# Connect to MongoDB
-try:
-    client = MongoClient(connection_string, serverSelectionTimeoutMS=5000)
-    client.admin.command("ping")
-    print("Successfully connected to MongoDB")
-except Exception as e:
-    print(f"MongoDB connection failed: {e}")
-    sys.exit(1)
+# The client is created lazily in each worker process: MongoClient is not
+# fork-safe, so one created at import time must not be shared with forked workers.
+_mongo = {"pid": None, "client": None, "indexes": False}
+_mongo_lock = threading.Lock()
+
+
+def get_client():
+    pid = os.getpid()
+    if _mongo["pid"] != pid:
+        with _mongo_lock:
+            if _mongo["pid"] != pid:
+                if not all([MONGO_HOST, MONGO_USER, MONGO_PASS]):
+                    raise RuntimeError("MongoDB credentials missing")
+                _mongo["client"] = MongoClient(
+                    connection_string,
+                    maxPoolSize=MONGO_MAX_POOL_SIZE,
+                    minPoolSize=MONGO_MIN_POOL_SIZE,
+                    serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+                    connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+                    socketTimeoutMS=MONGO_SOCKET_TIMEOUT_MS,
+                    event_listeners=[CommandTimer(MONGO_SECONDS, MONGO_FAILURES)],
+                )
+                _mongo["indexes"] = False
+                _mongo["pid"] = pid
+    return _mongo["client"]
+
+
+def get_db():
+    db = get_client()[MONGO_DB]
+    if not _mongo["indexes"]:
+        # Create/verify the compound indexes used by the filters (once per process)
+        try:
+            if STORAGE_LAYOUT == "buckets":
+                names = ensure_indexes(db[MONGO_BUCKET_COLLECTION], bucket_layout.BUCKET_INDEXES)
+            else:
+                names = ensure_indexes(db[MONGO_COLLECTION])
+            print(f"Indexes verified: {', '.join(names)}")
+            _mongo["indexes"] = True
+        except Exception as e:
+            print(f"Warning: could not ensure indexes: {e}")
+    return db
+
+
+# Documents fetched per round trip and rows per streamed response chunk
+DATA_BATCH_SIZE = int(os.getenv("DATA_BATCH_SIZE", "1000"))
+
+# Rows per record batch (and Parquet row group) of /export
+EXPORT_BATCH_ROWS = int(os.getenv("EXPORT_BATCH_ROWS", "65536"))
+
+STREAM_FORMATS = {
+    "json": "application/json",
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+# -----------------------------
+# Response cache
+# -----------------------------
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+CACHE_TTL = float(os.getenv("CACHE_TTL", "300"))
+CACHE_MAX_ROWS = int(os.getenv("CACHE_MAX_ROWS", "10000"))      # larger pages are streamed uncached
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL")                   # optional shared backend
+GENERATION_CHECK_SECONDS = float(os.getenv("GENERATION_CHECK_SECONDS", "1"))
+
+# Written by transform_data.py after every successful load
+LOAD_GENERATION_ID = "load_generation"
+
+cache_backend = None
+if CACHE_REDIS_URL:
+    try:
+        cache_backend = RedisBackend(CACHE_REDIS_URL, CACHE_TTL)
+        print(f"Using shared response cache at {CACHE_REDIS_URL}")
+    except Exception as e:
+        print(f"Warning: shared cache unavailable, using in-process cache only: {e}")
+response_cache = ResponseCache(max_bytes=CACHE_MAX_BYTES, ttl=CACHE_TTL, backend=cache_backend)
+
+_generation = {"value": None, "checked_at": 0.0, "stale": False}
+
+
+def load_generation():
+    """Current ETL load generation, re-read from Mongo at most every GENERATION_CHECK_SECONDS.
+
+    When Mongo cannot be reached the last known generation is returned and
+    marked stale; with none known yet the PyMongoError is raised.
+    """
+    now = time.monotonic()
+    if now - _generation["checked_at"] >= GENERATION_CHECK_SECONDS:
+        # Failed reads are retried after the interval too, not on every request
+        _generation["checked_at"] = now
+        try:
+            doc = get_db()[MONGO_META_COLLECTION].find_one({"_id": LOAD_GENERATION_ID}, {"generation": 1})
+            _generation["value"] = doc["generation"] if doc else 0
+            _generation["stale"] = False
+        except PyMongoError:
+            _generation["stale"] = True
+            if _generation["value"] is None:
+                raise
+    if _generation["value"] is None:
+        raise PyMongoError("load generation unknown, MongoDB was not reachable")
+    return _generation["value"]
+
+
+def call_view(view, *args, **kwargs):
+    try:
+        return view(*args, **kwargs)
+    except PyMongoError as e:
+        return jsonify(error=str(e)), 503
+
+
+def cached(is_cacheable=lambda: True):
+    """Serve a view from the response cache, keyed by path and normalized query."""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if not is_cacheable():
+                return call_view(view, *args, **kwargs)
+            key = normalize_key(request.path, request.query_string)
+            try:
+                generation = load_generation()
+            except PyMongoError:
+                # Nothing to key the cache with; the view reports the Mongo error
+                return call_view(view, *args, **kwargs)
+            # A stale generation (Mongo unreachable) still serves what is cached for it
+            stale = _generation["stale"]
+            entry = response_cache.get(key, generation)
+            if entry is not None:
+                response = Response(entry.body, status=entry.status, headers=entry.headers)
+                response.headers["X-Cache"] = "STALE" if stale else "HIT"
+                return response
+
+            response = app.make_response(call_view(view, *args, **kwargs))
+            if response.status_code == 200 and not stale:
+                # Buffers a streamed body; only small pages are cacheable
+                body = response.get_data()
+                headers = {k: v for k, v in response.headers.items() if k != "Content-Length"}
+                response_cache.set(key, generation, CachedResponse(body, 200, headers))
+            response.headers["X-Cache"] = "MISS"
+            return response
+        return wrapper
+    return decorator
+
+
+def data_is_cacheable():
+    limit = request.args.get("limit", default=100, type=int)
+    return 0 < limit <= CACHE_MAX_ROWS and not request.args.get("explain")
+
+
+# -----------------------------
+# Metrics
+# -----------------------------
+# Shared directory for multi-worker metrics (see metrics.py), unset: per process
+METRICS_DIR = os.getenv("METRICS_DIR")
+
+registry = Registry(METRICS_DIR, float(os.getenv("METRICS_FLUSH_SECONDS", "1")))
+REQUEST_SECONDS = registry.histogram(
+    "welding_api_request_duration_seconds", "Request latency until the last byte is sent",
+    ["route", "method", "status"])
+RESPONSE_BYTES = registry.histogram(
+    "welding_api_response_size_bytes", "Response body size", ["route"], buckets=SIZE_BUCKETS)
+MONGO_SECONDS = registry.histogram(
+    "welding_api_mongo_command_duration_seconds", "MongoDB command round trip", ["command"])
+MONGO_FAILURES = registry.counter(
+    "welding_api_mongo_command_failures_total", "Failed MongoDB commands", ["command"])
+RENDER_SECONDS = registry.histogram(
+    "welding_api_render_duration_seconds", "DataFrame to HTML rendering", ["route"])
+# Response cache counters of this worker, added up across workers like the histograms
+registry.sampled("welding_api_cache_hits_total", "Response cache hits", "counter",
+                 lambda: {("local",): response_cache.hits, ("shared",): response_cache.shared_hits}, ["tier"])
+registry.sampled("welding_api_cache_misses_total", "Response cache misses", "counter",
+                 lambda: {(): response_cache.misses})
+registry.sampled("welding_api_cache_evictions_total", "Response cache evictions", "counter",
+                 lambda: {(): response_cache.evictions})
+registry.sampled("welding_api_cache_entries", "Entries in the in-process response caches", "gauge",
+                 lambda: {(): response_cache.stats()["entries"]})
+registry.sampled("welding_api_cache_bytes", "Bytes held by the in-process response caches", "gauge",
+                 lambda: {(): response_cache.stats()["bytes"]})
+
+# Opt-in sampling profiler (PROFILE_INTERVAL_MS), one per worker process
+profiler = sampling_profiler.start_from_env("flask_api")
+
+
+def _record_request(route, method, status, started, size):
+    REQUEST_SECONDS.observe(time.perf_counter() - started, route=route, method=method, status=status)
+    RESPONSE_BYTES.observe(size, route=route)
+    registry.flush()
+
+
+def _count_bytes(chunks, sent):
+    for chunk in chunks:
+        sent[0] += len(chunk)
+        yield chunk
+
+
+@app.before_request
+def start_timer():
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def record_request(response):
+    started = g.pop("request_started", None)
+    if started is None:
+        return response
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    args = (route, request.method, str(response.status_code), started)
+    if response.is_streamed:
+        # Streamed bodies are produced after this hook: count the encoded bytes
+        # as they are sent and record once the response is closed
+        sent = [0]
+        response.response = _count_bytes(response.iter_encoded(), sent)
+        response.call_on_close(lambda: _record_request(*args, sent[0]))
+    else:
+        _record_request(*args, response.calculate_content_length() or 0)
+    return response
+
+
+# -----------------------------
+# Live feed
+# -----------------------------
+LIVE_POLL_SECONDS = float(os.getenv("LIVE_POLL_SECONDS", "1"))          # watermark poll / change stream wait
+LIVE_QUEUE_SIZE = int(os.getenv("LIVE_QUEUE_SIZE", "100"))              # batches buffered per subscriber
+LIVE_HEARTBEAT_SECONDS = float(os.getenv("LIVE_HEARTBEAT_SECONDS", "15"))
+# Every open feed holds a server thread: by default half of a worker's gunicorn threads (WEB_THREADS)
+LIVE_MAX_SUBSCRIBERS = int(os.getenv("LIVE_MAX_SUBSCRIBERS", str(max(1, int(os.getenv("WEB_THREADS", "4")) // 2))))
+LIVE_RETRY_SECONDS = float(os.getenv("LIVE_RETRY_SECONDS", "60"))       # refusal after the feed was unavailable
+LIVE_SETTLE_SECONDS = float(os.getenv("LIVE_SETTLE_SECONDS", "10"))     # window re-checked behind the watermark
+
+# One upstream cursor per worker, shared by all /live subscribers
+live_feed = LiveFeed(
+    lambda: get_db()[MONGO_BUCKET_COLLECTION if STORAGE_LAYOUT == "buckets" else MONGO_COLLECTION],
+    layout=STORAGE_LAYOUT,
+    poll_seconds=LIVE_POLL_SECONDS,
+    batch_size=DATA_BATCH_SIZE,
+    queue_size=LIVE_QUEUE_SIZE,
+    max_subscribers=LIVE_MAX_SUBSCRIBERS,
+    retry_seconds=LIVE_RETRY_SECONDS,
+    settle_seconds=LIVE_SETTLE_SECONDS,
+)
+
+
+# -----------------------------
+# Weld quality model
+# -----------------------------
+PREDICT_MAX_ROWS = int(os.getenv("PREDICT_MAX_ROWS", "10000"))            # rows per request
+PREDICT_BATCH_ROWS = int(os.getenv("PREDICT_BATCH_ROWS", "4096"))        # rows per coalesced batch
+PREDICT_MAX_WAIT_MS = float(os.getenv("PREDICT_MAX_WAIT_MS", "0"))       # extra wait for requests per batch
+PREDICT_TRAIN_DOCS = int(os.getenv("PREDICT_TRAIN_DOCS", "200000"))      # larger collections are sampled
+PREDICT_TIMEOUT = float(os.getenv("PREDICT_TIMEOUT", "30"))
+PREDICT_RETRY_SECONDS = float(os.getenv("PREDICT_RETRY_SECONDS", "60"))  # wait after a failed training
+
+# Fitted model of the current load generation, shared by the workers through the meta collection
+MODEL_ID = "weld_model"
+
+
+def training_frame():
+    fields = weld_model.FACTORS + [weld_model.DEPTH, weld_model.CRACKING]
+    buckets = STORAGE_LAYOUT == "buckets"
+    collection = get_db()[MONGO_BUCKET_COLLECTION if buckets else MONGO_COLLECTION]
+    projection = bucket_layout.bucket_projection(fields, {}) if buckets else {field: 1 for field in fields}
+    if collection.estimated_document_count() > PREDICT_TRAIN_DOCS:
+        cursor = collection.aggregate([{"$sample": {"size": PREDICT_TRAIN_DOCS}}, {"$project": projection}],
+                                      batchSize=DATA_BATCH_SIZE)
+    else:
+        cursor = collection.find({}, projection).batch_size(DATA_BATCH_SIZE)
+    try:
+        rows = bucket_layout.flatten(cursor, fields=set(fields)) if buckets else cursor
+        return pd.DataFrame(list(rows), columns=fields)
+    finally:
+        cursor.close()
+
+
+def load_model(generation):
+    # Models saved before the depth interactions were selected are trained again
+    doc = get_db()[MONGO_META_COLLECTION].find_one({"_id": MODEL_ID, "generation": generation,
+                                                    "pairs": {"$exists": True}})
+    return weld_model.WeldModel.from_document(doc) if doc else None
+
+
+def train_model(generation):
+    model = weld_model.WeldModel.fit(training_frame(), generation)
+    get_db()[MONGO_META_COLLECTION].replace_one({"_id": MODEL_ID}, model.to_document(), upsert=True)
+    return model
+
+
+weld_models = weld_model.ModelCache(load_model, train_model, retry_after=PREDICT_RETRY_SECONDS)
+predict_batcher = weld_model.MicroBatcher(lambda model, factors: model.predict(factors),
+                                          max_rows=PREDICT_BATCH_ROWS, max_wait=PREDICT_MAX_WAIT_MS / 1000)
+
+
+# -----------------------------
+# Cursor (keyset) pagination
+# -----------------------------
+def encode_cursor(last_id):
+    """Opaque page token holding the last _id of the previous page."""
+    raw = json_util.dumps({"after": last_id}).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    padded = token + "=" * (-len(token) % 4)
+    return json_util.loads(base64.urlsafe_b64decode(padded))["after"]
+
+
+def page_bounds(collection, query, limit):
+    """Return the last _id of the page and whether another page follows.
+
+    Only walks the _id index, so it is cheap compared to fetching the page and
+    lets the next-page token go into the response headers before streaming.
+    """
+    if limit <= 0:
+        return None, False
+    ids = list(collection.find(query, {"_id": 1}).sort("_id", 1).skip(limit - 1).limit(2))
+    if not ids:
+        return None, False
+    return ids[0]["_id"], len(ids) == 2
+
+
+def bucket_page(collection, query, projection, row_filter, fields, start, limit):
+    """Cursor over the weld buckets of a page, its row flattener and the next page token.
+
+    Pages hold ``limit`` rows, so they may start and end inside a bucket; the
+    token is the position of the last row sent.
+    """
+    end, has_more = None, False
+    if limit > 0:
+        bounds = {"n": 1, **{short: 1 for short in row_filter}}
+        bounds_cursor = collection.find(query, bounds).sort("_id", 1).batch_size(DATA_BATCH_SIZE)
+        end, has_more = bucket_layout.page_end(bounds_cursor, row_filter, start, limit)
+        if end is None:
+            query["_id"] = {**query.get("_id", {}), "$in": []}
+        else:
+            query["_id"] = {**query.get("_id", {}), "$lte": end["_id"]}
+    cursor = collection.find(query, projection).sort("_id", 1).batch_size(DATA_BATCH_SIZE)
+    flatten = functools.partial(bucket_layout.flatten, row_filter=row_filter, start=start, end=end, fields=fields)
+    return cursor, flatten, encode_cursor(end) if has_more else None
+
+
+def next_page_url(token):
+    # Built from the raw query string so range filters like power>=1200 survive
+    params = [quote(p, safe="=%,.-_~") for p in request.query_string.decode().split("&")
+              if p and not p.startswith("next=")]
+    return f"{request.path}?{'&'.join(params + ['next=' + token])}"
+
+
+def iter_rows(cursor, flatten=None):
+    # flatten turns the cursor's documents into rows (bucket layout)
+    try:
+        for doc in (cursor if flatten is None else flatten(cursor)):
+            doc.pop("_id", None)
+            # NaN is not valid JSON, missing measurements become null
+            yield {k: None if isinstance(v, float) and math.isnan(v) else v for k, v in doc.items()}
+    finally:
+        cursor.close()
+
+
+def stream_json(rows, next_token):
+    yield '{"data": ['
+    buffer = []
+    for i, row in enumerate(rows):
+        buffer.append(("," if i else "") + json.dumps(row, default=str))
+        if len(buffer) >= DATA_BATCH_SIZE:
+            yield "".join(buffer)
+            buffer = []
+    yield "".join(buffer)
+    yield '], "next": ' + json.dumps(next_token) + "}"
+
+
+def stream_ndjson(rows):
+    buffer = []
+    for row in rows:
+        buffer.append(json.dumps(row, default=str) + "\n")
+        if len(buffer) >= DATA_BATCH_SIZE:
+            yield "".join(buffer)
+            buffer = []
+    yield "".join(buffer)
+
 
-db = client[MONGO_DB]
-collection = db[MONGO_COLLECTION]
+def stream_csv(rows):
+    # Header comes from the first document, later extra fields are dropped
+    out = io.StringIO()
+    writer = None
+    for i, row in enumerate(rows, start=1):
+        if writer is None:
+            writer = csv.DictWriter(out, fieldnames=list(row), extrasaction="ignore")
+            writer.writeheader()
+        writer.writerow(row)
+        if i % DATA_BATCH_SIZE == 0:
+            yield out.getvalue()
+            out.seek(0)
+            out.truncate()
+    yield out.getvalue()
 
 
 @app.route("/", methods=["GET"])
@@ -41,22 +448,124 @@ def home():
     <ul>
         <li><a href="/data">/data</a> - View welding data in a table (default limit: 100)</li>
         <li>/data?limit=10 - View first 10 records</li>
+        <li>/data?format=json|ndjson|csv - Stream records as JSON, NDJSON or CSV</li>
+        <li>/data?next=&lt;token&gt; - Fetch the next page (token from the <code>next</code> field or
+            the <code>X-Next-Cursor</code> header)</li>
+        <li>/data?cracking=yes&amp;power=1200 - Filter by process factors (power, speed, gas_flow, focal,
+            angle, thickness, cracking, block, weld, version), also <code>power&gt;=1200</code> or
+            <code>thickness=0.6,0.7</code></li>
+        <li>/data?fields=power,cracking - Return only the listed fields</li>
+        <li>/data?cracking=yes&amp;explain=1 - Show whether the query is served by an index</li>
+        <li>/export?format=arrow|arrows|parquet - Download the (filtered) data as an Arrow IPC file,
+            Arrow stream or Parquet; also <code>fields</code> and <code>limit</code></li>
+        <li>POST /predict - Predicted copper weld depth and cracking probability for process factors,
+            one JSON object or a list: <code>{"power": 1200, "speed": 1, "gas_flow": 15, "focal": 0,
+            "angle": 0, "thickness": 0.6}</code>; GET shows the model version</li>
+        <li>/live?cracking=yes - Server-sent events with the rows written by the ETL from now on
+            (same filters as <code>/data</code>)</li>
+        <li><a href="/summary">/summary</a> - Per parameter combination statistics
+            (<code>level=block</code> for per block, <code>format=json</code>)</li>
+        <li><a href="/metrics">/metrics</a> - Prometheus metrics: request latency and size per route,
+            MongoDB command timings, HTML rendering time, cache counters</li>
+        <li>/debug/profile - Sampled stacks of this worker (with <code>PROFILE_INTERVAL_MS</code> set)</li>
+        <li><a href="/healthz">/healthz</a> - Liveness (the process is serving requests)</li>
+        <li><a href="/readyz">/readyz</a> - Readiness (MongoDB is reachable)</li>
     </ul>
     """
 
 
 @app.route("/data", methods=["GET"])
+@cached(data_is_cacheable)
 def get_welding_data():
     limit = request.args.get("limit", default=100, type=int)
+    fmt = request.args.get("format", default="html")
+    token = request.args.get("next")
+
+    if fmt != "html" and fmt not in STREAM_FORMATS:
+        return f"<p>Error: unknown format '{fmt}'</p>", 400
+
     try:
-        # Fetch data from MongoDB
-        data = list(collection.find({}, {"_id": 0}).limit(limit))
+        query = parse_filters(request.query_string)
+    except FilterError as e:
+        return f"<p>Error: {e}</p>", 400
+    projection = parse_projection(request.args.get("fields"))
+
+    buckets = STORAGE_LAYOUT == "buckets"
+    if buckets:
+        fields = set(projection) - {"_id"} if projection else None
+        query, row_filter = bucket_layout.split_query(query)
+        projection = bucket_layout.bucket_projection(projection, row_filter)
+
+    collection = get_db()[MONGO_BUCKET_COLLECTION if buckets else MONGO_COLLECTION]
+    if request.args.get("explain"):
+        cursor = collection.find(query, projection).sort("_id", 1)
+        if limit > 0:
+            cursor = cursor.limit(limit)
+        try:
+            summary = explain_summary(cursor)
+        except PyMongoError as e:
+            # MongoDB unreachable or refusing the explain: same answer as /readyz
+            return jsonify(error=str(e)), 503
+        except Exception as e:
+            return jsonify(error=str(e)), 500
+        return jsonify(query=json.loads(json_util.dumps(query)), **summary)
+
+    start = None
+    if token:
+        try:
+            start = decode_cursor(token)
+            if buckets:
+                # Bucket tokens point at a row inside a weld: {_id, i}
+                query["_id"] = {"$gte": start["_id"]}
+                int(start["i"])
+            else:
+                query["_id"] = {"$gt": start}
+        except (ValueError, KeyError, TypeError, binascii.Error, InvalidId):
+            return "<p>Error: invalid page token</p>", 400
+
+    try:
+        if buckets:
+            cursor, flatten, next_token = bucket_page(collection, query, projection, row_filter, fields,
+                                                      start, limit)
+        else:
+            last_id, has_more = page_bounds(collection, query, limit)
+            next_token = encode_cursor(last_id) if has_more else None
+            if last_id is not None:
+                # Bound the page by _id so it matches the token even under concurrent inserts
+                query["_id"] = {**query.get("_id", {}), "$lte": last_id}
+
+            cursor = collection.find(query, projection).sort("_id", 1).batch_size(DATA_BATCH_SIZE)
+            if last_id is None and limit > 0:
+                cursor = cursor.limit(limit)
+            flatten = None
+        rows = iter_rows(cursor, flatten)
+
+        if fmt in STREAM_FORMATS:
+            if fmt == "json":
+                body = stream_json(rows, next_token)
+            elif fmt == "ndjson":
+                body = stream_ndjson(rows)
+            else:
+                body = stream_csv(rows)
+            response = Response(body, mimetype=STREAM_FORMATS[fmt])
+            if next_token:
+                response.headers["X-Next-Cursor"] = next_token
+                next_url = next_page_url(next_token)
+                response.headers["Link"] = f'<{next_url}>; rel="next"'
+            return response
+
+        data = list(rows)
         if not data:
             return "<p>No data found.</p>"
 
         # Convert to pandas DataFrame for easy HTML table rendering
-        df = pd.DataFrame(data)
-        html_table = df.to_html(classes="table table-striped", index=False)
+        with RENDER_SECONDS.time(route="/data"):
+            df = pd.DataFrame(data)
+            html_table = df.to_html(classes="table table-striped", index=False)
+        next_link = ""
+        if next_token:
+            next_url = next_page_url(next_token)
+            next_link = f'<a class="btn btn-primary" href="{next_url}">Next page</a>'
 
         # Render simple HTML page with table
         html = f"""
@@ -67,13 +576,224 @@ def get_welding_data():
             <body style="margin:20px;">
                 <h2>Welding Data (showing {len(data)} records)</h2>
                 {html_table}
+                {next_link}
             </body>
         </html>
         """
         return render_template_string(html)
     except Exception as e:
+        if fmt in STREAM_FORMATS:
+            return jsonify(error=str(e)), 500
         return f"<p>Error: {str(e)}</p>", 500
 
 
+@app.route("/export", methods=["GET"])
+def export():
+    fmt = request.args.get("format", default="arrow")
+    limit = request.args.get("limit", default=0, type=int)
+    if fmt not in arrow_export.FORMATS:
+        return f"<p>Error: format must be one of {', '.join(arrow_export.FORMATS)}</p>", 400
+
+    try:
+        query = parse_filters(request.query_string)
+    except FilterError as e:
+        return f"<p>Error: {e}</p>", 400
+    projection = parse_projection(request.args.get("fields"))
+    schema = arrow_export.export_schema(set(projection) if projection else None)
+    if not schema.names:
+        return "<p>Error: none of the fields can be exported</p>", 400
+    # Only the exported fields leave the server
+    projection = {name: 1 for name in schema.names}
+
+    try:
+        if STORAGE_LAYOUT == "buckets":
+            query, row_filter = bucket_layout.split_query(query)
+            projection = bucket_layout.bucket_projection(projection, row_filter)
+            cursor = get_db()[MONGO_BUCKET_COLLECTION].find(query, projection).batch_size(DATA_BATCH_SIZE)
+            columns = arrow_export.bucket_columns(cursor, schema.names, EXPORT_BATCH_ROWS, row_filter)
+        else:
+            projection["_id"] = 0
+            cursor = get_db()[MONGO_COLLECTION].find(query, projection).batch_size(DATA_BATCH_SIZE)
+            if limit > 0:
+                cursor = cursor.limit(limit)
+            columns = arrow_export.row_columns(cursor, schema.names, EXPORT_BATCH_ROWS)
+        if limit > 0:
+            columns = arrow_export.limit_rows(columns, limit)
+        batches = arrow_export.record_batches(columns, schema)
+        mimetype, extension = arrow_export.FORMATS[fmt]
+        return Response(arrow_export.stream(batches, schema, fmt, cursor), mimetype=mimetype,
+                        headers={"Content-Disposition": f"attachment; filename=welding_data.{extension}"})
+    except Exception as e:
+        return f"<p>Error: {str(e)}</p>", 500
+
+
+SUMMARY_LEVELS = ("combination", "block")
+
+
+def summary_row(doc):
+    """Flatten a summary document and derive mean, std and crack rate."""
+    row = {k: v for k, v in doc.items() if k != "_id" and not isinstance(v, dict)}
+    row["crack_rate"] = doc["cracked"] / doc["count"] if doc.get("count") else None
+    for field, stats in doc.items():
+        if field == "_id" or not isinstance(stats, dict) or not stats.get("n"):
+            continue
+        n = stats["n"]
+        mean = stats["sum"] / n
+        variance = (stats["sumsq"] - n * mean ** 2) / (n - 1) if n > 1 else 0.0
+        row[f"{field}_mean"] = mean
+        row[f"{field}_std"] = math.sqrt(max(variance, 0.0))
+        row[f"{field}_min"] = stats["min"]
+        row[f"{field}_max"] = stats["max"]
+    return row
+
+
+@app.route("/summary", methods=["GET"])
+@cached()
+def get_summary():
+    level = request.args.get("level", default="combination")
+    fmt = request.args.get("format", default="html")
+    if level not in SUMMARY_LEVELS:
+        return f"<p>Error: level must be one of {', '.join(SUMMARY_LEVELS)}</p>", 400
+
+    try:
+        query = parse_filters(request.query_string)
+    except FilterError as e:
+        return f"<p>Error: {e}</p>", 400
+
+    try:
+        query["level"] = level
+        rows = [summary_row(doc) for doc in get_db()[MONGO_SUMMARY_COLLECTION].find(query)]
+        if fmt == "json":
+            return jsonify(level=level, data=rows)
+        if not rows:
+            return "<p>No summary found. Run the ETL first.</p>"
+
+        with RENDER_SECONDS.time(route="/summary"):
+            html_table = pd.DataFrame(rows).to_html(classes="table table-striped", index=False,
+                                                    float_format=lambda v: f"{v:.2f}")
+        html = f"""
+        <html>
+            <head>
+                <link rel="stylesheet" href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.min.css">
+            </head>
+            <body style="margin:20px;">
+                <h2>Welding Summary per {level} ({len(rows)} groups)</h2>
+                {html_table}
+            </body>
+        </html>
+        """
+        return render_template_string(html)
+    except Exception as e:
+        return f"<p>Error: {str(e)}</p>", 500
+
+
+@app.route("/live", methods=["GET"])
+def live():
+    try:
+        query = parse_filters(request.query_string)
+    except FilterError as e:
+        return f"<p>Error: {e}</p>", 400
+
+    try:
+        subscription = live_feed.subscribe(query)
+    except LiveFeedFull as e:
+        return jsonify(error=str(e)), 503, {"Retry-After": str(math.ceil(LIVE_POLL_SECONDS * 5))}
+    except LiveFeedUnavailable as e:
+        return jsonify(error=str(e)), 503, {"Retry-After": str(math.ceil(LIVE_RETRY_SECONDS))}
+
+    def events():
+        try:
+            yield "retry: 2000\n\n"
+            yield from subscription.events(LIVE_HEARTBEAT_SECONDS)
+        finally:
+            live_feed.unsubscribe(subscription)
+
+    return Response(events(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.route("/predict", methods=["GET", "POST"])
+def predict():
+    try:
+        model = weld_models.current(load_generation())
+    except weld_model.ModelUnavailable as e:
+        return jsonify(error=f"model unavailable: {e}"), 503, {"Retry-After": str(math.ceil(e.retry_after))}
+    except Exception as e:
+        return jsonify(error=f"model unavailable: {e}"), 503
+    if request.method == "GET":
+        return jsonify(model.describe())
+
+    payload = request.get_json(silent=True)
+    try:
+        factors, single = weld_model.parse_rows(payload, PREDICT_MAX_ROWS)
+    except weld_model.PredictError as e:
+        return jsonify(error=str(e)), 400
+
+    try:
+        depth, prob = predict_batcher.submit(model, factors).result(timeout=PREDICT_TIMEOUT)
+    except Exception as e:
+        return jsonify(error=str(e)), 500
+    n = len(factors)
+    depth = [None] * n if depth is None else depth.tolist()
+    prob = [None] * n if prob is None else prob.tolist()
+    predictions = [{weld_model.DEPTH: d, "crack_probability": p} for d, p in zip(depth, prob)]
+    body = {"model": model.version, **predictions[0]} if single else {"model": model.version,
+                                                                      "predictions": predictions}
+    # json.dumps is cheaper than jsonify for large bulk responses
+    return Response(json.dumps(body), mimetype="application/json")
+
+
+@app.route("/healthz", methods=["GET"])
+def healthz():
+    return jsonify(status="ok")
+
+
+@app.route("/readyz", methods=["GET"])
+def readyz():
+    try:
+        get_client().admin.command("ping")
+    except Exception as e:
+        return jsonify(status="unavailable", error=str(e)), 503
+    return jsonify(status="ready", pid=os.getpid())
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    lines = registry.render() + [
+        "# TYPE welding_api_live_subscribers gauge",
+        f"welding_api_live_subscribers {live_feed.subscribers()}",
+        "# TYPE welding_api_live_rows_published_total counter",
+        f"welding_api_live_rows_published_total {live_feed.published}",
+        "# TYPE welding_api_live_subscribers_dropped_total counter",
+        f"welding_api_live_subscribers_dropped_total {live_feed.dropped}",
+        "# TYPE welding_api_live_subscribers_refused_total counter",
+        f"welding_api_live_subscribers_refused_total {live_feed.refused}",
+        "# TYPE welding_api_live_late_rows_total counter",
+        f"welding_api_live_late_rows_total {live_feed.late}",
+        "# TYPE welding_api_predict_batches_total counter",
+        f"welding_api_predict_batches_total {predict_batcher.batches}",
+        "# TYPE welding_api_predict_rows_total counter",
+        f"welding_api_predict_rows_total {predict_batcher.rows}",
+        "# TYPE welding_api_model_failures_total counter",
+        f"welding_api_model_failures_total {weld_models.failures}",
+        "# TYPE welding_api_model_generation gauge",
+        f"welding_api_model_generation {weld_models.model.generation if weld_models.model else -1}",
+        "# TYPE welding_api_load_generation gauge",
+        f"welding_api_load_generation {_generation['value'] or 0}",
+    ]
+    return Response("\n".join(lines) + "\n", mimetype="text/plain; version=0.0.4")
+
+
+@app.route("/debug/profile", methods=["GET"])
+def profile():
+    # Folded stacks collected so far in this worker (flamegraph.pl / speedscope)
+    if profiler is None:
+        return "<p>Profiler disabled, set PROFILE_INTERVAL_MS</p>", 404
+    return Response(profiler.folded(), mimetype="text/plain",
+                    headers={"X-Profile-Samples": str(profiler.samples),
+                             "X-Profile-Overhead": f"{profiler.overhead():.4f}"})
+
+
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=5000, debug=True)
+    # Development server only (production runs gunicorn); FLASK_DEBUG=1 enables the debugger and reloader
+    app.run(host="0.0.0.0", port=5000, debug=os.getenv("FLASK_DEBUG", "0") == "1")
@@ -0,0 +1,155 @@
+import itertools
+import pyarrow as pa
+import pyarrow.parquet as pq
+import bucket_layout
+
+'''
+Columnar export of the welding data as Arrow IPC or Parquet.
+
+Documents are read from the cursor straight into per-column lists and turned
+into typed record batches of about EXPORT_BATCH_ROWS rows, which are written to
+the response as soon as they are encoded. No DataFrame or per-row dict is
+built, and memory stays bounded by one batch whatever the size of the export.
+Weld buckets are even cheaper to export: their arrays are appended to the
+columns as they are.
+
+Formats:
+
+    arrow    Arrow IPC file (Feather v2), can be memory-mapped by the client:
+             pyarrow.ipc.open_file(pyarrow.memory_map("welding.arrow"))
+    arrows   Arrow IPC stream, readable while it downloads
+    parquet  Parquet, one row group per batch
+'''
+
+# Export column -> Arrow type, in row layout order
+EXPORT_FIELDS = {
+    'Block': pa.int64(),
+    'Power': pa.float64(),
+    'WeldingSpeed': pa.float64(),
+    'GasFlowRate': pa.float64(),
+    'FocalPosition': pa.float64(),
+    'AngularPosition': pa.float64(),
+    'MaterialThickness': pa.float64(),
+    'WeldNumber': pa.int64(),
+    'CrossSectionPosition': pa.float64(),
+    'Cracking': pa.string(),
+    'WeldWidthSteel': pa.float64(),
+    'WeldWidthCopper': pa.float64(),
+    'WeldDepthCopper': pa.float64(),
+    'Gap': pa.float64(),
+    'CrackCount': pa.float64(),
+    'AvgCrackLength': pa.float64(),
+    'CopperDilution': pa.float64(),
+    'SourceVersion': pa.string(),
+    'SourceFile': pa.string(),
+}
+
+FORMATS = {
+    'arrow': ('application/vnd.apache.arrow.file', 'arrow'),
+    'arrows': ('application/vnd.apache.arrow.stream', 'arrows'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+
+def export_schema(fields=None):
+    """Schema of the export, restricted to ``fields`` (canonical names) if given."""
+    return pa.schema([(name, kind) for name, kind in EXPORT_FIELDS.items() if fields is None or name in fields])
+
+
+class _Chunks:
+    """Write-only file object collecting what the Arrow/Parquet writers produce."""
+
+    def __init__(self):
+        self.parts = []
+        self.closed = False
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self):
+        data = b"".join(self.parts)
+        self.parts = []
+        return data
+
+
+def row_columns(docs, names, batch_rows):
+    """Column lists of ``batch_rows`` rows from row layout documents."""
+    docs = iter(docs)
+    while True:
+        batch = list(itertools.islice(docs, batch_rows))
+        if not batch:
+            return
+        # One pass per column is about 3x faster than appending field by field
+        yield {name: [doc.get(name) for doc in batch] for name in names}
+
+
+def bucket_columns(docs, names, batch_rows, row_filter=None):
+    """Column lists of about ``batch_rows`` rows from weld buckets, without building rows."""
+    columns, count = {name: [] for name in names}, 0
+    for doc in docs:
+        n = doc.get('n', 0)
+        indices = bucket_layout.matching_rows(doc, row_filter) if row_filter else None
+        rows = n if indices is None else len(indices)
+        if not rows:
+            continue
+        for name in names:
+            short = bucket_layout.ROW_FIELDS.get(name)
+            if short is None:
+                columns[name] += [doc.get(name)] * rows
+                continue
+            values = doc.get(short) or []
+            if len(values) < n:
+                values = values + [None] * (n - len(values))
+            columns[name] += values[:n] if indices is None else [values[i] for i in indices]
+        count += rows
+        if count >= batch_rows:
+            yield columns
+            columns, count = {name: [] for name in names}, 0
+    if count:
+        yield columns
+
+
+def limit_rows(column_batches, limit):
+    """Truncate column batches after ``limit`` rows in total."""
+    for columns in column_batches:
+        rows = len(next(iter(columns.values())))
+        if rows >= limit:
+            yield {name: values[:limit] for name, values in columns.items()}
+            return
+        limit -= rows
+        yield columns
+
+
+def record_batches(column_batches, schema):
+    for columns in column_batches:
+        arrays = [pa.array(columns[field.name], type=field.type, from_pandas=True) for field in schema]
+        yield pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def stream(batches, schema, fmt, cursor=None, compression='snappy'):
+    """Encoded chunks of the export, one per record batch (closes ``cursor`` when done)."""
+    sink = _Chunks()
+    if fmt == 'parquet':
+        writer = pq.ParquetWriter(sink, schema, compression=compression)
+    elif fmt == 'arrows':
+        writer = pa.ipc.new_stream(sink, schema)
+    else:
+        writer = pa.ipc.new_file(sink, schema)
+    try:
+        for batch in batches:
+            writer.write_batch(batch)
+            data = sink.take()
+            if data:
+                yield data
+        writer.close()
+        yield sink.take()
+    finally:
+        if cursor is not None:
+            cursor.close()
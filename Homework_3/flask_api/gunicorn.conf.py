@@ -0,0 +1,29 @@
+import os
+import multiprocessing
+
+# Production runtime for the Welding Data API:
+#   gunicorn -c gunicorn.conf.py app:app
+# Every worker creates its own MongoClient on first use (see app.get_client).
+
+bind = os.getenv("BIND", "0.0.0.0:5000")
+workers = int(os.getenv("WEB_CONCURRENCY", str(multiprocessing.cpu_count() * 2 + 1)))
+worker_class = "gthread"
+threads = int(os.getenv("WEB_THREADS", "4"))
+timeout = int(os.getenv("WEB_TIMEOUT", "60"))
+keepalive = 5
+
+# Recycle workers now and then to cap memory growth
+max_requests = int(os.getenv("WEB_MAX_REQUESTS", "10000"))
+max_requests_jitter = 1000
+
+accesslog = "-"
+errorlog = "-"
+
+
+def on_starting(server):
+    # Worker metric files of a previous run would be added to the new totals
+    metrics_dir = os.getenv("METRICS_DIR")
+    if metrics_dir and os.path.isdir(metrics_dir):
+        for name in os.listdir(metrics_dir):
+            if name.startswith("metrics_") and name.endswith(".json"):
+                os.remove(os.path.join(metrics_dir, name))
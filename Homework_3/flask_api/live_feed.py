@@ -0,0 +1,306 @@
+import json
+import math
+import queue
+import threading
+import time
+from datetime import timedelta
+from bson import ObjectId
+from pymongo.errors import OperationFailure
+import bucket_layout
+
+'''
+Live feed of newly written welding rows, shared by all subscribers of a worker.
+
+One upstream thread per worker process follows the collection and fans every
+batch of new rows out to the subscribers:
+
+    - with a replica set it opens a MongoDB change stream (inserts, replaced
+      rows, and rows appended to weld buckets in the bucket layout),
+    - otherwise it polls for _ids above a watermark, which follows the
+      ObjectId _ids written by the batch and stream loads of the row layout.
+      The stream load inserts from several threads, so a batch with lower
+      _ids can become visible after a later one moved the watermark: the
+      last ``settle_seconds`` of _ids behind the watermark are counted on
+      every poll and, when rows appeared there, re-read and the unseen ones
+      published. Rows that show up later than that are missed.
+
+The watermark cannot see rows with the hashed _ids of incremental loads or
+appends to weld buckets. In those cases the feed is closed with an
+"unavailable" event naming the reason, and new subscribers are refused
+(LiveFeedUnavailable) for ``retry_seconds``.
+
+Every subscriber keeps a server thread busy, so a worker accepts at most
+``max_subscribers`` of them (LiveFeedFull beyond that).
+
+Each subscriber has a bounded queue. The upstream never waits for a
+subscriber: one whose queue is full is dropped with an "overflow" event and
+reconnects. The thread starts with the first subscriber and stops after the
+last one left, so idle workers hold no cursor.
+'''
+
+CHANGE_STREAM_UNSUPPORTED = 40573    # "The $changeStream stage is only supported on replica sets"
+
+# Control messages put on subscriber queues next to row batches
+OVERFLOW = "overflow"
+UNAVAILABLE = "unavailable"
+
+NO_REPLICA_SET_BUCKETS = "the bucket layout needs a replica set (change streams) for the live feed"
+NO_REPLICA_SET_HASHED_IDS = ("the collection holds rows of incremental loads (hashed _ids), which the _id "
+                             "watermark cannot follow; the live feed needs a replica set (change streams)")
+
+
+class LiveFeedUnavailable(RuntimeError):
+    pass
+
+
+class LiveFeedFull(RuntimeError):
+    pass
+
+
+def clean_row(doc):
+    # Same row shape as /data: no _id, NaN as null
+    doc.pop("_id", None)
+    return {k: None if isinstance(v, float) and math.isnan(v) else v for k, v in doc.items()}
+
+
+def row_matches(row, query):
+    return all(bucket_layout.condition_matches(row.get(field), condition) for field, condition in query.items())
+
+
+class Subscription:
+
+    def __init__(self, query, queue_size):
+        self.query = query
+        self.queue = queue.Queue(queue_size)
+        self.reason = None        # why the feed closed, sent with the "unavailable" event
+
+    def offer(self, item):
+        """Queue an item without blocking; False if the subscriber fell behind."""
+        try:
+            self.queue.put_nowait(item)
+            return True
+        except queue.Full:
+            return False
+
+    def events(self, heartbeat_seconds):
+        """Server-sent events for the subscriber, with comment heartbeats while idle."""
+        while True:
+            try:
+                item = self.queue.get(timeout=heartbeat_seconds)
+            except queue.Empty:
+                yield ": keepalive\n\n"
+                continue
+            if item in (OVERFLOW, UNAVAILABLE):
+                data = json.dumps({"error": self.reason}) if self.reason else "{}"
+                yield f"event: {item}\ndata: {data}\n\n"
+                return
+            rows, encoded, last_id = item
+            if self.query:
+                rows = [row for row in rows if row_matches(row, self.query)]
+                if not rows:
+                    continue
+                encoded = json.dumps(rows, default=str)
+            yield f"id: {last_id}\nevent: rows\ndata: {encoded}\n\n"
+
+
+class LiveFeed:
+
+    def __init__(self, get_collection, layout="rows", poll_seconds=1.0, batch_size=1000, queue_size=100,
+                 max_subscribers=2, retry_seconds=60.0, settle_seconds=10.0):
+        self.get_collection = get_collection
+        self.layout = layout
+        self.poll_seconds = poll_seconds
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self.retry_seconds = retry_seconds
+        self.settle_seconds = settle_seconds
+        self.mode = None          # "change_stream" or "watermark" once the upstream runs
+        self.published = 0        # rows fanned out
+        self.dropped = 0          # subscribers dropped for falling behind
+        self.refused = 0          # subscribers turned away (feed full or unavailable)
+        self.late = 0             # rows found behind the watermark (committed out of _id order)
+        self._unavailable = None  # (reason, retry at) while no upstream can follow the collection
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def subscribe(self, query=None):
+        subscription = Subscription(query or {}, self.queue_size)
+        with self._lock:
+            if self._unavailable is not None and time.monotonic() < self._unavailable[1]:
+                self.refused += 1
+                raise LiveFeedUnavailable(self._unavailable[0])
+            if len(self._subscribers) >= self.max_subscribers:
+                self.refused += 1
+                raise LiveFeedFull(f"at most {self.max_subscribers} live feeds per worker")
+            self._subscribers.add(subscription)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="live-feed", daemon=True)
+                self._thread.start()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def subscribers(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    def _active(self):
+        # Called by the upstream thread: it exits (and releases its cursor) once nobody listens
+        with self._lock:
+            if not self._subscribers:
+                self._thread = None
+                return False
+            return True
+
+    def publish(self, rows, last_id):
+        if not rows:
+            return
+        # Encoded once for all subscribers without a filter
+        item = (rows, json.dumps(rows, default=str), last_id)
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            if not subscription.offer(item):
+                self.unsubscribe(subscription)
+                self.dropped += 1
+                # Make room for the overflow notice; the rows are lost for this subscriber
+                while not subscription.offer(OVERFLOW):
+                    try:
+                        subscription.queue.get_nowait()
+                    except queue.Empty:
+                        pass
+        self.published += len(rows)
+
+    def _close_all(self, item, reason=None):
+        with self._lock:
+            subscribers, self._subscribers = list(self._subscribers), set()
+            self._thread = None
+            if reason is not None:
+                self._unavailable = (reason, time.monotonic() + self.retry_seconds)
+        for subscription in subscribers:
+            subscription.reason = reason
+            while not subscription.offer(item):
+                try:
+                    subscription.queue.get_nowait()
+                except queue.Empty:
+                    pass
+
+    def _run(self):
+        try:
+            collection = self.get_collection()
+            try:
+                self._watch(collection)
+            except OperationFailure as e:
+                if e.code != CHANGE_STREAM_UNSUPPORTED:
+                    raise
+                if self.layout == "buckets":
+                    self._refuse(NO_REPLICA_SET_BUCKETS)
+                    return
+                print("Live feed: no replica set, tailing new _ids instead of a change stream")
+                self._tail(collection)
+        except Exception as e:
+            print(f"Live feed stopped: {e}")
+            self._close_all(UNAVAILABLE)
+
+    def _refuse(self, reason):
+        print(f"Live feed unavailable: {reason}")
+        self._close_all(UNAVAILABLE, reason)
+
+    # -----------------------------
+    # Change stream
+    # -----------------------------
+    def _change_rows(self, change):
+        doc = change.get("fullDocument")
+        if doc is None:
+            return []
+        if self.layout != "buckets":
+            return [clean_row(doc)]
+        if change["operationType"] != "update":
+            return [clean_row(row) for row in bucket_layout.flatten([doc])]
+        # $push appends are reported per array element, e.g. "d.20"; the looked
+        # up document may already hold later appends, so only these are sent
+        arrays = set(bucket_layout.ROW_FIELDS.values())
+        indices = [int(index) for field, _, index in
+                   (key.partition(".") for key in change["updateDescription"]["updatedFields"])
+                   if field in arrays and index.isdigit()]
+        if not indices:
+            return []
+        start = {"_id": doc["_id"], "i": min(indices) - 1}
+        end = {"_id": doc["_id"], "i": max(indices)}
+        return [clean_row(row) for row in bucket_layout.flatten([doc], start=start, end=end)]
+
+    def _watch(self, collection):
+        # Rows are inserted or replaced (incremental loads); weld buckets are inserted or appended to
+        operations = ["insert", "update"] if self.layout == "buckets" else ["insert", "replace"]
+        pipeline = [{"$match": {"operationType": {"$in": operations}}}]
+        with collection.watch(pipeline, full_document="updateLookup",
+                              max_await_time_ms=int(self.poll_seconds * 1000)) as stream:
+            self.mode = "change_stream"
+            print("Live feed: following the change stream")
+            rows, last_id = [], None
+            while self._active():
+                change = stream.try_next()
+                if change is not None:
+                    rows += self._change_rows(change)
+                    last_id = change["_id"].get("_data", "")
+                    if len(rows) < self.batch_size:
+                        continue
+                # Idle stream or full batch
+                self.publish(rows, last_id)
+                rows = []
+
+    # -----------------------------
+    # _id watermark (no replica set)
+    # -----------------------------
+    @staticmethod
+    def _has_hashed_ids(collection):
+        # Numbers and strings sort before ObjectIds, so the lowest _id shows whether any row has one
+        first = collection.find_one({}, {"_id": 1}, sort=[("_id", 1)])
+        return first is not None and not isinstance(first["_id"], ObjectId)
+
+    def _settle_floor(self, watermark):
+        # Lowest ObjectId of the window behind the watermark that is re-checked for late rows
+        return ObjectId.from_datetime(watermark.generation_time - timedelta(seconds=self.settle_seconds))
+
+    def _late_rows(self, collection, watermark, recent):
+        """Rows inside the settle window that were not seen yet; ``recent`` holds the window's seen _ids."""
+        window = {"_id": {"$gte": self._settle_floor(watermark), "$lte": watermark}}
+        if collection.count_documents(window) == len(recent):
+            return []
+        missing = [doc["_id"] for doc in collection.find(window, {"_id": 1}) if doc["_id"] not in recent]
+        docs = []
+        for start in range(0, len(missing), self.batch_size):
+            docs += collection.find({"_id": {"$in": missing[start:start + self.batch_size]}}).sort("_id", 1)
+        self.late += len(docs)
+        return docs
+
+    def _tail(self, collection):
+        self.mode = "watermark"
+        latest = collection.find_one({}, {"_id": 1}, sort=[("_id", -1)])
+        watermark = latest["_id"] if latest else None
+        recent = set()        # _ids seen in the settle window behind the watermark
+        if isinstance(watermark, ObjectId):
+            recent = {doc["_id"] for doc in
+                      collection.find({"_id": {"$gte": self._settle_floor(watermark)}}, {"_id": 1})}
+        while self._active():
+            if self._has_hashed_ids(collection):
+                self._refuse(NO_REPLICA_SET_HASHED_IDS)
+                return
+            late = []
+            if isinstance(watermark, ObjectId):
+                floor = self._settle_floor(watermark)
+                recent = {key for key in recent if key >= floor}
+                late = self._late_rows(collection, watermark, recent)
+            query = {"_id": {"$gt": watermark}} if watermark is not None else {}
+            docs = list(collection.find(query).sort("_id", 1).limit(self.batch_size))
+            if docs:
+                watermark = docs[-1]["_id"]
+            if late or docs:
+                recent.update(doc["_id"] for doc in late + docs)
+                self.publish([clean_row(doc) for doc in late + docs], str(watermark))
+            if len(docs) < self.batch_size:
+                time.sleep(self.poll_seconds)
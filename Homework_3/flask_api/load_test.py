@@ -0,0 +1,107 @@
+import sys
+import time
+import json
+import argparse
+import threading
+import http.client
+from urllib.parse import urlsplit
+
+'''
+Load test for the Welding Data API.
+
+Start a local mongod, load it with the ETL and run the API (e.g. with gunicorn),
+then run:
+
+    python load_test.py --url "http://localhost:5000/data?limit=100&format=json"
+    python load_test.py --url http://localhost:5000/predict \
+        --body '{"power": 1200, "speed": 1, "gas_flow": 15, "focal": 0, "angle": 0, "thickness": 0.6}'
+
+Every concurrency level runs for --duration seconds with one keep-alive
+connection per client and reports p50/p99 latency and requests/sec. With
+--body every request is a POST of that JSON body.
+'''
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return float('nan')
+    index = min(len(sorted_values) - 1, int(round(q / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def client_loop(url, deadline, latencies, errors, body=None):
+    parts = urlsplit(url)
+    path = parts.path + (f"?{parts.query}" if parts.query else "")
+    conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=30)
+    local, failed = [], 0
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            if body is None:
+                conn.request("GET", path)
+            else:
+                conn.request("POST", path, body, {"Content-Type": "application/json"})
+            response = conn.getresponse()
+            response.read()
+            if response.status != 200:
+                failed += 1
+                continue
+        except (OSError, http.client.HTTPException):
+            failed += 1
+            conn.close()
+            conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=30)
+            continue
+        local.append(time.perf_counter() - start)
+    conn.close()
+    latencies.extend(local)
+    errors.append(failed)
+
+
+def run_level(url, clients, duration, body=None):
+    latencies, errors = [], []
+    deadline = time.perf_counter() + duration
+    threads = [threading.Thread(target=client_loop, args=(url, deadline, latencies, errors, body))
+               for _ in range(clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        'clients': clients,
+        'requests': len(latencies),
+        'errors': sum(errors),
+        'rps': len(latencies) / elapsed,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the Welding Data API")
+    parser.add_argument('--url', default='http://localhost:5000/data?limit=100&format=json')
+    parser.add_argument('--clients', default='1,8,64', help='comma separated concurrency levels')
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds per level')
+    parser.add_argument('--body', help='JSON body to POST instead of a GET, e.g. for /predict')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+
+    results = []
+    for clients in [int(c) for c in args.clients.split(',')]:
+        result = run_level(args.url, clients, args.duration, args.body)
+        results.append(result)
+        if not args.json:
+            print(f"{clients:>4} clients: {result['rps']:9.1f} req/s  p50 {result['p50_ms']:7.2f} ms  "
+                  f"p99 {result['p99_ms']:7.2f} ms  ({result['requests']} ok, {result['errors']} errors)")
+
+    if args.json:
+        print(json.dumps({'url': args.url, 'duration': args.duration, 'results': results}, indent=2))
+    if any(r['requests'] == 0 for r in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+import os
+import glob
+import json
+import time
+import bisect
+import tempfile
+import threading
+from pymongo import monitoring
+
+'''
+Prometheus metrics for the API, in the text exposition format.
+
+Counters and histograms live in the worker process; sampled metrics read
+counters kept elsewhere (the response cache). With METRICS_DIR set, each
+worker also writes its values to a JSON file there (at most once per
+METRICS_FLUSH_SECONDS) and /metrics adds up the files of all workers, so a
+scrape sees the whole gunicorn server instead of one worker.
+'''
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216, 67108864)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.values = {}   # label values -> count
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def state(self):
+        with self._lock:
+            return {json.dumps(key): value for key, value in self.values.items()}
+
+    @staticmethod
+    def merge(total, value):
+        return (total or 0) + value
+
+    def render(self, state):
+        lines = []
+        for key, value in sorted(state.items()):
+            labels = list(zip(self.labelnames, json.loads(key)))
+            lines.append(f"{self.name}{_format_labels(labels)} {value}")
+        return lines
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self.values = {}   # label values -> [count per bucket (last: +Inf), sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self.values.get(key)
+            if entry is None:
+                entry = self.values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def time(self, **labels):
+        return _Timer(self, labels)
+
+    def state(self):
+        with self._lock:
+            return {json.dumps(key): [list(counts), total] for key, (counts, total) in self.values.items()}
+
+    @staticmethod
+    def merge(total, value):
+        if total is None:
+            return [list(value[0]), value[1]]
+        return [[a + b for a, b in zip(total[0], value[0])], total[1] + value[1]]
+
+    def render(self, state):
+        lines = []
+        for key, (counts, total) in sorted(state.items()):
+            labels = list(zip(self.labelnames, json.loads(key)))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{self.name}_bucket{_format_labels(labels + [('le', le)])} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {cumulative}")
+        return lines
+
+
+class Sampled(Counter):
+    """Counter or gauge read from ``read()`` (label values -> value) whenever the state is taken."""
+
+    def __init__(self, name, help_text, kind, read, labelnames=()):
+        super().__init__(name, help_text, labelnames)
+        self.kind = kind
+        self.read = read
+
+    def state(self):
+        return {json.dumps(list(key)): value for key, value in self.read().items()}
+
+
+class _Timer:
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+class Registry:
+
+    def __init__(self, directory=None, flush_seconds=1.0):
+        self.metrics = []
+        self.directory = directory
+        self.flush_seconds = flush_seconds
+        self._flushed_at = 0.0
+        self._flush_lock = threading.Lock()
+
+    def counter(self, name, help_text, labelnames=()):
+        metric = Counter(name, help_text, labelnames)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        metric = Histogram(name, help_text, labelnames, buckets)
+        self.metrics.append(metric)
+        return metric
+
+    def sampled(self, name, help_text, kind, read, labelnames=()):
+        metric = Sampled(name, help_text, kind, read, labelnames)
+        self.metrics.append(metric)
+        return metric
+
+    def state(self):
+        return {metric.name: metric.state() for metric in self.metrics}
+
+    def _path(self, pid):
+        return os.path.join(self.directory, f"metrics_{pid}.json")
+
+    def flush(self, force=False):
+        """Write this worker's values for the other workers' scrapes (rate limited)."""
+        if not self.directory:
+            return
+        now = time.monotonic()
+        if not force and now - self._flushed_at < self.flush_seconds:
+            return
+        if not self._flush_lock.acquire(blocking=False):
+            return
+        try:
+            self._flushed_at = now
+            os.makedirs(self.directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                json.dump(self.state(), f)
+            os.replace(tmp_path, self._path(os.getpid()))
+        except OSError as e:
+            print(f"Could not write metrics: {e}")
+        finally:
+            self._flush_lock.release()
+
+    def _states(self):
+        states = [self.state()]
+        if self.directory:
+            own = self._path(os.getpid())
+            for path in glob.glob(os.path.join(self.directory, "metrics_*.json")):
+                if path == own:
+                    continue
+                try:
+                    with open(path) as f:
+                        states.append(json.load(f))
+                except (OSError, ValueError):
+                    continue
+        return states
+
+    def render(self):
+        """Exposition text with the values of every worker added up."""
+        states = self._states()
+        lines = []
+        for metric in self.metrics:
+            merged = {}
+            for state in states:
+                for key, value in state.get(metric.name, {}).items():
+                    merged[key] = metric.merge(merged.get(key), value)
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines += metric.render(merged)
+        return lines
+
+
+class CommandTimer(monitoring.CommandListener):
+    """pymongo command monitoring listener recording the duration of every command."""
+
+    def __init__(self, duration, failures):
+        self.duration = duration
+        self.failures = failures
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self.duration.observe(event.duration_micros / 1e6, command=event.command_name)
+
+    def failed(self, event):
+        self.duration.observe(event.duration_micros / 1e6, command=event.command_name)
+        self.failures.inc(command=event.command_name)
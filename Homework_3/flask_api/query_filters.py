@@ -0,0 +1,158 @@
+import re
+from urllib.parse import unquote_plus
+from pymongo import ASCENDING
+
+'''
+Query-string filters for the welding data, pushed down into the Mongo query.
+
+Every process factor can be filtered by equality, a comma separated list or a
+range predicate written directly in the query string:
+
+    /data?cracking=yes&power=1200
+    /data?power>=1200&speed<1.5&thickness=0.6,0.7
+'''
+
+# Query parameter -> canonical field name (see python_container/welding_schema.py)
+FILTER_FIELDS = {
+    'power': 'Power',
+    'speed': 'WeldingSpeed',
+    'gas_flow': 'GasFlowRate',
+    'focal': 'FocalPosition',
+    'angle': 'AngularPosition',
+    'thickness': 'MaterialThickness',
+    'cracking': 'Cracking',
+    'block': 'Block',
+    'weld': 'WeldNumber',
+    'version': 'SourceVersion',
+}
+
+# Fields compared as strings, everything else is numeric
+STRING_FIELDS = {'Cracking', 'SourceVersion'}
+
+# Query parameters handled by the endpoints themselves
+CONTROL_PARAMS = {'limit', 'format', 'next', 'fields', 'explain', 'level'}
+
+OPERATORS = {'>=': '$gte', '<=': '$lte', '!=': '$ne', '>': '$gt', '<': '$lt', '=': '$eq'}
+
+_PREDICATE = re.compile(r'^([A-Za-z_]+)(>=|<=|!=|>|<|=)(.*)$')
+
+# Compound indexes created at startup. Equality fields come first, so "all
+# cracked welds at 1200 W" and lookups of a full parameter combination are
+# index scans; _id last keeps the pagination sort inside the index, so pages
+# with equality filters on the leading fields need no in-memory SORT.
+INDEXES = {
+    'cracking_power': [('Cracking', ASCENDING), ('Power', ASCENDING), ('_id', ASCENDING)],
+    'parameter_combination': [
+        ('Power', ASCENDING),
+        ('WeldingSpeed', ASCENDING),
+        ('GasFlowRate', ASCENDING),
+        ('FocalPosition', ASCENDING),
+        ('AngularPosition', ASCENDING),
+        ('MaterialThickness', ASCENDING),
+        ('_id', ASCENDING),
+    ],
+    'block_weld': [('Block', ASCENDING), ('WeldNumber', ASCENDING), ('_id', ASCENDING)],
+}
+
+
+class FilterError(ValueError):
+    pass
+
+
+def _coerce(field, raw):
+    if field in STRING_FIELDS:
+        return raw
+    try:
+        return float(raw)
+    except ValueError:
+        raise FilterError(f"'{raw}' is not a number for {field}")
+
+
+def parse_filters(query_string):
+    """Build a Mongo filter from a raw query string.
+
+    The raw string is parsed instead of ``request.args`` because range
+    predicates such as ``power>=1200`` are not key=value pairs.
+    """
+    if isinstance(query_string, bytes):
+        query_string = query_string.decode()
+
+    query = {}
+    for part in query_string.split('&'):
+        if not part:
+            continue
+        match = _PREDICATE.match(unquote_plus(part))
+        if not match:
+            raise FilterError(f"cannot parse filter '{unquote_plus(part)}'")
+        name, op, raw = match.groups()
+        if name in CONTROL_PARAMS:
+            continue
+        if name not in FILTER_FIELDS:
+            raise FilterError(f"unknown filter '{name}'")
+
+        field = FILTER_FIELDS[name]
+        if op == '=' and ',' in raw:
+            condition = {'$in': [_coerce(field, v) for v in raw.split(',')]}
+        else:
+            condition = {OPERATORS[op]: _coerce(field, raw)}
+        query.setdefault(field, {}).update(condition)
+    return query
+
+
+def parse_projection(fields):
+    """Projection for a comma separated list of filter names or field names."""
+    if not fields:
+        return None
+    projection = {FILTER_FIELDS.get(f.strip(), f.strip()): 1 for f in fields.split(',') if f.strip()}
+    # _id is needed for the page token and removed before sending
+    projection['_id'] = 1
+    return projection
+
+
+def ensure_indexes(collection, indexes=INDEXES):
+    """Create the filter indexes (no-op when they exist) and verify their keys.
+
+    An index whose keys changed between releases is dropped and rebuilt.
+    """
+    existing = collection.index_information()
+    for name, keys in indexes.items():
+        if name in existing and list(existing[name]['key']) != keys:
+            collection.drop_index(name)
+        collection.create_index(keys, name=name)
+
+    existing = collection.index_information()
+    missing = [name for name, keys in indexes.items()
+               if name not in existing or list(existing[name]['key']) != keys]
+    if missing:
+        raise RuntimeError(f"indexes missing or mismatched: {missing}")
+    return list(indexes)
+
+
+def _plan_stages(plan):
+    stages = [plan]
+    for key in ('inputStage', 'queryPlan'):
+        if key in plan:
+            stages += _plan_stages(plan[key])
+    for child in plan.get('inputStages', []):
+        stages += _plan_stages(child)
+    return stages
+
+
+def explain_summary(cursor):
+    """Whether a query is served by an index, from the cursor's explain output."""
+    explain = cursor.explain()
+    winning = explain.get('queryPlanner', {}).get('winningPlan', {})
+    stages = _plan_stages(winning)
+    index_names = [s['indexName'] for s in stages if s.get('stage') == 'IXSCAN']
+    stats = explain.get('executionStats', {})
+    stage_names = [s.get('stage') for s in stages]
+    return {
+        'indexed': bool(index_names),
+        'indexes': index_names,
+        'stages': stage_names,
+        # A SORT stage means the _id order of the page is not served by the index
+        'in_memory_sort': 'SORT' in stage_names,
+        'docs_examined': stats.get('totalDocsExamined'),
+        'keys_examined': stats.get('totalKeysExamined'),
+        'returned': stats.get('nReturned'),
+    }
@@ -0,0 +1,144 @@
+import json
+import time
+import threading
+from collections import OrderedDict
+from urllib.parse import unquote_plus
+
+'''
+Cache for serialized API responses.
+
+Entries live in an in-process LRU bounded by total bytes and expire after a TTL.
+Every key carries the ETL load generation, so a new load makes all older entries
+unreachable without an explicit flush. With a shared backend (Redis) configured,
+local misses fall through to it, so several workers share one cache.
+'''
+
+
+def normalize_key(path, query_string):
+    """Cache key independent of parameter order and URL encoding."""
+    if isinstance(query_string, bytes):
+        query_string = query_string.decode()
+    # Decoded (name, '=', value) tuples: an encoded '&' or '=' stays inside its value
+    parts = sorted(tuple(map(unquote_plus, p.partition('='))) for p in query_string.split('&') if p)
+    return f"{path}?{json.dumps(parts, separators=(',', ':'))}"
+
+
+class CachedResponse:
+
+    def __init__(self, body, status, headers):
+        self.body = body
+        self.status = status
+        self.headers = headers
+
+    @property
+    def size(self):
+        return len(self.body)
+
+    def dumps(self):
+        meta = json.dumps({'status': self.status, 'headers': self.headers}).encode()
+        return meta + b'\n' + self.body
+
+    @classmethod
+    def loads(cls, raw):
+        meta, body = raw.split(b'\n', 1)
+        meta = json.loads(meta)
+        return cls(body, meta['status'], meta['headers'])
+
+
+class RedisBackend:
+    """Shared cache backend; entries expire in Redis after the TTL."""
+
+    def __init__(self, url, ttl, prefix='welding-api:'):
+        import redis  # optional dependency, only needed for a shared cache
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        return CachedResponse.loads(raw) if raw is not None else None
+
+    def set(self, key, entry):
+        self.client.set(self.prefix + key, entry.dumps(), ex=max(1, int(self.ttl)))
+
+
+class ResponseCache:
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, ttl=300, backend=None):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.backend = backend
+        self._entries = OrderedDict()   # key -> (expires_at, CachedResponse)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _key(key, generation):
+        return f"{generation}|{key}"
+
+    def get(self, key, generation):
+        full_key = self._key(key, generation)
+        now = time.monotonic()
+        with self._lock:
+            item = self._entries.get(full_key)
+            if item is not None:
+                expires_at, entry = item
+                if expires_at > now:
+                    self._entries.move_to_end(full_key)
+                    self.hits += 1
+                    return entry
+                self._remove(full_key)
+
+        entry = None
+        if self.backend is not None:
+            try:
+                entry = self.backend.get(full_key)
+            except Exception as e:
+                print(f"Shared cache read failed: {e}")
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.shared_hits += 1
+            self._store(full_key, entry, now)
+        return entry
+
+    def set(self, key, generation, entry):
+        full_key = self._key(key, generation)
+        with self._lock:
+            self._store(full_key, entry, time.monotonic())
+        if self.backend is not None:
+            try:
+                self.backend.set(full_key, entry)
+            except Exception as e:
+                print(f"Shared cache write failed: {e}")
+
+    def _store(self, full_key, entry, now):
+        if entry.size > self.max_bytes:
+            return
+        if full_key in self._entries:
+            self._remove(full_key)
+        self._entries[full_key] = (now + self.ttl, entry)
+        self._bytes += entry.size
+        while self._bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _remove(self, full_key):
+        _, entry = self._entries.pop(full_key)
+        self._bytes -= entry.size
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'shared_hits': self.shared_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+            }
@@ -0,0 +1,357 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+import numpy as np
+from query_filters import FILTER_FIELDS
+import welding_effects
+
+'''
+Weld quality model behind /predict.
+
+Two models of the six process factors, fitted on the rows in welding_data with
+the estimators of shared/welding_effects.py:
+
+    - copper weld depth: least squares on the coded factors and the two-factor
+      interactions that welding_effects finds significant. The screening
+      design has only a few distinct runs, so no more interactions are taken
+      than those runs can identify; predictions are clipped at 0,
+    - cracking probability: logistic regression on the coded factors (IRLS).
+
+Factors are coded to [-1, 1] over the range seen in training, the same coding
+as welding_effects.code_factors. Scoring n rows is two matrix products, so
+concurrent requests are coalesced into micro-batches by MicroBatcher and
+scored with one call.
+'''
+
+FACTORS = ['Power', 'WeldingSpeed', 'GasFlowRate', 'FocalPosition', 'AngularPosition', 'MaterialThickness']
+DEPTH = 'WeldDepthCopper'
+CRACKING = 'Cracking'
+
+# Request field -> factor; the /data filter names and the canonical names are both accepted
+FACTOR_NAMES = {**{name: field for name, field in FILTER_FIELDS.items() if field in FACTORS},
+                **{field: field for field in FACTORS}}
+
+DEPTH_RIDGE = 1e-3
+CRACK_RIDGE = 1e-2
+# Rows (sampled) and resamples of the bootstrap that picks the significant interactions
+SIGNIFICANCE_ROWS = 5000
+SIGNIFICANCE_RESAMPLES = 200
+
+
+class PredictError(ValueError):
+    pass
+
+
+# -----------------------------
+# Model
+# -----------------------------
+def depth_interactions(coded, depth, seed=0):
+    """Significant interaction pairs for the depth model, as many as the distinct design points identify."""
+    rows = np.random.default_rng(seed).permutation(len(depth))[:SIGNIFICANCE_ROWS]
+    pairs = welding_effects.significant_interactions(coded[rows], depth[rows], SIGNIFICANCE_RESAMPLES, seed=seed)
+    points = np.unique(coded, axis=0)
+    # Keep a residual degree of freedom and a full-rank design on the distinct points
+    pairs = pairs[:max(0, len(points) - 2 - len(FACTORS))]
+    while pairs and np.linalg.matrix_rank(welding_effects.model_matrix(points, FACTORS, pairs)[0]) < 1 + len(FACTORS) + len(pairs):
+        pairs = pairs[:-1]
+    return pairs
+
+
+class WeldModel:
+
+    def __init__(self, generation, centre, half_range, depth=None, crack=None, rows=None, trained_at=None,
+                 pairs=None):
+        self.generation = generation
+        self.centre = np.asarray(centre, dtype='float64')
+        self.half_range = np.asarray(half_range, dtype='float64')
+        self.depth = None if depth is None else np.asarray(depth, dtype='float64')
+        self.crack = None if crack is None else np.asarray(crack, dtype='float64')
+        self.rows = rows or {}              # training rows per target
+        self.trained_at = trained_at or time.time()
+        self.pairs = [tuple(pair) for pair in pairs or []]   # interactions of the depth model
+
+    @property
+    def version(self):
+        return f"g{self.generation}"
+
+    def coded(self, factors):
+        return (factors - self.centre) / self.half_range
+
+    def design(self, coded, pairs=None):
+        return welding_effects.model_matrix(coded, FACTORS, pairs)[0]
+
+    @classmethod
+    def fit(cls, df, generation):
+        """Fit both models on a frame of training rows; a target without data is left out."""
+        data = df.dropna(subset=FACTORS)
+        if data.empty:
+            raise PredictError("no training rows with all process factors")
+        values = data[FACTORS].to_numpy(dtype='float64')
+        low, high = values.min(axis=0), values.max(axis=0)
+        model = cls(generation, (high + low) / 2, np.where(high > low, (high - low) / 2, 1.0))
+        coded = model.coded(values)
+
+        if DEPTH in data.columns:
+            depth = data[DEPTH].to_numpy(dtype='float64', na_value=np.nan)
+            known = ~np.isnan(depth)
+            if known.any():
+                model.pairs = depth_interactions(coded[known], depth[known])
+                X = model.design(coded[known], model.pairs)
+                model.depth = welding_effects.least_squares(X, depth[known], ridge=DEPTH_RIDGE)[0]
+                model.rows[DEPTH] = int(known.sum())
+
+        if CRACKING in data.columns:
+            answers = data[CRACKING].astype(object).to_numpy()
+            known = (answers == 'yes') | (answers == 'no')
+            if known.any():
+                X = model.design(coded[known])
+                model.crack = welding_effects.logistic(X, (answers[known] == 'yes').astype('float64'),
+                                                       ridge=CRACK_RIDGE)[0]
+                model.rows[CRACKING] = int(known.sum())
+        return model
+
+    def predict(self, factors):
+        """(weld depth, crack probability) for an (n, 6) array of factors; None for a missing model."""
+        coded = self.coded(factors)
+        depth = prob = None
+        if self.depth is not None:
+            # A depth is never negative, whatever the linear model gives far from the design points
+            depth = np.clip(self.design(coded, self.pairs) @ self.depth, 0, None)
+        if self.crack is not None:
+            prob = 1 / (1 + np.exp(-np.clip(self.design(coded) @ self.crack, -30, 30)))
+        return depth, prob
+
+    def to_document(self):
+        return {
+            "generation": self.generation,
+            "centre": self.centre.tolist(),
+            "half_range": self.half_range.tolist(),
+            "depth": None if self.depth is None else self.depth.tolist(),
+            "crack": None if self.crack is None else self.crack.tolist(),
+            "rows": self.rows,
+            "trained_at": self.trained_at,
+            "pairs": [list(pair) for pair in self.pairs],
+        }
+
+    @classmethod
+    def from_document(cls, doc):
+        return cls(doc["generation"], doc["centre"], doc["half_range"], doc.get("depth"), doc.get("crack"),
+                   doc.get("rows"), doc.get("trained_at"), doc.get("pairs"))
+
+    def describe(self):
+        return {"version": self.version, "generation": self.generation, "training_rows": self.rows,
+                "trained_at": self.trained_at,
+                "depth_interactions": [f"{FACTORS[i]}:{FACTORS[j]}" for i, j in self.pairs]}
+
+
+# -----------------------------
+# Requests
+# -----------------------------
+def parse_rows(payload, max_rows):
+    """(n, 6) factor array of a JSON payload and whether it was a single object.
+
+    A payload is one object of factors or a list of them, e.g.
+    ``{"power": 1200, "speed": 1, "gas_flow": 15, "focal": 0, "angle": 0, "thickness": 0.6}``.
+    """
+    single = isinstance(payload, dict)
+    rows = [payload] if single else payload
+    if not isinstance(rows, list) or not rows:
+        raise PredictError("expected a JSON object or a non-empty list of objects")
+    if len(rows) > max_rows:
+        raise PredictError(f"at most {max_rows} rows per request")
+
+    values = np.empty((len(rows), len(FACTORS)))
+    for i, row in enumerate(rows):
+        if not isinstance(row, dict):
+            raise PredictError(f"row {i} is not an object")
+        found = {}
+        for name, value in row.items():
+            field = FACTOR_NAMES.get(name)
+            if field is not None:
+                found[field] = value
+        for j, field in enumerate(FACTORS):
+            if field not in found:
+                raise PredictError(f"row {i} is missing {field}")
+            value = found[field]
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                raise PredictError(f"row {i}: {field} must be a number")
+            values[i, j] = value
+    if not np.isfinite(values).all():
+        raise PredictError("factors must be finite numbers")
+    return values, single
+
+
+# -----------------------------
+# Model cache
+# -----------------------------
+class ModelUnavailable(RuntimeError):
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class ModelCache:
+    '''
+    The model of the current load generation, kept in memory.
+
+    ``load(generation)`` returns a model saved by another worker (or None) and
+    ``train(generation)`` fits and saves one. The first request waits for the
+    model; after a new load the previous model keeps serving while the new one
+    is loaded or trained in the background, so a retrain never stalls requests.
+
+    A generation that failed to load or train is not retried for
+    ``retry_after`` seconds: until then the previous model keeps serving, or
+    ModelUnavailable is raised when there is none, instead of every request
+    starting another fit.
+    '''
+
+    def __init__(self, load, train, retry_after=60.0):
+        self.load = load
+        self.train = train
+        self.retry_after = retry_after
+        self.model = None
+        self.failures = 0
+        self._failed = None       # (generation, retry at, error) of the last failed preparation
+        self._lock = threading.Lock()
+        self._prepare_lock = threading.Lock()
+        self._refreshing = None   # generation being prepared in the background
+
+    def _prepare(self, generation):
+        try:
+            model = self.load(generation)
+            if model is None:
+                start = time.perf_counter()
+                model = self.train(generation)
+                print(f"Trained weld model {model.version} on {model.rows} rows "
+                      f"in {time.perf_counter() - start:.2f} s")
+        except Exception as e:
+            with self._lock:
+                self.failures += 1
+                self._failed = (generation, time.monotonic() + self.retry_after, e)
+            print(f"Could not prepare the weld model for generation {generation} "
+                  f"(retrying in {self.retry_after:.0f} s): {e}")
+            raise
+        with self._lock:
+            self.model = model
+            self._failed = None
+        return model
+
+    def _refresh(self, generation):
+        try:
+            self._prepare(generation)
+        except Exception:
+            pass   # recorded by _prepare, the previous model keeps serving
+        finally:
+            with self._lock:
+                self._refreshing = None
+
+    def _backoff(self, generation):
+        """Seconds until ``generation`` may be prepared again (0 when it did not fail)."""
+        if self._failed is None or self._failed[0] != generation:
+            return 0.0
+        return max(0.0, self._failed[1] - time.monotonic())
+
+    def current(self, generation):
+        model = self.model
+        if model is not None and model.generation == generation:
+            return model
+        if model is None:
+            # One request fits the first model; the others wait for it, and after a failure
+            # they (and later requests) get ModelUnavailable until the retry time
+            with self._prepare_lock:
+                if self.model is not None:
+                    return self.model
+                wait = self._backoff(generation)
+                if wait:
+                    raise ModelUnavailable(f"training failed: {self._failed[2]}", wait)
+                try:
+                    return self._prepare(generation)
+                except Exception as e:
+                    raise ModelUnavailable(f"training failed: {e}", self.retry_after) from e
+        with self._lock:
+            if self._refreshing is None and not self._backoff(generation):
+                self._refreshing = generation
+                threading.Thread(target=self._refresh, args=(generation,), name="weld-model", daemon=True).start()
+        return model
+
+
+# -----------------------------
+# Micro-batching
+# -----------------------------
+class MicroBatcher:
+    '''
+    Coalesces concurrent scoring calls into one vectorized call.
+
+    Requests put their factor arrays on a queue. One thread per worker takes
+    the first waiting request plus everything queued behind it (up to
+    ``max_rows`` rows), scores the concatenation with ``score(model, factors)``
+    and hands every request its slice. Requests arriving while a batch is
+    scored form the next one, so batches grow with the load without a fixed
+    delay; ``max_wait`` seconds of extra waiting trade latency for larger
+    batches. Scoring on one thread also keeps the request threads from
+    contending for the GIL inside numpy, which is what keeps p99 latency low.
+    '''
+
+    def __init__(self, score, max_rows=1024, max_wait=0.0):
+        self.score = score
+        self.max_rows = max_rows
+        self.max_wait = max_wait
+        self.batches = 0
+        self.rows = 0
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def submit(self, model, factors):
+        """Future of the (depth, probability) arrays for ``factors``."""
+        future = Future()
+        self._queue.put((model, factors, future))
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="predict-batcher", daemon=True)
+                    self._thread.start()
+        return future
+
+    def _collect(self):
+        pending = [self._queue.get()]
+        rows = len(pending[0][1])
+        deadline = time.perf_counter() + self.max_wait
+        while rows < self.max_rows:
+            timeout = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            pending.append(item)
+            rows += len(item[1])
+        return pending
+
+    def _run(self):
+        while True:
+            pending = self._collect()
+            # Requests that looked up their model across a reload are scored per model
+            by_model = {}
+            for item in pending:
+                by_model.setdefault(id(item[0]), []).append(item)
+            for items in by_model.values():
+                self._score(items)
+
+    def _score(self, items):
+        try:
+            factors = np.concatenate([factors for _, factors, _ in items]) if len(items) > 1 else items[0][1]
+            depth, prob = self.score(items[0][0], factors)
+        except Exception as e:
+            for _, _, future in items:
+                future.set_exception(e)
+            return
+        self.batches += 1
+        self.rows += len(factors)
+        start = 0
+        for _, part, future in items:
+            stop = start + len(part)
+            future.set_result((None if depth is None else depth[start:stop],
+                               None if prob is None else prob[start:stop]))
+            start = stop
@@ -0,0 +1,120 @@
+import os
+import json
+import time
+import fcntl
+import urllib.request
+from urllib.parse import quote
+
+'''
+Per-stage metrics of the ETL loads in the Prometheus text format.
+
+After every load the stage timings and row counts are
+
+    - written to METRICS_FILE, e.g. into the directory of node_exporter's
+      textfile collector; the file keeps the latest load of every source file
+      and is updated under a lock, so parallel ingest workers can share it
+    - pushed to a Prometheus Pushgateway at METRICS_PUSHGATEWAY
+      (e.g. http://pushgateway:9091), grouped by job and source file
+
+Both are optional; without them nothing is written.
+'''
+
+METRICS_FILE = os.getenv("METRICS_FILE")
+METRICS_PUSHGATEWAY = os.getenv("METRICS_PUSHGATEWAY")
+METRICS_JOB = os.getenv("METRICS_JOB", "welding_etl")
+
+GAUGES = {
+    "welding_etl_stage_seconds": "Busy time per load stage",
+    "welding_etl_stage_rows": "Rows through each load stage",
+    "welding_etl_load_seconds": "Wall time of the load",
+    "welding_etl_rows_written": "Rows inserted or updated by the load",
+    "welding_etl_peak_rss_bytes": "Peak resident memory of the loading process",
+    "welding_etl_last_load_timestamp_seconds": "Unix time the load finished",
+}
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels):
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def load_entry(csv_path, mode, rows, wall_seconds, stats, peak_rss_mb):
+    return {
+        "file": os.path.basename(csv_path),
+        "mode": mode,
+        "rows": rows,
+        "seconds": wall_seconds,
+        "stage_seconds": dict(stats.seconds),
+        "stage_rows": dict(stats.rows),
+        "peak_rss_bytes": int(peak_rss_mb * 1024 * 1024),
+        "finished_at": time.time(),
+    }
+
+
+def render(entries):
+    samples = {name: [] for name in GAUGES}
+    for entry in entries:
+        load = {"file": entry["file"], "mode": entry["mode"]}
+        for stage, seconds in entry["stage_seconds"].items():
+            samples["welding_etl_stage_seconds"].append((_labels(**load, stage=stage), seconds))
+            samples["welding_etl_stage_rows"].append((_labels(**load, stage=stage), entry["stage_rows"][stage]))
+        samples["welding_etl_load_seconds"].append((_labels(**load), entry["seconds"]))
+        samples["welding_etl_rows_written"].append((_labels(**load), entry["rows"]))
+        samples["welding_etl_peak_rss_bytes"].append((_labels(**load), entry["peak_rss_bytes"]))
+        samples["welding_etl_last_load_timestamp_seconds"].append((_labels(**load), entry["finished_at"]))
+
+    lines = []
+    for name, help_text in GAUGES.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} gauge")
+        lines += [f"{name}{labels} {value}" for labels, value in samples[name]]
+    return "\n".join(lines) + "\n"
+
+
+def write_file(path, entry):
+    """Merge the load into the metrics file (latest load per source file)."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    # The JSON next to the metrics file holds the entries; the lock serializes ingest workers
+    with open(f"{path}.lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            with open(f"{path}.json") as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            entries = {}
+        entries[entry["file"]] = entry
+        for target, content in ((f"{path}.json", json.dumps(entries)), (path, render(entries.values()))):
+            # Written next to the target and renamed, so a scrape never reads half a file
+            tmp_path = f"{target}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                f.write(content)
+            os.replace(tmp_path, target)
+
+
+def push(gateway, entry, job=METRICS_JOB):
+    url = f"{gateway.rstrip('/')}/metrics/job/{quote(job, safe='')}/file/{quote(entry['file'], safe='')}"
+    request = urllib.request.Request(url, data=render([entry]).encode(), method="PUT",
+                                     headers={"Content-Type": "text/plain; version=0.0.4"})
+    with urllib.request.urlopen(request, timeout=10):
+        pass
+
+
+def record_load(csv_path, mode, rows, wall_seconds, stats, peak_rss_mb):
+    """Write and/or push the metrics of one load; failures are reported, never raised."""
+    if not (METRICS_FILE or METRICS_PUSHGATEWAY):
+        return
+    entry = load_entry(csv_path, mode, rows, wall_seconds, stats, peak_rss_mb)
+    if METRICS_FILE:
+        try:
+            write_file(METRICS_FILE, entry)
+        except OSError as e:
+            print(f"Could not write metrics file '{METRICS_FILE}': {e}")
+    if METRICS_PUSHGATEWAY:
+        try:
+            push(METRICS_PUSHGATEWAY, entry)
+        except OSError as e:
+            print(f"Could not push metrics to '{METRICS_PUSHGATEWAY}': {e}")
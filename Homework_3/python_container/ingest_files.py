@@ -0,0 +1,89 @@
+import os
+import sys
+import glob
+import time
+import multiprocessing.util
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import transform_data
+import welding_schema
+import sampling_profiler
+
+'''
+Parallel multi-file ingestion.
+
+Takes a directory or a glob pattern (argument or INGEST_PATH), normalizes every
+welding CSV to the canonical schema, tags it with its dataset version and loads
+the files in parallel on a process pool - one file per worker at a time.
+
+    python ingest_files.py "datasets/*.csv"
+    python ingest_files.py /data/nightly_drop
+'''
+
+INGEST_PATH = os.getenv("INGEST_PATH", "datasets")
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", str(os.cpu_count() or 1)))
+
+# Per-process MongoDB client, created after the worker starts (clients are not fork-safe)
+_db = None
+
+
+def resolve_files(path):
+    if os.path.isdir(path):
+        path = os.path.join(path, "*.csv")
+    return sorted(f for f in glob.glob(path, recursive=True) if os.path.isfile(f))
+
+
+def _init_worker():
+    global _db
+    _db = transform_data.connect()[transform_data.MONGO_DB]
+    profiler = sampling_profiler.start_from_env("ingest")
+    if profiler is not None:
+        # Pool workers skip atexit handlers but run multiprocessing finalizers
+        multiprocessing.util.Finalize(None, profiler.stop, exitpriority=10)
+
+
+def ingest_file(csv_path):
+    start = time.perf_counter()
+    try:
+        version = welding_schema.detect_file_version(csv_path)
+        rows = transform_data.load_file(_db, csv_path)
+    except SystemExit:
+        # The loaders already printed the reason
+        return csv_path, None, False, time.perf_counter() - start
+    except Exception as e:
+        print(f"Failed to ingest '{csv_path}': {e}")
+        return csv_path, None, False, time.perf_counter() - start
+    return csv_path, version, rows, time.perf_counter() - start
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else INGEST_PATH
+    files = resolve_files(path)
+    if not files:
+        print(f"No CSV files found at '{path}'")
+        sys.exit(1)
+
+    workers = max(1, min(INGEST_WORKERS, len(files)))
+    print(f"Ingesting {len(files)} files from '{path}' with {workers} worker processes")
+
+    start = time.perf_counter()
+    failed = []
+    total_rows = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        futures = [pool.submit(ingest_file, f) for f in files]
+        for future in as_completed(futures):
+            csv_path, version, rows, seconds = future.result()
+            if rows is False:
+                failed.append(csv_path)
+                continue
+            total_rows += rows
+            print(f"  {csv_path} [{version}]: {rows} rows in {seconds:.2f} s")
+
+    elapsed = time.perf_counter() - start
+    print(f"Ingested {len(files) - len(failed)}/{len(files)} files, {total_rows} rows in {elapsed:.2f} s")
+    if failed:
+        print(f"Failed files: {failed}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
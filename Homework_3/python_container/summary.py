@@ -0,0 +1,196 @@
+import numpy as np
+import pandas as pd
+from pymongo import UpdateOne, ReplaceOne
+import welding_schema
+
+'''
+Pre-aggregated summary of the welding data, maintained by the ETL during the load.
+
+One document per parameter combination ("combination" level) and per block and
+parameter combination ("block" level), always split by dataset version:
+
+    {_id: {...group key...}, level, SourceVersion, [Block], Power, ..., count, cracked,
+     WeldDepthCopper: {n, sum, sumsq, min, max}, ...}
+
+Counts and sums are additive, so appended rows are folded in with $inc/$min/$max
+and deleted rows folded out with the negated $inc. Groups whose rows were
+modified, and groups that lost the row holding their min or max, are recomputed
+from the raw collection.
+'''
+
+LEVELS = {
+    'combination': [welding_schema.SOURCE_VERSION] + welding_schema.FACTORS,
+    'block': [welding_schema.SOURCE_VERSION, 'Block'] + welding_schema.FACTORS,
+}
+
+MEASURES = ['WeldDepthCopper', 'WeldWidthSteel', 'WeldWidthCopper', 'Gap',
+            'CrackCount', 'AvgCrackLength', 'CopperDilution']
+
+
+def _level_keys(df, level):
+    keys = LEVELS[level]
+    return keys if all(k in df.columns for k in keys) else None
+
+
+def aggregate(df, level):
+    """Vectorized per-group count, crack count and n/sum/sumsq/min/max per measure."""
+    keys = _level_keys(df, level)
+    if keys is None or df.empty:
+        return None
+
+    measures = [m for m in MEASURES if m in df.columns]
+    frame = df[keys].copy()
+    frame['cracked'] = (df['Cracking'] == 'yes').astype('int64') if 'Cracking' in df.columns else 0
+    named = {'count': ('cracked', 'size'), 'cracked': ('cracked', 'sum')}
+    for m in measures:
+        values = pd.to_numeric(df[m], errors='coerce')
+        frame[m] = values
+        frame[f'{m}__sq'] = values ** 2
+        named[f'{m}.n'] = (m, 'count')
+        named[f'{m}.sum'] = (m, 'sum')
+        named[f'{m}.sumsq'] = (f'{m}__sq', 'sum')
+        named[f'{m}.min'] = (m, 'min')
+        named[f'{m}.max'] = (m, 'max')
+    agg = frame.groupby(keys, dropna=False, sort=False).agg(**named).reset_index()
+    agg.attrs['level'] = level
+    agg.attrs['measures'] = measures
+    return agg
+
+
+def _native(value):
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and np.isnan(value):
+        return None
+    return value
+
+
+def _group_id(row, level):
+    return {'level': level, **{k: _native(row[k]) for k in LEVELS[level]}}
+
+
+def delta_ops(agg, sign=1):
+    """$inc/$min/$max upserts that fold an aggregated chunk into the summary.
+
+    ``sign=-1`` folds the rows out again: only the negated $inc, without
+    $min/$max (see ``remove_rows``) and without creating missing groups.
+    """
+    level, measures = agg.attrs['level'], agg.attrs['measures']
+    ops = []
+    for row in agg.to_dict(orient='records'):
+        group_id = _group_id(row, level)
+        inc = {'count': sign * int(row['count']), 'cracked': sign * int(row['cracked'])}
+        low, high = {}, {}
+        for m in measures:
+            n = int(row[f'{m}.n'])
+            if n == 0:
+                continue
+            inc[f'{m}.n'] = sign * n
+            inc[f'{m}.sum'] = sign * float(row[f'{m}.sum'])
+            inc[f'{m}.sumsq'] = sign * float(row[f'{m}.sumsq'])
+            low[f'{m}.min'] = float(row[f'{m}.min'])
+            high[f'{m}.max'] = float(row[f'{m}.max'])
+        if sign < 0:
+            ops.append(UpdateOne({'_id': group_id}, {'$inc': inc}))
+            continue
+        update = {'$setOnInsert': dict(group_id), '$inc': inc}
+        if low:
+            update['$min'] = low
+            update['$max'] = high
+        ops.append(UpdateOne({'_id': group_id}, update, upsert=True))
+    return ops
+
+
+def replace_ops(agg):
+    """Full replacements for groups aggregated over all of their raw rows."""
+    level, measures = agg.attrs['level'], agg.attrs['measures']
+    ops = []
+    for row in agg.to_dict(orient='records'):
+        group_id = _group_id(row, level)
+        doc = {**group_id, 'count': int(row['count']), 'cracked': int(row['cracked'])}
+        for m in measures:
+            n = int(row[f'{m}.n'])
+            if n:
+                doc[m] = {'n': n, 'sum': float(row[f'{m}.sum']), 'sumsq': float(row[f'{m}.sumsq']),
+                          'min': float(row[f'{m}.min']), 'max': float(row[f'{m}.max'])}
+        ops.append(ReplaceOne({'_id': group_id}, doc, upsert=True))
+    return ops
+
+
+def chunk_ops(df):
+    """Summary updates that fold appended rows in at every level."""
+    ops = []
+    for level in LEVELS:
+        agg = aggregate(df, level)
+        if agg is not None:
+            ops += delta_ops(agg)
+    return ops
+
+
+def apply_chunk(summary_collection, df):
+    ops = chunk_ops(df)
+    if ops:
+        summary_collection.bulk_write(ops, ordered=False)
+    return len(ops)
+
+
+def _find_rows(collection, match):
+    return pd.DataFrame(list(collection.find(match, {'_id': 0})))
+
+
+def rebuild_groups(collection, summary_collection, df, fetch=_find_rows):
+    """Recompute the summary for every group touched by ``df`` from the raw collection.
+
+    ``fetch(collection, match)`` returns the stored rows of the matched groups
+    as a DataFrame (the bucket layout flattens its weld documents).
+    """
+    ops = []
+    for level in LEVELS:
+        keys = _level_keys(df, level)
+        if keys is None or df.empty:
+            continue
+        groups = df[keys].drop_duplicates().to_dict(orient='records')
+        match = {'$or': [{k: _native(v) for k, v in g.items()} for g in groups]}
+        raw = fetch(collection, match)
+        agg = aggregate(raw, level)
+        if agg is not None:
+            ops += replace_ops(agg)
+    if ops:
+        summary_collection.bulk_write(ops, ordered=False)
+    return len(ops)
+
+
+def remove_rows(collection, summary_collection, df, fetch=_find_rows):
+    """Fold rows deleted from the raw collection out of the summary.
+
+    Counts and sums get the negated $inc and groups left without rows are
+    deleted. A min or max cannot be taken back, so groups where a deleted row
+    held the stored bound are recomputed from their remaining rows.
+    """
+    aggs = [agg for agg in (aggregate(df, level) for level in LEVELS) if agg is not None]
+    ops = [op for agg in aggs for op in delta_ops(agg, sign=-1)]
+    if not ops:
+        return 0
+    summary_collection.bulk_write(ops, ordered=False)
+    summary_collection.delete_many({'count': {'$lte': 0}})
+
+    bounded = []
+    for agg in aggs:
+        level, measures = agg.attrs['level'], agg.attrs['measures']
+        rows = agg.to_dict(orient='records')
+        stored = {tuple(sorted(doc['_id'].items())): doc
+                  for doc in summary_collection.find({'_id': {'$in': [_group_id(r, level) for r in rows]}})}
+        for row in rows:
+            doc = stored.get(tuple(sorted(_group_id(row, level).items())))
+            if doc is None:
+                continue
+            if any(int(row[f'{m}.n']) and m in doc and (float(row[f'{m}.min']) <= doc[m]['min']
+                                                        or float(row[f'{m}.max']) >= doc[m]['max'])
+                   for m in measures):
+                bounded.append({k: row[k] for k in LEVELS[level]})
+    if bounded:
+        # Rebuilds both levels of the affected rows, which also covers the other level's bounds
+        keys = LEVELS['combination']
+        groups = pd.DataFrame(bounded)[keys].drop_duplicates()
+        rebuild_groups(collection, summary_collection, df.merge(groups, on=keys), fetch)
+    return len(ops)
@@ -1,9 +1,22 @@
 import os
 import sys
+import time
+import hashlib
+import resource
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 import pandas as pd
-from pymongo import MongoClient
-
-print("Starting Data Transformation Process")
+from pymongo import MongoClient, ReplaceOne, ReturnDocument
+import welding_schema
+import welding_loader
+import summary
+# Modules shared with the API: Homework_3/shared in the tree, copied next to this file in the image
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'shared'))
+import bucket_layout
+import welding_validation
+import etl_metrics
+import sampling_profiler
 
 # -----------------------------
 # MongoDB Connection Settings
@@ -13,55 +26,516 @@ MONGO_USER = os.getenv("MONGO_USER")
 MONGO_PASS = os.getenv("MONGO_PASS")
 MONGO_DB = os.getenv("MONGO_DB", "welding_db")
 MONGO_COLLECTION = os.getenv("MONGO_COLLECTION", "welding_data")
+MONGO_META_COLLECTION = os.getenv("MONGO_META_COLLECTION", "etl_metadata")
+MONGO_SUMMARY_COLLECTION = os.getenv("MONGO_SUMMARY_COLLECTION", "welding_summary")
+MONGO_BUCKET_COLLECTION = os.getenv("MONGO_BUCKET_COLLECTION", "welding_welds")
+MONGO_QUARANTINE_COLLECTION = os.getenv("MONGO_QUARANTINE_COLLECTION", "welding_quarantine")
+
+# Metadata document counting successful loads (read by the API to invalidate its cache)
+LOAD_GENERATION_ID = "load_generation"
+
+# -----------------------------
+# Load Settings
+# -----------------------------
+CSV_PATH = os.getenv("CSV_PATH", "datasets/V1.1.csv")
+LOAD_MODE = os.getenv("LOAD_MODE", "batch")            # "batch", "stream" or "incremental"
+CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "50000"))      # rows per chunk in stream/incremental mode
+WRITE_WORKERS = int(os.getenv("WRITE_WORKERS", "4"))    # parallel insert threads in stream mode
+# "rows": one document per cross section, "buckets": one per weld (see bucket_layout.py)
+STORAGE_LAYOUT = os.getenv("STORAGE_LAYOUT", "rows")
+# Check rows against welding_validation.py and quarantine the failing ones ("0" loads everything)
+VALIDATE_ROWS = os.getenv("VALIDATE_ROWS", "1") != "0"
+
+# Columns that identify one cross section: the dataset version, the weld
+# (block + weld number), the position on the weld path and the parameter
+# combination. Versions without block/weld columns (V2) use the ones they have.
+ROW_KEY_COLUMNS = [
+    welding_schema.SOURCE_VERSION,
+    "Block",
+    "WeldNumber",
+    "CrossSectionPosition",
+] + welding_schema.FACTORS
+
+# Stages timed per load mode (rows and busy seconds, see StageStats)
+LOAD_STAGES = {
+    "batch": ["read", "validate", "clean", "quarantine", "insert"],
+    "stream": ["read", "validate", "clean", "quarantine", "insert"],
+    "incremental": ["read", "validate", "clean", "diff", "quarantine", "insert"],
+}
+
+
+def connect():
+    # Fail if any required credentials are missing
+    if not all([MONGO_HOST, MONGO_USER, MONGO_PASS]):
+        print("MongoDB credentials missing! Check .env file.")
+        sys.exit(1)
+
+    connection_string = f"mongodb://{MONGO_USER}:{MONGO_PASS}@{MONGO_HOST}:27017/"
+    print(f"Connecting to MongoDB at {MONGO_HOST}...")
+
+    try:
+        client = MongoClient(connection_string, serverSelectionTimeoutMS=5000)
+        client.admin.command("ping")  # Test connection
+        print("Successfully connected to MongoDB")
+    except Exception as e:
+        print(f"MongoDB connection failed: {e}")
+        sys.exit(1)
 
-# Fail if any required credentials are missing
-if not all([MONGO_HOST, MONGO_USER, MONGO_PASS]):
-    print("MongoDB credentials missing! Check .env file.")
-    sys.exit(1)
+    return client
+
+
+def peak_rss_mb():
+    # ru_maxrss is reported in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class StageStats:
+    """Accumulates rows and busy time per pipeline stage (thread-safe)."""
+
+    def __init__(self, stages):
+        self.rows = {stage: 0 for stage in stages}
+        self.seconds = {stage: 0.0 for stage in stages}
+        self._lock = threading.Lock()
+
+    def add(self, stage, rows, seconds):
+        with self._lock:
+            self.rows[stage] += rows
+            self.seconds[stage] += seconds
+
+    def report(self, wall_seconds):
+        print("\nStage throughput:")
+        for stage in self.rows:
+            rows, seconds = self.rows[stage], self.seconds[stage]
+            rate = rows / seconds if seconds > 0 else float("inf")
+            print(f"  {stage:<8} {rows:>12,} rows  {seconds:8.2f} s busy  {rate:14,.0f} rows/s")
+        total = self.rows[list(self.rows)[-1]]
+        print(f"  {'total':<8} {total:>12,} rows  {wall_seconds:8.2f} s wall  "
+              f"{total / wall_seconds if wall_seconds > 0 else 0:14,.0f} rows/s")
+        print(f"Peak RSS: {peak_rss_mb():.1f} MB")
+
+
+def to_documents(df, layout=STORAGE_LAYOUT):
+    """Documents for the rows of ``df``: records, or bucket upserts in the bucket layout."""
+    if layout == "buckets":
+        return bucket_layout.bucket_ops(df)
+    return df.to_dict(orient="records")
+
+
+def write_documents(collection, documents, layout=STORAGE_LAYOUT, ordered=True):
+    if not documents:
+        return
+    if layout == "buckets":
+        collection.bulk_write(documents, ordered=ordered)
+    else:
+        collection.insert_many(documents, ordered=ordered)
+
+
+# -----------------------------
+# Validation and quarantine
+# -----------------------------
+def validate_chunk(df, version, stats):
+    """Valid rows of ``df`` and the quarantine upserts of the rejected ones."""
+    if not VALIDATE_ROWS:
+        return df, []
+    start = time.perf_counter()
+    valid, rejected = welding_validation.validate(df, version)
+    quarantine = [] if rejected is None else quarantine_ops(rejected)
+    stats.add("validate", len(df), time.perf_counter() - start)
+    return valid, quarantine
+
+
+def quarantine_ops(rejected):
+    # Keyed by file and line, so loading a file again does not duplicate its rejects
+    now = time.time()
+    return [
+        ReplaceOne({"_id": f"{doc[welding_schema.SOURCE_FILE]}:{doc[welding_validation.LINE_COLUMN]}"},
+                   {**doc, "quarantined_at": now}, upsert=True)
+        for doc in welding_loader.storage_frame(rejected).to_dict(orient="records")
+    ]
+
+
+def write_quarantine(quarantine_collection, ops, stats):
+    if not ops:
+        return
+    start = time.perf_counter()
+    if quarantine_collection is not None:
+        quarantine_collection.bulk_write(ops, ordered=False)
+    stats.add("quarantine", len(ops), time.perf_counter() - start)
 
-connection_string = f"mongodb://{MONGO_USER}:{MONGO_PASS}@{MONGO_HOST}:27017/"
 
 # -----------------------------
-# Connect to MongoDB
+# Batch load (whole file at once)
 # -----------------------------
-print(f"Connecting to MongoDB at {MONGO_HOST}...")
+def load_batch(collection, csv_path, summary_collection=None, stats=None, layout=STORAGE_LAYOUT,
+               quarantine_collection=None):
+    stats = stats or StageStats(LOAD_STAGES["batch"])
+    try:
+        start = time.perf_counter()
+        version = welding_schema.detect_file_version(csv_path)
+        df = welding_loader.load(csv_path, version=version, source_file=os.path.basename(csv_path))
+        stats.add("read", len(df), time.perf_counter() - start)
+        print(f"Loaded CSV with {len(df)} rows")
+    except Exception as e:
+        print(f"Failed to read CSV: {e}")
+        sys.exit(1)
 
-try:
-    client = MongoClient(connection_string, serverSelectionTimeoutMS=5000)
-    client.admin.command("ping")  # Test connection
-    print("Successfully connected to MongoDB")
-except Exception as e:
-    print(f"MongoDB connection failed: {e}")
-    sys.exit(1)
+    try:
+        df, quarantine = validate_chunk(df, version, stats)
+        write_quarantine(quarantine_collection, quarantine, stats)
+        if quarantine:
+            print(f"Quarantined {len(quarantine)} invalid rows")
+
+        start = time.perf_counter()
+        df = welding_loader.storage_frame(df)
+        documents = to_documents(df, layout)
+        stats.add("clean", len(df), time.perf_counter() - start)
+        if documents:
+            start = time.perf_counter()
+            write_documents(collection, documents, layout)
+            if summary_collection is not None:
+                groups = summary.apply_chunk(summary_collection, df)
+            stats.add("insert", len(df), time.perf_counter() - start)
+            print(f"Inserted {len(df)} records into collection '{collection.name}'")
+            if summary_collection is not None:
+                print(f"Updated {groups} summary groups in '{summary_collection.name}'")
+        else:
+            print("No records to insert")
+    except Exception as e:
+        print(f"Failed to insert data into MongoDB: {e}")
+        sys.exit(1)
+    return len(df)
 
-db = client[MONGO_DB]
-collection = db[MONGO_COLLECTION]
 
 # -----------------------------
-# Load CSV and transform
+# Stream load (bounded memory)
 # -----------------------------
-csv_path = "datasets/V1.1.csv"
-try:
-    df = pd.read_csv(csv_path)
-    print(f"Loaded CSV with {len(df)} rows")
-except Exception as e:
-    print(f"Failed to read CSV: {e}")
-    sys.exit(1)
+def load_stream(collection, csv_path, chunk_size=CHUNK_SIZE, workers=WRITE_WORKERS, summary_collection=None,
+                stats=None, layout=STORAGE_LAYOUT, quarantine_collection=None):
+    """Read the CSV in chunks and insert them with a small pool of writer threads.
+
+    At most ``2 * workers`` converted chunks are held in memory at once, so the
+    peak footprint depends on the chunk size rather than on the file size.
+    Chunks are written with unordered ``insert_many`` so one bad document does
+    not stop the rest of its batch. The chunk's summary deltas are computed while
+    converting and applied once its insert succeeded.
+    """
+    stats = stats or StageStats(LOAD_STAGES["stream"])
+    in_flight = threading.BoundedSemaphore(2 * workers)
+    failed_chunks = []
+
+    def write_chunk(chunk_no, rows, documents, summary_ops, quarantine):
+        try:
+            write_quarantine(quarantine_collection, quarantine, stats)
+            start = time.perf_counter()
+            write_documents(collection, documents, layout, ordered=False)
+            if summary_ops:
+                summary_collection.bulk_write(summary_ops, ordered=False)
+            stats.add("insert", rows, time.perf_counter() - start)
+        except Exception as e:
+            print(f"Chunk {chunk_no} failed: {e}")
+            failed_chunks.append(chunk_no)
+        finally:
+            in_flight.release()
+
+    try:
+        version = welding_schema.detect_file_version(csv_path)
+        reader = welding_loader.read_csv(csv_path, chunksize=chunk_size)
+    except Exception as e:
+        print(f"Failed to read CSV: {e}")
+        sys.exit(1)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        chunk_no = 0
+        while True:
+            start = time.perf_counter()
+            try:
+                chunk = next(reader, None)
+            except Exception as e:
+                print(f"Failed to read CSV chunk {chunk_no}: {e}")
+                failed_chunks.append(chunk_no)
+                break
+            if chunk is None:
+                break
+            stats.add("read", len(chunk), time.perf_counter() - start)
+
+            welding_schema.normalize_frame(chunk, version, os.path.basename(csv_path))
+            chunk, quarantine = validate_chunk(chunk, version, stats)
+
+            start = time.perf_counter()
+            chunk = welding_loader.storage_frame(chunk)
+            rows = len(chunk)
+            documents = to_documents(chunk, layout)
+            summary_ops = summary.chunk_ops(chunk) if summary_collection is not None else []
+            stats.add("clean", rows, time.perf_counter() - start)
+            del chunk
+
+            if documents or quarantine:
+                # Blocks the reader while the writers are saturated
+                in_flight.acquire()
+                pool.submit(write_chunk, chunk_no, rows, documents, summary_ops, quarantine)
+            chunk_no += 1
+
+    if failed_chunks:
+        print(f"Failed chunks: {sorted(failed_chunks)}")
+        sys.exit(1)
+    print(f"Inserted {stats.rows['insert']} records into collection '{collection.name}'")
+    return stats.rows["insert"]
 
-df.columns = df.columns.str.strip()
 
 # -----------------------------
-# Insert data into MongoDB
+# Incremental load (idempotent upserts)
 # -----------------------------
-try:
-    records = df.to_dict(orient="records")
-    if records:
-        collection.insert_many(records)
-        print(f"Inserted {len(records)} records into collection '{MONGO_COLLECTION}'")
+def file_fingerprint(csv_path):
+    stat = os.stat(csv_path)
+    digest = hashlib.sha256()
+    with open(csv_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return {"size": stat.st_size, "mtime": stat.st_mtime, "sha256": digest.hexdigest()}
+
+
+def row_hashes(df, columns=None):
+    # Vectorized 64-bit hash per row, viewed as int64 so it fits a BSON long
+    frame = df if columns is None else df[columns]
+    return pd.util.hash_pandas_object(frame, index=False).to_numpy().view("int64")
+
+
+def hash_frame(df, columns=None):
+    """``df`` with one dtype per kind (float64 or object) for hashing.
+
+    The loader picks the narrowest dtype for the values of each chunk, so the
+    same value may be int8 in one chunk and float64 in the next.
+    """
+    columns = df.columns if columns is None else columns
+    return pd.DataFrame({
+        column: df[column].to_numpy(dtype="float64", na_value=np.nan)
+        if pd.api.types.is_numeric_dtype(df[column].dtype) else df[column].astype(object).to_numpy()
+        for column in columns
+    })
+
+
+def row_ids(df, occurrences):
+    """Deterministic ``_id`` of every row of ``df`` from ``ROW_KEY_COLUMNS``.
+
+    Files without a block column repeat the centre point runs under the same
+    key, so repeated keys are numbered in file order. ``occurrences`` (key ->
+    rows seen so far) is carried from chunk to chunk, so the numbering, and
+    with it the ``_id``, does not depend on where the chunks are cut (the key
+    values are hashed through ``hash_frame`` for the same reason).
+    """
+    key = pd.Series(row_hashes(hash_frame(df, [c for c in ROW_KEY_COLUMNS if c in df.columns])))
+    seen = key.map(occurrences).fillna(0).astype("int64")
+    keys = pd.DataFrame({"key": key, "occurrence": seen + key.groupby(key).cumcount()})
+    for value, count in key.value_counts().items():
+        occurrences[value] = occurrences.get(value, 0) + count
+    return row_hashes(keys)
+
+
+def changed_rows(collection, df, ids):
+    """Return the rows of ``df`` whose key is new or whose content hash changed,
+    and a mask of the returned rows that already existed (i.e. were modified).
+
+    The rows get their ``_id`` (``ids``, see ``row_ids``) and ``_row_hash`` columns.
+    """
+    df = df.assign(_id=ids, _row_hash=row_hashes(hash_frame(df)))
+
+    stored = {
+        doc["_id"]: doc.get("_row_hash")
+        for doc in collection.find({"_id": {"$in": df["_id"].tolist()}}, {"_row_hash": 1})
+    }
+    existing = df["_id"].isin(stored.keys())
+    if not stored:
+        return df, existing
+    unchanged = [stored.get(key) == row_hash for key, row_hash in zip(df["_id"], df["_row_hash"])]
+    changed = ~pd.Series(unchanged, index=df.index)
+    return df[changed], existing[changed]
+
+
+def delete_stale_rows(collection, summary_collection, version, source_file, produced, batch_size=CHUNK_SIZE):
+    """Delete the stored rows of a file whose ``_id`` is not in ``produced`` and fold them out of the summary."""
+    # Only the hashed (numeric) _ids of incremental loads; batch and stream loads write ObjectIds
+    match = {welding_schema.SOURCE_VERSION: version, welding_schema.SOURCE_FILE: source_file,
+             "_id": {"$type": "number"}}
+    with collection.find(match, {"_id": 1}).batch_size(batch_size) as cursor:
+        stored = np.fromiter((doc["_id"] for doc in cursor), dtype="int64")
+    stale = stored[~np.isin(stored, produced)].tolist()
+
+    for start in range(0, len(stale), batch_size):
+        batch = stale[start:start + batch_size]
+        rows = pd.DataFrame(list(collection.find({"_id": {"$in": batch}})))
+        collection.delete_many({"_id": {"$in": batch}})
+        if summary_collection is not None and not rows.empty:
+            summary.remove_rows(collection, summary_collection, rows.drop(columns=["_id", "_row_hash"], errors="ignore"))
+    if stale:
+        print(f"Deleted {len(stale)} rows of '{source_file}' that the file no longer contains")
+    return len(stale)
+
+
+def load_incremental(collection, meta_collection, csv_path, chunk_size=CHUNK_SIZE, summary_collection=None,
+                     stats=None, layout=STORAGE_LAYOUT, quarantine_collection=None):
+    """Upsert only new or changed rows and skip files that have not changed.
+
+    Every row gets a deterministic ``_id`` derived from ``ROW_KEY_COLUMNS``, so
+    re-running the load (e.g. after a container restart) never duplicates data.
+    A per-file watermark (size, mtime, sha256) is kept in the metadata
+    collection and an unchanged file is skipped without being parsed. Summary
+    groups only gaining rows are updated incrementally; groups with modified
+    rows are recomputed.
+
+    Stored rows of the file (same SourceVersion and SourceFile) whose ``_id``
+    the new content no longer produces, e.g. after a factor value was
+    corrected, are deleted and folded out of the summary.
+
+    In the bucket layout a changed file is reloaded as a whole: its weld
+    buckets are dropped, the rows appended again and the summary groups of the
+    file recomputed from the buckets.
+    """
+    watermark_id = f"file:{os.path.normpath(csv_path)}"
+    watermark = meta_collection.find_one({"_id": watermark_id}) or {}
+
+    stat = os.stat(csv_path)
+    if watermark.get("size") == stat.st_size and watermark.get("mtime") == stat.st_mtime:
+        print(f"'{csv_path}' unchanged since last load (size/mtime), skipping")
+        return 0
+    fingerprint = file_fingerprint(csv_path)
+    if watermark.get("sha256") == fingerprint["sha256"]:
+        meta_collection.update_one({"_id": watermark_id}, {"$set": fingerprint})
+        print(f"'{csv_path}' unchanged since last load (content hash), skipping")
+        return 0
+
+    stats = stats or StageStats(LOAD_STAGES["incremental"])
+    total_rows = upserted = modified = deleted = 0
+    touched_groups = []
+    occurrences = {}      # row key -> rows seen so far in the file, see row_ids
+    produced = []         # _ids of the file's valid rows, chunk by chunk
+    try:
+        if layout == "buckets":
+            collection.delete_many({welding_schema.SOURCE_FILE: os.path.basename(csv_path)})
+        version = welding_schema.detect_file_version(csv_path)
+        reader = welding_loader.read_csv(csv_path, chunksize=chunk_size)
+        while True:
+            start = time.perf_counter()
+            chunk = next(reader, None)
+            if chunk is None:
+                break
+            stats.add("read", len(chunk), time.perf_counter() - start)
+
+            welding_schema.normalize_frame(chunk, version, os.path.basename(csv_path))
+            total_rows += len(chunk)
+            chunk, quarantine = validate_chunk(chunk, version, stats)
+            write_quarantine(quarantine_collection, quarantine, stats)
+
+            start = time.perf_counter()
+            chunk = welding_loader.storage_frame(chunk)
+            stats.add("clean", len(chunk), time.perf_counter() - start)
+
+            if layout == "buckets":
+                start = time.perf_counter()
+                write_documents(collection, to_documents(chunk, layout), layout, ordered=False)
+                upserted += len(chunk)
+                if summary_collection is not None:
+                    group_keys = [c for c in summary.LEVELS["block"] if c in chunk.columns]
+                    touched_groups.append(chunk[group_keys].drop_duplicates())
+                stats.add("insert", len(chunk), time.perf_counter() - start)
+                continue
+
+            start = time.perf_counter()
+            ids = row_ids(chunk, occurrences)
+            produced.append(ids)
+            changed, existing = changed_rows(collection, chunk, ids)
+            stats.add("diff", len(chunk), time.perf_counter() - start)
+            if changed.empty:
+                continue
+
+            start = time.perf_counter()
+            requests = [
+                ReplaceOne({"_id": doc["_id"]}, doc, upsert=True)
+                for doc in changed.to_dict(orient="records")
+            ]
+            result = collection.bulk_write(requests, ordered=False)
+            upserted += result.upserted_count
+            modified += result.modified_count
+
+            if summary_collection is not None:
+                if existing.any():
+                    summary.rebuild_groups(collection, summary_collection, changed)
+                else:
+                    summary.apply_chunk(summary_collection, changed)
+            stats.add("insert", len(changed), time.perf_counter() - start)
+
+        if touched_groups:
+            summary.rebuild_groups(collection, summary_collection, pd.concat(touched_groups).drop_duplicates(),
+                                   fetch=lambda c, match: bucket_layout.frame(c.find(match)))
+        if layout != "buckets":
+            start = time.perf_counter()
+            deleted = delete_stale_rows(collection, summary_collection, version, os.path.basename(csv_path),
+                                        np.concatenate(produced) if produced else np.empty(0, dtype="int64"),
+                                        chunk_size)
+            stats.add("diff", deleted, time.perf_counter() - start)
+    except Exception as e:
+        print(f"Incremental load failed: {e}")
+        sys.exit(1)
+
+    # Only record the watermark once every chunk has been applied
+    meta_collection.replace_one(
+        {"_id": watermark_id},
+        {**fingerprint, "rows": total_rows, "loaded_at": time.time()},
+        upsert=True,
+    )
+    print(f"Scanned {total_rows} rows: {upserted} inserted, {modified} updated, "
+          f"{total_rows - upserted - modified} unchanged, {deleted} deleted")
+    return upserted + modified + deleted
+
+
+def bump_load_generation(meta_collection):
+    """Increment the load generation so API caches drop responses from older loads."""
+    doc = meta_collection.find_one_and_update(
+        {"_id": LOAD_GENERATION_ID},
+        {"$inc": {"generation": 1}, "$set": {"updated_at": time.time()}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    return doc["generation"]
+
+
+def load_file(db, csv_path, mode=LOAD_MODE):
+    """Load one CSV with the given mode and return the number of rows written."""
+    collection = db[MONGO_BUCKET_COLLECTION if STORAGE_LAYOUT == "buckets" else MONGO_COLLECTION]
+    summary_collection = db[MONGO_SUMMARY_COLLECTION]
+    meta_collection = db[MONGO_META_COLLECTION]
+    quarantine_collection = db[MONGO_QUARANTINE_COLLECTION]
+    stats = StageStats(LOAD_STAGES.get(mode, LOAD_STAGES["batch"]))
+    wall_start = time.perf_counter()
+    if mode == "stream":
+        print(f"Streaming '{csv_path}' in chunks of {CHUNK_SIZE} rows with {WRITE_WORKERS} writers")
+        rows = load_stream(collection, csv_path, summary_collection=summary_collection, stats=stats,
+                           quarantine_collection=quarantine_collection)
+    elif mode == "incremental":
+        print(f"Incremental load of '{csv_path}' in chunks of {CHUNK_SIZE} rows")
+        rows = load_incremental(collection, meta_collection, csv_path, summary_collection=summary_collection,
+                                stats=stats, quarantine_collection=quarantine_collection)
     else:
-        print("No records to insert")
-except Exception as e:
-    print(f"Failed to insert data into MongoDB: {e}")
-    sys.exit(1)
+        rows = load_batch(collection, csv_path, summary_collection=summary_collection, stats=stats,
+                          quarantine_collection=quarantine_collection)
+
+    wall_seconds = time.perf_counter() - wall_start
+    stats.report(wall_seconds)
+    etl_metrics.record_load(csv_path, mode, rows, wall_seconds, stats, peak_rss_mb())
+
+    if rows:
+        print(f"Load generation is now {bump_load_generation(meta_collection)}")
+    return rows
+
+
+def main():
+    print("Starting Data Transformation Process")
+    sampling_profiler.start_from_env("etl")
+
+    client = connect()
+    load_file(client[MONGO_DB], CSV_PATH)
+
+    print("Data Transformation Completed")
+
 
-print("Data Transformation Completed")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+import os
+import json
+import hashlib
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import welding_schema
+
+'''
+Typed loader for the steel-copper welding CSVs.
+
+Columns get their canonical names (welding_schema) and compact dtypes:
+
+    - factors, block, weld number and cross-section position: the smallest
+      integer type holding their values (float64 when they are fractional)
+    - measurements: float32
+    - Cracking: categorical
+
+A parsed file is cached as an uncompressed Arrow IPC file next to a JSON file
+with the source size, mtime and sha256. Warm loads memory-map the Arrow file;
+the CSV is parsed again only when its content changes.
+'''
+
+CACHE_DIR = os.getenv("WELDING_CACHE_DIR")   # default: .welding_cache next to the CSV
+CACHE_FORMAT = 1                             # bump when the cached dtypes change
+
+# Columns stored as the smallest integer type that holds them exactly
+INTEGER_COLUMNS = ['Block'] + welding_schema.FACTORS + ['WeldNumber', 'CrossSectionPosition']
+
+MEASUREMENTS = ['WeldWidthSteel', 'WeldWidthCopper', 'WeldDepthCopper', 'Gap',
+                'CrackCount', 'AvgCrackLength', 'CopperDilution']
+
+CATEGORICAL_COLUMNS = ['Cracking']
+
+
+# -----------------------------
+# Dtypes
+# -----------------------------
+def _read_dtypes(columns):
+    """read_csv dtypes keyed by the raw headers of a file."""
+    dtypes = {}
+    for raw in columns:
+        name = welding_schema.canonical_name(raw)
+        if name in MEASUREMENTS:
+            dtypes[raw] = 'float32'
+        elif name in CATEGORICAL_COLUMNS:
+            dtypes[raw] = 'category'
+    return dtypes
+
+
+def _downcast_integer(series):
+    values = series.to_numpy()
+    if not np.issubdtype(values.dtype, np.number) or np.isnan(values.astype('float64')).any():
+        return series
+    if not np.array_equal(values, np.round(values)):
+        return series
+    return pd.to_numeric(values.astype('int64'), downcast='integer')
+
+
+def compact_frame(df):
+    """Apply the compact dtypes to a frame with canonical column names."""
+    for column in INTEGER_COLUMNS:
+        if column in df.columns:
+            df[column] = _downcast_integer(df[column])
+    for column in MEASUREMENTS:
+        if column in df.columns and df[column].dtype != 'float32':
+            df[column] = pd.to_numeric(df[column], errors='coerce').astype('float32')
+    for column in CATEGORICAL_COLUMNS:
+        if column in df.columns and not isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = df[column].astype('category')
+    return df
+
+
+def _shortest_float64(values):
+    """float64 of the shortest decimal that reads back as each float32 value (what ``str`` would print)."""
+    wide = values.astype('float64')
+    out = wide.copy()
+    pending = np.flatnonzero(np.isfinite(wide) & (wide != 0))
+    exponent = np.floor(np.log10(np.abs(wide[pending]))).astype('int64')
+    # float32 needs at most 9 significant digits; try 1, 2, ... and keep the first that round-trips
+    for digits in range(1, 10):
+        if not pending.size:
+            break
+        shift = digits - 1 - exponent
+        scale = 10.0 ** np.abs(shift)
+        x = wide[pending]
+        candidate = np.where(shift >= 0, np.round(x * scale) / scale, np.round(x / scale) * scale)
+        exact = candidate.astype('float32') == values[pending]
+        out[pending[exact]] = candidate[exact]
+        pending, exponent = pending[~exact], exponent[~exact]
+    return out
+
+
+def storage_frame(df):
+    '''
+    Copy of ``df`` with the dtypes read_csv would have inferred: int64 for
+    integral columns, float64 otherwise and plain strings for categoricals.
+
+    Documents written to Mongo (and the row hashes of the incremental load)
+    therefore hold the same values as before the compact loader; float32
+    measurements are widened through their shortest decimal form, so 0.7 stays
+    0.7 instead of 0.699999988.
+    '''
+    out = df.copy()
+    for column in out.columns:
+        dtype = out[column].dtype
+        if isinstance(dtype, pd.CategoricalDtype):
+            out[column] = out[column].astype(object)
+        elif dtype == 'float32':
+            values = _shortest_float64(out[column].to_numpy())
+            integral = not np.isnan(values).any() and np.array_equal(values, np.round(values))
+            out[column] = values.astype('int64') if integral else values
+        elif pd.api.types.is_integer_dtype(dtype):
+            out[column] = out[column].astype('int64')
+    return out
+
+
+# -----------------------------
+# Parsing
+# -----------------------------
+def read_csv(csv_path, chunksize=None):
+    """Parse a welding CSV with canonical names and compact dtypes (an iterator of chunks with ``chunksize``)."""
+    header = pd.read_csv(csv_path, nrows=0).columns
+    reader = pd.read_csv(csv_path, dtype=_read_dtypes(header), chunksize=chunksize)
+    if chunksize is None:
+        return compact_frame(welding_schema.normalize_frame(reader))
+    return (compact_frame(welding_schema.normalize_frame(chunk)) for chunk in reader)
+
+
+# -----------------------------
+# Columnar cache
+# -----------------------------
+def _cache_paths(csv_path):
+    directory = CACHE_DIR or os.path.join(os.path.dirname(os.path.abspath(csv_path)), '.welding_cache')
+    # The path hash keeps files with the same name in different directories apart
+    stem = os.path.splitext(os.path.basename(csv_path))[0]
+    stem = f"{stem}-{hashlib.sha1(os.path.abspath(csv_path).encode()).hexdigest()[:8]}"
+    return os.path.join(directory, f"{stem}.arrow"), os.path.join(directory, f"{stem}.json")
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _cache_is_current(csv_path, table_path, meta_path):
+    if not (os.path.exists(table_path) and os.path.exists(meta_path)):
+        return False
+    with open(meta_path) as f:
+        meta = json.load(f)
+    if meta.get('format') != CACHE_FORMAT:
+        return False
+
+    stat = os.stat(csv_path)
+    if meta.get('size') == stat.st_size and meta.get('mtime') == stat.st_mtime:
+        return True
+    # Touched but possibly unchanged (e.g. a fresh checkout): compare the content
+    if meta.get('size') != stat.st_size or meta.get('sha256') != _file_sha256(csv_path):
+        return False
+    meta['mtime'] = stat.st_mtime
+    _write_json(meta_path, meta)
+    return True
+
+
+def _write_json(path, data):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def _write_cache(df, csv_path, table_path, meta_path):
+    os.makedirs(os.path.dirname(table_path), exist_ok=True)
+    # from_pandas=False keeps NaN as NaN instead of nulls, so numeric columns map back without a copy
+    arrays = [pa.array(df[c]) if isinstance(df[c].dtype, pd.CategoricalDtype)
+              else pa.array(df[c].to_numpy(), from_pandas=False) for c in df.columns]
+    table = pa.Table.from_arrays(arrays, names=list(df.columns))
+
+    tmp_path = f"{table_path}.tmp"
+    with pa.OSFile(tmp_path, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    os.replace(tmp_path, table_path)
+
+    stat = os.stat(csv_path)
+    _write_json(meta_path, {'format': CACHE_FORMAT, 'source': os.path.abspath(csv_path),
+                            'size': stat.st_size, 'mtime': stat.st_mtime, 'sha256': _file_sha256(csv_path)})
+
+
+def _read_cache(table_path):
+    source = pa.memory_map(table_path, 'r')
+    table = pa.ipc.open_file(source).read_all()
+    # split_blocks keeps one array per column, so numeric columns stay views of the mapped file
+    return table.to_pandas(split_blocks=True)
+
+
+def load(csv_path, use_cache=True, version=None, source_file=None):
+    '''
+    Typed frame of a welding CSV, from the columnar cache when it is current.
+
+    ``version``/``source_file`` tag the rows like ``welding_schema.normalize_frame``;
+    ``version=True`` detects the version from the header.
+    '''
+    table_path, meta_path = _cache_paths(csv_path)
+    df = None
+    if use_cache:
+        try:
+            if _cache_is_current(csv_path, table_path, meta_path):
+                df = _read_cache(table_path)
+        except (OSError, ValueError, pa.ArrowException) as e:
+            print(f"Ignoring unreadable cache for '{csv_path}': {e}")
+
+    if df is None:
+        df = read_csv(csv_path)
+        if use_cache:
+            try:
+                _write_cache(df, csv_path, table_path, meta_path)
+            except OSError as e:
+                print(f"Could not write cache for '{csv_path}': {e}")
+
+    if version is True:
+        version = welding_schema.detect_file_version(csv_path)
+    if version is not None:
+        df[welding_schema.SOURCE_VERSION] = version
+    if source_file is not None:
+        df[welding_schema.SOURCE_FILE] = str(source_file)
+    return df
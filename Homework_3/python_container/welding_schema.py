@@ -0,0 +1,118 @@
+import unicodedata
+import pandas as pd
+
+'''
+Schema registry for the steel-copper welding datasets (V1, V1.1, V2, V2.1).
+
+The four published variants name the same quantities differently
+("material thickness" vs "material strenght steel", "weld number" vs "weldnumber",
+"Block" vs "block", ...). Every known header is mapped to one canonical column
+set here, so the ETL, the analysis scripts and the API all agree on field names.
+'''
+
+# Canonical column set, in display order
+CANONICAL_COLUMNS = [
+    'Block',
+    'Power',
+    'WeldingSpeed',
+    'GasFlowRate',
+    'FocalPosition',
+    'AngularPosition',
+    'MaterialThickness',
+    'WeldNumber',
+    'CrossSectionPosition',
+    'Cracking',
+    'WeldWidthSteel',
+    'WeldWidthCopper',
+    'WeldDepthCopper',
+    'Gap',
+    'CrackCount',
+    'AvgCrackLength',
+    'CopperDilution',
+]
+
+# Process factors of the definitive screening design
+FACTORS = ['Power', 'WeldingSpeed', 'AngularPosition', 'FocalPosition', 'GasFlowRate', 'MaterialThickness']
+
+# Tag columns added to every normalized row
+SOURCE_VERSION = 'SourceVersion'
+SOURCE_FILE = 'SourceFile'
+
+# Raw header (any variant) -> canonical column
+COLUMN_ALIASES = {
+    'block': 'Block',
+    'power (W)': 'Power',
+    'welding speed (m/min)': 'WeldingSpeed',
+    'gas flow rate (l/min)': 'GasFlowRate',
+    'focal position (mm)': 'FocalPosition',
+    'angular position (°)': 'AngularPosition',
+    'material thickness (mm)': 'MaterialThickness',
+    'material strenght steel (mm)': 'MaterialThickness',
+    'weld number': 'WeldNumber',
+    'weldnumber': 'WeldNumber',
+    'cross section positon in the weld (mm)': 'CrossSectionPosition',
+    'position on the weld path (mm)': 'CrossSectionPosition',
+    'cracking in the weld metal': 'Cracking',
+    'cracking in the weld metal (yes/no)': 'Cracking',
+    'weld seam width steel (µm)': 'WeldWidthSteel',
+    'weld width steel (µm)': 'WeldWidthSteel',
+    'weld seam width copper (µm)': 'WeldWidthCopper',
+    'weld width copper (µm)': 'WeldWidthCopper',
+    'weld depth copper (µm)': 'WeldDepthCopper',
+    'welding depth copper (µm)': 'WeldDepthCopper',
+    'gap': 'Gap',
+    'gap (µm)': 'Gap',
+    'count of cracks': 'CrackCount',
+    'average crack lenght (µm)': 'AvgCrackLength',
+    'average copper dilution Wco.%': 'CopperDilution',
+}
+
+# Canonical columns that identify each dataset version
+VERSION_SIGNATURES = {
+    'V1': ['Power', 'WeldingSpeed', 'GasFlowRate', 'FocalPosition', 'AngularPosition', 'MaterialThickness',
+           'WeldNumber', 'CrossSectionPosition', 'Cracking', 'WeldWidthSteel', 'WeldWidthCopper',
+           'WeldDepthCopper', 'Gap'],
+    'V1.1': ['Block', 'Power', 'WeldingSpeed', 'GasFlowRate', 'FocalPosition', 'AngularPosition',
+             'MaterialThickness', 'WeldNumber', 'CrossSectionPosition', 'Cracking', 'WeldWidthSteel',
+             'WeldWidthCopper', 'WeldDepthCopper', 'Gap', 'CrackCount', 'AvgCrackLength'],
+    'V2': ['Power', 'WeldingSpeed', 'GasFlowRate', 'FocalPosition', 'AngularPosition', 'MaterialThickness',
+           'WeldDepthCopper'],
+    'V2.1': ['Block', 'Power', 'WeldingSpeed', 'GasFlowRate', 'FocalPosition', 'AngularPosition',
+             'MaterialThickness', 'WeldDepthCopper', 'CopperDilution'],
+}
+
+
+def _header_key(name):
+    # NFKC folds the micro sign into the greek mu, so both spellings of "µm" match
+    return unicodedata.normalize('NFKC', str(name)).strip().lower()
+
+
+_ALIAS_LOOKUP = {_header_key(raw): canonical for raw, canonical in COLUMN_ALIASES.items()}
+
+
+def canonical_name(column):
+    """Canonical name for a raw header, or the stripped header if it is unknown."""
+    return _ALIAS_LOOKUP.get(_header_key(column), str(column).strip())
+
+
+def detect_version(columns):
+    """Dataset version for a list of raw headers, or 'unknown' if no signature matches."""
+    canonical = {canonical_name(c) for c in columns}
+    for version, signature in VERSION_SIGNATURES.items():
+        if canonical == set(signature):
+            return version
+    return 'unknown'
+
+
+def detect_file_version(csv_path):
+    return detect_version(pd.read_csv(csv_path, nrows=0).columns)
+
+
+def normalize_frame(df, version=None, source_file=None):
+    """Rename ``df`` to canonical columns in place and tag it with its source version/file."""
+    df.columns = [canonical_name(c) for c in df.columns]
+    if version is not None:
+        df[SOURCE_VERSION] = version
+    if source_file is not None:
+        df[SOURCE_FILE] = str(source_file)
+    return df
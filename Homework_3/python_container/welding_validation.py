@@ -0,0 +1,142 @@
+import numpy as np
+import pandas as pd
+import welding_schema
+import welding_loader
+
+'''
+Validation stage of the ETL: declarative rules checked on whole chunks.
+
+Every rule is a vectorized column test, so a clean chunk costs a handful of
+numpy comparisons. Rows failing any rule are split off with the codes of all
+rules they broke, e.g. ["range:Power", "missing:Cracking"], and are written to
+the quarantine collection by transform_data.py instead of the data collection.
+
+Before the checks values are brought into canonical form: cracking answers are
+lower-cased ("Yes " -> "yes") and blank crack counts of uncracked cross
+sections become 0.
+'''
+
+# Columns every row of a dataset version must have a value in
+REQUIRED = {
+    'V1': welding_schema.FACTORS + ['WeldNumber', 'CrossSectionPosition', 'Cracking'],
+    'V1.1': ['Block'] + welding_schema.FACTORS + ['WeldNumber', 'CrossSectionPosition', 'Cracking'],
+    'V2': welding_schema.FACTORS + ['WeldDepthCopper'],
+    'V2.1': ['Block'] + welding_schema.FACTORS + ['WeldDepthCopper'],
+}
+
+# Physical limits (inclusive) of the process settings and measurements
+RANGES = {
+    'Power': (100, 10000),              # W
+    'WeldingSpeed': (0.01, 50),         # m/min
+    'GasFlowRate': (0, 100),            # l/min
+    'FocalPosition': (-20, 20),         # mm
+    'AngularPosition': (-90, 90),       # °
+    'MaterialThickness': (0.01, 10),    # mm
+    'CrossSectionPosition': (0, 10000), # mm
+    'WeldWidthSteel': (0, 20000),       # µm
+    'WeldWidthCopper': (0, 20000),
+    'WeldDepthCopper': (0, 20000),
+    'Gap': (0, 20000),
+    'CrackCount': (0, 1000),
+    'AvgCrackLength': (0, 20000),       # µm
+    'CopperDilution': (0, 100),         # wt.%
+}
+
+# Allowed values of categorical columns, and spellings mapped onto them
+ALLOWED = {'Cracking': ['yes', 'no']}
+SYNONYMS = {'Cracking': {'y': 'yes', 'n': 'no', 'true': 'yes', 'false': 'no', '1': 'yes', '0': 'no'}}
+
+# Columns holding counts or identifiers
+INTEGRAL = ['Block', 'WeldNumber', 'CrackCount']
+
+# column: (condition column, condition value, fill value) for blanks implied by another column
+FILL = {'CrackCount': ('Cracking', 'no', 0)}
+
+REASONS_COLUMN = '_reasons'
+LINE_COLUMN = '_line'
+
+
+def _canonical_category(column, value):
+    key = str(value).strip().lower()
+    return SYNONYMS.get(column, {}).get(key, key)
+
+
+def canonical_values(df):
+    """Canonical categorical spellings and implied fills (one pass over the categories).
+
+    Changed columns are replaced rather than written into, so frames backed by
+    the read-only memory map of the columnar cache can be validated too.
+    """
+    for column in ALLOWED:
+        if column not in df.columns:
+            continue
+        values = df[column]
+        if not isinstance(values.dtype, pd.CategoricalDtype):
+            values = values.astype('category')
+        categories = values.cat.categories
+        mapping = {c: _canonical_category(column, c) for c in categories}
+        if any(mapping[c] != c for c in categories):
+            values = values.map(mapping).astype('category')
+        df[column] = values
+    for column, (condition, value, fill) in FILL.items():
+        if column in df.columns and condition in df.columns:
+            blank = df[column].isna() & (df[condition] == value)
+            if blank.any():
+                df[column] = df[column].mask(blank, fill)
+    return df
+
+
+def _numbers(series):
+    return pd.to_numeric(series, errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+
+
+def checks(df, version):
+    """(reason code, mask of failing rows) for every rule that applies to ``df``."""
+    rows = len(df)
+    found = []
+    if version not in REQUIRED:
+        return [('unknown_version', np.ones(rows, dtype=bool))]
+    for column in REQUIRED[version]:
+        if column not in df.columns:
+            found.append((f'missing_column:{column}', np.ones(rows, dtype=bool)))
+        else:
+            found.append((f'missing:{column}', df[column].isna().to_numpy()))
+    for column, (low, high) in RANGES.items():
+        if column in df.columns:
+            values = _numbers(df[column])
+            # NaN compares False, blanks are the business of the required columns
+            found.append((f'range:{column}', (values < low) | (values > high)))
+    for column, allowed in ALLOWED.items():
+        if column in df.columns:
+            values = df[column]
+            found.append((f'value:{column}', (values.notna() & ~values.isin(allowed)).to_numpy()))
+    for column in INTEGRAL:
+        if column in df.columns and not pd.api.types.is_integer_dtype(df[column].dtype):
+            values = _numbers(df[column])
+            found.append((f'not_integer:{column}', ~np.isnan(values) & (values != np.round(values))))
+    return found
+
+
+def validate(df, version):
+    """Split a chunk into valid rows and rejected rows with their reason codes.
+
+    Returns ``(valid, rejected)``; ``rejected`` is None for a clean chunk and
+    otherwise carries the reason codes and the CSV line of every row.
+    """
+    canonical_values(df)
+    found = checks(df, version)
+    failed = np.zeros(len(df), dtype=bool)
+    for _, mask in found:
+        failed |= mask
+    if not failed.any():
+        return df, None
+
+    rejected = df[failed].copy()
+    reasons = [[] for _ in range(len(rejected))]
+    for code, mask in found:
+        for i in np.flatnonzero(mask[failed]):
+            reasons[i].append(code)
+    rejected[REASONS_COLUMN] = reasons
+    # Chunks keep the running row number of the file; +2 for the header and 1-based lines
+    rejected[LINE_COLUMN] = rejected.index.to_numpy() + 2
+    return welding_loader.compact_frame(df[~failed].copy()), rejected
@@ -0,0 +1,217 @@
+import numpy as np
+import pandas as pd
+from pymongo import ASCENDING, UpdateOne
+
+'''
+Bucketed storage layout of the welding data, shared from Homework_3/shared by
+python_container and flask_api.
+
+Instead of one document per cross-section row, every weld is one document: the
+fields shared by its rows are stored once and the cross-section measurements
+are held as arrays under short field names, index i of every array being the
+i-th cross section:
+
+    {_id: <hash of the weld key>, SourceVersion, SourceFile, Block, WeldNumber,
+     Power, WeldingSpeed, ..., n: 20, x: [8, 16, ...], c: ['no', 'yes', ...],
+     ws: [2097, 2069, ...], wc: [...], d: [...], ...}
+
+The weld fields keep their canonical names, so the factor filters, the indexes
+and the summary groups work on buckets unchanged. Versions without block/weld
+columns (V2) get one bucket per parameter combination.
+'''
+
+# Fields shared by all rows of a weld; together they identify the bucket
+BUCKET_FIELDS = ['SourceVersion', 'SourceFile', 'Block', 'WeldNumber',
+                 'Power', 'WeldingSpeed', 'GasFlowRate', 'FocalPosition', 'AngularPosition', 'MaterialThickness']
+
+# Per cross-section field -> array field in the bucket
+ROW_FIELDS = {
+    'CrossSectionPosition': 'x',
+    'Cracking': 'c',
+    'WeldWidthSteel': 'ws',
+    'WeldWidthCopper': 'wc',
+    'WeldDepthCopper': 'd',
+    'Gap': 'g',
+    'CrackCount': 'cc',
+    'AvgCrackLength': 'cl',
+    'CopperDilution': 'cd',
+}
+
+# Row layout column order of the flattened rows
+ROW_ORDER = ['Block', 'Power', 'WeldingSpeed', 'GasFlowRate', 'FocalPosition', 'AngularPosition',
+             'MaterialThickness', 'WeldNumber', 'CrossSectionPosition', 'Cracking', 'WeldWidthSteel',
+             'WeldWidthCopper', 'WeldDepthCopper', 'Gap', 'CrackCount', 'AvgCrackLength', 'CopperDilution',
+             'SourceVersion', 'SourceFile']
+
+# Bucket counterparts of the row layout indexes (see flask_api/query_filters.py)
+BUCKET_INDEXES = {
+    'cracking_power': [('c', ASCENDING), ('Power', ASCENDING), ('_id', ASCENDING)],
+    'parameter_combination': [
+        ('Power', ASCENDING),
+        ('WeldingSpeed', ASCENDING),
+        ('GasFlowRate', ASCENDING),
+        ('FocalPosition', ASCENDING),
+        ('AngularPosition', ASCENDING),
+        ('MaterialThickness', ASCENDING),
+        ('_id', ASCENDING),
+    ],
+    'block_weld': [('Block', ASCENDING), ('WeldNumber', ASCENDING), ('_id', ASCENDING)],
+}
+
+
+# -----------------------------
+# Writing (ETL)
+# -----------------------------
+def bucket_ids(df):
+    keys = df[[c for c in BUCKET_FIELDS if c in df.columns]]
+    # Chunks infer their own dtypes (1 vs 1.0), numbers are hashed as floats so
+    # the rows of a weld split across chunks land in the same bucket
+    keys = keys.apply(lambda column: column.astype('float64') if pd.api.types.is_numeric_dtype(column) else column)
+    return pd.util.hash_pandas_object(keys, index=False).to_numpy().view('int64')
+
+
+def _native(value):
+    if isinstance(value, np.generic):
+        value = value.item()
+    return value
+
+
+def bucket_ops(df):
+    """Upserts appending the rows of ``df`` to their weld buckets.
+
+    Rows are grouped with one stable sort, so a chunk costs one update per weld
+    no matter how many cross sections it holds. Welds split across chunks are
+    completed by the next chunk's $push.
+    """
+    if df.empty:
+        return []
+    keys = [c for c in BUCKET_FIELDS if c in df.columns]
+    arrays = [c for c in ROW_FIELDS if c in df.columns]
+    ids = bucket_ids(df)
+    order = np.argsort(ids, kind='stable')
+    ids = ids[order]
+    starts = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]])
+    ends = np.r_[starts[1:], len(ids)]
+
+    key_values = {c: df[c].to_numpy()[order][starts].tolist() for c in keys}
+    columns = {c: df[c].to_numpy()[order].tolist() for c in arrays}
+
+    ops = []
+    for i, (start, end) in enumerate(zip(starts, ends)):
+        push = {ROW_FIELDS[c]: {'$each': columns[c][start:end]} for c in arrays}
+        update = {
+            '$setOnInsert': {c: key_values[c][i] for c in keys},
+            '$inc': {'n': int(end - start)},
+            '$push': push,
+        }
+        ops.append(UpdateOne({'_id': _native(ids[start])}, update, upsert=True))
+    return ops
+
+
+# -----------------------------
+# Reading
+# -----------------------------
+_MATCHERS = {
+    '$eq': lambda v, x: v == x,
+    '$ne': lambda v, x: v != x,
+    '$gt': lambda v, x: v is not None and v > x,
+    '$gte': lambda v, x: v is not None and v >= x,
+    '$lt': lambda v, x: v is not None and v < x,
+    '$lte': lambda v, x: v is not None and v <= x,
+    '$in': lambda v, x: v in x,
+}
+
+
+def condition_matches(value, condition):
+    """Whether a value passes a filter condition such as ``{'$gte': 1200.0}``."""
+    return all(_MATCHERS[op](value, x) for op, x in condition.items())
+
+
+def split_query(query):
+    """Split a row layout filter into a bucket filter and the per-row conditions.
+
+    Conditions on cross-section fields select buckets with ``$elemMatch`` and
+    are checked again per array element while flattening.
+    """
+    bucket_query, row_filter = {}, {}
+    for field, condition in query.items():
+        short = ROW_FIELDS.get(field)
+        if short is None:
+            bucket_query[field] = condition
+        else:
+            bucket_query[short] = {'$elemMatch': condition}
+            row_filter[short] = condition
+    return bucket_query, row_filter
+
+
+def bucket_projection(projection, row_filter):
+    """Bucket projection for a row layout projection (``None``: everything)."""
+    if projection is None:
+        return None
+    fields = {ROW_FIELDS.get(field, field): 1 for field in projection}
+    fields.update({short: 1 for short in row_filter})
+    fields['n'] = 1
+    return fields
+
+
+def matching_rows(doc, row_filter, after=-1, until=None):
+    """Array indices of the rows in ``doc`` passing ``row_filter``, in (after, until]."""
+    stop = doc.get('n', 0) if until is None else min(until + 1, doc.get('n', 0))
+    indices = range(after + 1, stop)
+    for short, condition in row_filter.items():
+        values = doc.get(short, [])
+        indices = [i for i in indices
+                   if i < len(values) and condition_matches(values[i], condition)]
+    return list(indices)
+
+
+def flatten(docs, row_filter=None, start=None, end=None, fields=None):
+    """Rows of bucket documents in row layout order.
+
+    ``start``/``end`` are positions ``{'_id': bucket id, 'i': array index}``:
+    rows up to and including ``start`` are skipped and rows after ``end`` are
+    not produced. ``fields`` restricts the rows to the listed columns.
+    """
+    row_filter = row_filter or {}
+    for doc in docs:
+        after = start['i'] if start and doc['_id'] == start['_id'] else -1
+        until = end['i'] if end and doc['_id'] == end['_id'] else None
+        shared = {field: doc[field] for field in ROW_ORDER if field in doc}
+        arrays = [(field, doc[short]) for field, short in ROW_FIELDS.items() if short in doc]
+        for i in matching_rows(doc, row_filter, after, until):
+            row = dict(shared)
+            row.update((field, values[i]) for field, values in arrays if i < len(values))
+            row = {field: row[field] for field in ROW_ORDER if field in row}
+            if fields is not None:
+                row = {field: value for field, value in row.items() if field in fields}
+            yield row
+
+
+def frame(docs):
+    """DataFrame of the flattened rows of bucket documents."""
+    return pd.DataFrame(list(flatten(docs)))
+
+
+def page_end(cursor, row_filter, start, limit):
+    """Position of the last row of a page of ``limit`` rows and whether more follow.
+
+    ``cursor`` yields the matching buckets (``_id``, ``n`` and the row filter
+    fields are enough) in ``_id`` order from the bucket of ``start`` on.
+    """
+    remaining, end = limit, None
+    try:
+        for doc in cursor:
+            after = start['i'] if start and doc['_id'] == start['_id'] else -1
+            indices = matching_rows(doc, row_filter, after)
+            if not indices:
+                continue
+            if remaining == 0:
+                return end, True
+            taken = indices[:remaining]
+            remaining -= len(taken)
+            end = {'_id': doc['_id'], 'i': taken[-1]}
+            if len(taken) < len(indices):
+                return end, True
+    finally:
+        cursor.close()
+    return end, False
@@ -0,0 +1,98 @@
+import os
+import sys
+import time
+import atexit
+import threading
+from collections import Counter
+
+'''
+Opt-in sampling profiler, shared from Homework_3/shared by flask_api and python_container.
+
+A background thread records the Python stack of every other thread every
+PROFILE_INTERVAL_MS milliseconds. Samples are wall-clock, so threads waiting on
+MongoDB or a lock show up where they wait. Stacks are written in the "folded"
+format read by flamegraph.pl and speedscope:
+
+    main (transform_data.py:339);load_file (transform_data.py:311);... 42
+
+Enable with PROFILE_INTERVAL_MS=10; files go to PROFILE_DIR (default: the
+working directory) as <name>-<pid>.folded when the process exits.
+'''
+
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "0"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", ".")
+
+
+class SamplingProfiler:
+
+    def __init__(self, interval=0.01, output=None):
+        self.interval = interval
+        self.output = output
+        self.stacks = Counter()
+        self.samples = 0
+        self.busy_seconds = 0.0   # time spent taking samples, i.e. the overhead
+        self._labels = {}         # code object -> frame label
+        self._stop = threading.Event()
+        self._thread = None
+        self._started_at = None
+
+    def _label(self, code):
+        label = self._labels.get(code)
+        if label is None:
+            label = self._labels[code] = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+        return label
+
+    def sample(self):
+        own = threading.get_ident()
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(self._label(frame.f_code))
+                frame = frame.f_back
+            self.stacks[";".join(reversed(stack))] += 1
+        self.samples += 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            start = time.perf_counter()
+            self.sample()
+            self.busy_seconds += time.perf_counter() - start
+
+    def start(self):
+        self._started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def overhead(self):
+        elapsed = time.perf_counter() - self._started_at if self._started_at else 0.0
+        return self.busy_seconds / elapsed if elapsed > 0 else 0.0
+
+    def folded(self):
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        if self.output:
+            with open(self.output, "w") as f:
+                f.write(self.folded())
+            print(f"Profile with {self.samples} samples written to '{self.output}' "
+                  f"(sampling overhead {self.overhead():.2%})")
+
+
+def start_from_env(name):
+    """Start a profiler when PROFILE_INTERVAL_MS is set; it writes its file at exit."""
+    if PROFILE_INTERVAL_MS <= 0:
+        return None
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    output = os.path.join(PROFILE_DIR, f"{name}-{os.getpid()}.folded")
+    profiler = SamplingProfiler(PROFILE_INTERVAL_MS / 1000, output).start()
+    atexit.register(profiler.stop)
+    print(f"Sampling profiler every {PROFILE_INTERVAL_MS:g} ms, writing to '{output}'")
+    return profiler
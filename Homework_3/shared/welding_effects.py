@@ -0,0 +1,209 @@
+from itertools import combinations
+import numpy as np
+import pandas as pd
+
+'''
+Effect analysis of the definitive screening design (DSD) of the welding datasets.
+
+    - main effects and two-factor interaction effects of the six factors
+    - least-squares linear model (e.g. weld depth in V2)
+    - logistic model of cracking (V1/V1.1)
+
+Used by the analysis in Homework_1_2/homework and by the /predict model of the
+API (flask_api/weld_model.py), so both fit the same estimators.
+
+Factors are coded to -1/0/+1 (low/centre/high level). Every estimator takes an
+optional weight matrix of shape (fits, rows): one row of weights per model. A
+bootstrap resample is a row of multinomial counts and a per-block subset is a
+0/1 row, so thousands of models are fitted together with a few matrix products
+instead of a Python loop over resamples.
+
+The sums a weighted fit needs (X'WX, X'Wy) are linear in the weights, so for all
+fits at once they are one product of the weight matrix with the per-row outer
+products of the model matrix.
+'''
+
+# -----------------------------
+# Design
+# -----------------------------
+def code_factors(df, factors):
+    """Factor levels scaled to [-1, 1] around the centre of their range."""
+    values = df[factors].to_numpy(dtype='float64')
+    low, high = values.min(axis=0), values.max(axis=0)
+    half_range = np.where(high > low, (high - low) / 2, 1.0)
+    return (values - (high + low) / 2) / half_range
+
+
+def interaction_pairs(factors):
+    return list(combinations(range(len(factors)), 2))
+
+
+def model_matrix(coded, factors, interactions=False):
+    """Intercept, main effect and two-factor interaction columns.
+
+    ``interactions`` is True for all pairs or a list of (i, j) factor index pairs.
+    """
+    columns = [np.ones(len(coded)), *coded.T]
+    terms = ['Intercept', *factors]
+    pairs = interaction_pairs(factors) if interactions is True else (interactions or [])
+    for i, j in pairs:
+        columns.append(coded[:, i] * coded[:, j])
+        terms.append(f'{factors[i]}:{factors[j]}')
+    return np.column_stack(columns), terms
+
+
+def _weight_matrix(weights, n_rows):
+    if weights is None:
+        return np.ones((1, n_rows))
+    weights = np.asarray(weights, dtype='float64')
+    return weights[None, :] if weights.ndim == 1 else weights
+
+
+def bootstrap_weights(n_rows, resamples, seed=0):
+    """Multinomial resampling counts, one row per bootstrap resample."""
+    rng = np.random.default_rng(seed)
+    return rng.multinomial(n_rows, np.full(n_rows, 1 / n_rows), size=resamples).astype('float64')
+
+
+def group_weights(labels):
+    """0/1 weight rows selecting every group (e.g. block) of ``labels``."""
+    codes, groups = pd.factorize(pd.Series(labels), sort=True)
+    return (codes[None, :] == np.arange(len(groups))[:, None]).astype('float64'), list(groups)
+
+
+# -----------------------------
+# Effects
+# -----------------------------
+def _level_difference(contrasts, y, weights):
+    """Weighted mean of y where a contrast is +1 minus where it is -1, for all fits."""
+    high = (contrasts > 0).astype('float64')
+    low = (contrasts < 0).astype('float64')
+    wy = weights * y
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return (wy @ high) / (weights @ high) - (wy @ low) / (weights @ low)
+
+
+def main_effects(coded, y, weights=None):
+    """Mean response at the high level minus the low level, shape (fits, factors)."""
+    return _level_difference(coded, y, _weight_matrix(weights, len(y)))
+
+
+def interaction_effects(coded, y, weights=None):
+    """Two-factor interaction effects, shape (fits, pairs)."""
+    pairs = interaction_pairs(range(coded.shape[1]))
+    products = np.column_stack([coded[:, i] * coded[:, j] for i, j in pairs])
+    return _level_difference(products, y, _weight_matrix(weights, len(y)))
+
+
+# -----------------------------
+# Models
+# -----------------------------
+def _outer_rows(X):
+    """Per-row outer products x x', flattened to shape (rows, p * p)."""
+    return (X[:, :, None] * X[:, None, :]).reshape(len(X), -1)
+
+
+def _batched_solve(gram, rhs, ridge):
+    # ridge: one penalty for all terms or one per term
+    p = gram.shape[-1]
+    penalty = np.diag(np.broadcast_to(np.asarray(ridge, dtype='float64'), (p,))).copy()
+    penalty[0, 0] = 0.0   # no penalty on the intercept
+    return np.linalg.solve(gram + penalty, rhs[..., None])[..., 0]
+
+
+def least_squares(X, y, weights=None, ridge=1e-9):
+    """Weighted least-squares coefficients for every weight row, shape (fits, p)."""
+    if weights is None:
+        # One unweighted fit: X'X directly, without the per-row outer products
+        return _batched_solve((X.T @ X)[None], (y @ X)[None], ridge)
+    W = _weight_matrix(weights, len(y))
+    p = X.shape[1]
+    gram = (W @ _outer_rows(X)).reshape(-1, p, p)
+    return _batched_solve(gram, (W * y) @ X, ridge)
+
+
+def logistic(X, y, weights=None, ridge=1e-2, iterations=50, tol=1e-8):
+    '''
+    Logistic regression coefficients for every weight row, fitted together by
+    Newton-Raphson (IRLS). The small ridge keeps the fit finite when a resample
+    separates the classes perfectly.
+    '''
+    W = _weight_matrix(weights, len(y))
+    p = X.shape[1]
+    outer = None if weights is None else _outer_rows(X)
+    beta = np.zeros((len(W), p))
+    for _ in range(iterations):
+        prob = 1 / (1 + np.exp(-np.clip(beta @ X.T, -30, 30)))
+        if outer is None:
+            gram = ((X * (prob[0] * (1 - prob[0]))[:, None]).T @ X)[None]
+        else:
+            gram = ((W * prob * (1 - prob)) @ outer).reshape(-1, p, p)
+        gradient = (W * (y - prob)) @ X
+        penalty = ridge * beta
+        penalty[:, 0] = 0.0
+        step = _batched_solve(gram, gradient - penalty, ridge)
+        beta += step
+        if np.abs(step).max() < tol:
+            break
+    return beta
+
+
+# -----------------------------
+# Analysis
+# -----------------------------
+def summarize(estimate, samples, terms, level=0.95):
+    """Point estimate with bootstrap mean, standard error and percentile interval per term."""
+    tail = (1 - level) / 2 * 100
+    return pd.DataFrame({
+        'estimate': estimate,
+        'boot_mean': np.nanmean(samples, axis=0),
+        'std_error': np.nanstd(samples, axis=0, ddof=1),
+        'ci_low': np.nanpercentile(samples, tail, axis=0),
+        'ci_high': np.nanpercentile(samples, 100 - tail, axis=0),
+    }, index=pd.Index(terms, name='term'))
+
+
+def significant_interactions(coded, y, resamples=200, level=0.95, seed=0):
+    """(i, j) pairs whose interaction effect has a bootstrap interval excluding 0, strongest first."""
+    pairs = interaction_pairs(range(coded.shape[1]))
+    weights = bootstrap_weights(len(y), resamples, seed)
+    table = summarize(interaction_effects(coded, y)[0], interaction_effects(coded, y, weights), range(len(pairs)))
+    significant = table[(table['ci_low'] > 0) | (table['ci_high'] < 0)]
+    strength = (significant['estimate'].abs() / significant['std_error']).sort_values(ascending=False)
+    return [pairs[i] for i in strength.index]
+
+
+def analyze(df, factors, response='WeldDepthCopper', resamples=1000, interactions=False, seed=0):
+    '''
+    Main effects, interaction effects, the linear model of ``response`` and,
+    when the data has a Cracking column, the logistic model of cracking, each
+    with a bootstrap over ``resamples`` resamples of the rows.
+    '''
+    data = df.dropna(subset=factors + [response])
+    coded = code_factors(data, factors)
+    y = data[response].to_numpy(dtype='float64')
+    weights = bootstrap_weights(len(data), resamples, seed)
+    pairs = [f'{factors[i]}:{factors[j]}' for i, j in interaction_pairs(factors)]
+    X, terms = model_matrix(coded, factors, interactions)
+
+    results = {
+        'main_effects': summarize(main_effects(coded, y)[0], main_effects(coded, y, weights), factors),
+        'interactions': summarize(interaction_effects(coded, y)[0], interaction_effects(coded, y, weights), pairs),
+        'linear_model': summarize(least_squares(X, y)[0], least_squares(X, y, weights), terms),
+    }
+
+    if 'Cracking' in data.columns:
+        cracked = (data['Cracking'] == 'yes').to_numpy(dtype='float64')
+        X_main, main_terms = model_matrix(coded, factors)
+        results['logistic_model'] = summarize(logistic(X_main, cracked)[0],
+                                              logistic(X_main, cracked, weights), main_terms)
+    return results
+
+
+def fit_by_group(df, factors, group='Block', response='WeldDepthCopper', interactions=False):
+    """Linear model coefficients fitted separately for every group, one row per group."""
+    data = df.dropna(subset=factors + [response, group])
+    X, terms = model_matrix(code_factors(data, factors), factors, interactions)
+    weights, groups = group_weights(data[group])
+    coefficients = least_squares(X, data[response].to_numpy(dtype='float64'), weights)
+    return pd.DataFrame(coefficients, index=pd.Index(groups, name=group), columns=terms)
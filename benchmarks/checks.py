@@ -0,0 +1,230 @@
+import sys
+import json
+import time
+import argparse
+import tempfile
+import shutil
+import threading
+from pathlib import Path
+import pandas as pd
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import generators
+from run_benchmarks import REPO_ROOT, quiet, mongo_db, reset_db
+
+'''
+Behaviour checks of the code paths the benchmarks time but do not verify.
+
+    explain    filtered /data pages are read in _id order from an index (no SORT stage)
+    etl_cache  a batch load from the columnar cache (read-only, memory-mapped) matches the CSV load
+    nrel       NRELFetcher retries 429/5xx, honours its token bucket and serves repeats from disk
+
+Examples:
+
+    python benchmarks/checks.py
+    MONGO_HOST=localhost MONGO_USER=... MONGO_PASS=... python benchmarks/checks.py --checks explain
+
+Checks that need MongoDB use the benchmark database (BENCH_MONGO_DB) and are
+skipped when no mongod is reachable. The script exits with 1 if a check fails.
+'''
+
+
+class Skipped(Exception):
+    pass
+
+
+def require_mongo():
+    db, transform_data = mongo_db()
+    if db is None:
+        raise Skipped("MongoDB not reachable (set MONGO_HOST, MONGO_USER, MONGO_PASS)")
+    return db, transform_data
+
+
+# -----------------------------
+# Checks
+# -----------------------------
+def check_explain(workdir):
+    db, transform_data = require_mongo()
+    sys.path.append(str(REPO_ROOT / 'Homework_3' / 'flask_api'))
+    with quiet():
+        import app as api
+    if api.STORAGE_LAYOUT != 'rows':
+        raise Skipped("explain check covers the rows layout")
+    client = api.app.test_client()
+
+    csv_path = generators.WeldingGenerator().write_csv(Path(workdir) / 'welding_explain.csv', 20000)
+    reset_db(db, transform_data)
+    try:
+        with quiet():
+            transform_data.load_file(db, str(csv_path), 'batch')
+            client.get('/readyz')
+        row = db[transform_data.MONGO_COLLECTION].find_one()
+        queries = {
+            'cracking_power': f"cracking=yes&power={row['Power']}",
+            'parameter_combination': (f"power={row['Power']}&speed={row['WeldingSpeed']}"
+                                      f"&gas_flow={row['GasFlowRate']}&focal={row['FocalPosition']}"
+                                      f"&angle={row['AngularPosition']}&thickness={row['MaterialThickness']}"),
+            'block_weld': f"block={row['Block']}&weld={row['WeldNumber']}",
+        }
+        for index, query in queries.items():
+            summary = client.get(f"/data?{query}&limit=100&explain=1").get_json()
+            assert 'error' not in summary, summary
+            assert summary['indexed'], f"{query}: not served by an index ({summary['stages']})"
+            assert not summary['in_memory_sort'], f"{query}: SORT stage in the winning plan ({summary['stages']})"
+            print(f"    {index}: {' <- '.join(summary['stages'])}", file=sys.stderr)
+    finally:
+        reset_db(db, transform_data)
+
+
+def check_etl_cache(workdir):
+    db, transform_data = mongo_db()
+    import welding_loader
+    welding_loader.CACHE_DIR = str(Path(workdir) / 'cache')
+    # Cracking 'no' with a blank CrackCount makes validation fill 0, a write into the frame
+    csv_path = generators.WeldingGenerator().write_csv(Path(workdir) / 'welding_cache.csv', 20000)
+
+    if db is None:
+        # Without MongoDB: the batch load's frame path up to the documents, once from the CSV, once from the cache
+        version = transform_data.welding_schema.detect_file_version(str(csv_path))
+        loads = []
+        for _ in range(2):
+            stats = transform_data.StageStats(transform_data.LOAD_STAGES['batch'])
+            with quiet():
+                df = welding_loader.load(str(csv_path), version=version, source_file=csv_path.name)
+                df, _ = transform_data.validate_chunk(df, version, stats)
+                loads.append(transform_data.to_documents(welding_loader.storage_frame(df)))
+        # Compared as frames: NaN measurements are equal there, unlike in the dicts
+        assert pd.DataFrame(loads[0]).equals(pd.DataFrame(loads[1])), "documents from the cache differ from the CSV load"
+        print(f"    {len(loads[1])} documents from the cache (no MongoDB, nothing inserted)", file=sys.stderr)
+        return
+
+    collection = db[transform_data.MONGO_BUCKET_COLLECTION if transform_data.STORAGE_LAYOUT == 'buckets'
+                    else transform_data.MONGO_COLLECTION]
+    try:
+        counts = []
+        for _ in range(2):
+            reset_db(db, transform_data)
+            with quiet():
+                transform_data.load_file(db, str(csv_path), 'batch')
+            counts.append(collection.count_documents({}))
+        assert counts[0] == counts[1] > 0, f"rows inserted from the CSV and from the cache: {counts}"
+    finally:
+        reset_db(db, transform_data)
+
+
+class PVWattsStub(BaseHTTPRequestHandler):
+    '''Local PVWatts stand-in: /flaky/<n> fails n times (429, then 503) before answering.'''
+
+    calls = {}
+
+    def do_GET(self):
+        path = self.path.split('?')[0]
+        calls = self.calls[path] = self.calls.get(path, 0) + 1
+        parts = path.strip('/').split('/')
+        if parts[0] == 'missing':
+            self.send_response(404)
+            self.end_headers()
+            return
+        failures = int(parts[1]) if parts[0] == 'flaky' else 0
+        if calls <= failures:
+            self.send_response(429 if calls == 1 else 503)
+            self.send_header('Retry-After', '0')
+            self.end_headers()
+            return
+        body = json.dumps(generators.pvwatts_response()).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def check_nrel(workdir):
+    sys.path.append(str(REPO_ROOT / 'Homework_1_2' / 'homework'))
+    import homework_2
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), PVWattsStub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+    PVWattsStub.calls = {}
+    cache_dir = str(Path(workdir) / 'nrel_cache')
+    params = {'api_key': 'DEMO_KEY', 'lat': 34.0522, 'lon': -118.2437}
+    try:
+        # Retries: two failures (429, 503) then a response, which is cached
+        fetcher = homework_2.NRELFetcher(max_workers=1, rate_per_hour=3600 * 1000, max_retries=2,
+                                         backoff=0.01, cache_dir=cache_dir)
+        with quiet():
+            data = fetcher.get(f"{base}/flaky/2", params)
+        assert data is not None and 'outputs' in data, "no response after retrying 429/503"
+        assert PVWattsStub.calls['/flaky/2'] == 3 and fetcher.network_calls == 3, PVWattsStub.calls
+
+        # Retries exhausted: None and nothing cached; a 404 is not retried
+        with quiet():
+            assert fetcher.get(f"{base}/flaky/5", params) is None
+            assert fetcher.get(f"{base}/missing", params) is None
+        assert PVWattsStub.calls['/flaky/5'] == 3, PVWattsStub.calls
+        assert PVWattsStub.calls['/missing'] == 1, PVWattsStub.calls
+
+        # Disk cache: a new fetcher answers the same request without the network, the API key is not in the key
+        cached = homework_2.NRELFetcher(api_key='OTHER_KEY', max_workers=1, cache_dir=cache_dir)
+        assert cached.get(f"{base}/flaky/2", {**params, 'api_key': 'OTHER_KEY'}) == data
+        assert cached.network_calls == 0 and cached.cache_hits == 1
+        assert PVWattsStub.calls['/flaky/2'] == 3
+        assert len(list(Path(cache_dir).glob('*.json'))) == 1, "a failed request was cached"
+
+        # Token bucket: 20 requests/s with a burst of 2 -> 8 requests take at least 6 / 20 s
+        limited = homework_2.NRELFetcher(max_workers=4, rate_per_hour=20 * 3600, burst=2, use_cache=False)
+        start = time.perf_counter()
+        with quiet():
+            for i in range(8):
+                assert limited.get(f"{base}/ok/{i}", params) is not None
+        elapsed = time.perf_counter() - start
+        assert elapsed >= 6 / 20 * 0.95, f"8 requests in {elapsed:.3f} s, rate limit not applied"
+        print(f"    8 rate-limited requests in {elapsed:.2f} s", file=sys.stderr)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    # No site with hourly data -> an empty result, not an np.stack error
+    empty = homework_2.HourlyResults.from_analyzers([homework_2.NRELSolarDataAnalyzer(name='No data')])
+    assert empty.names == [] and empty.monthly_kwh().shape == (0, 12)
+
+
+CHECKS = {
+    'explain': check_explain,
+    'etl_cache': check_etl_cache,
+    'nrel': check_nrel,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Behaviour checks of the ETL, API and fetchers")
+    parser.add_argument('--checks', default=','.join(CHECKS), help=f"comma separated, from {','.join(CHECKS)}")
+    args = parser.parse_args()
+
+    names = [c.strip() for c in args.checks.split(',') if c.strip()]
+    unknown = [c for c in names if c not in CHECKS]
+    if unknown:
+        parser.error(f"unknown checks: {', '.join(unknown)}")
+
+    failed = []
+    for name in names:
+        workdir = tempfile.mkdtemp(prefix='check_')
+        try:
+            CHECKS[name](workdir)
+            print(f"  {name:<12} ok", file=sys.stderr)
+        except Skipped as e:
+            print(f"  {name:<12} skipped: {e}", file=sys.stderr)
+        except Exception as e:
+            print(f"  {name:<12} FAILED: {type(e).__name__}: {e}", file=sys.stderr)
+            failed.append(name)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
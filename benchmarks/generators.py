@@ -0,0 +1,183 @@
+import sys
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(REPO_ROOT / 'Homework_3' / 'python_container'))
+import welding_schema
+import welding_loader
+
+'''
+Synthetic data generators for the benchmarks, from 10^3 to 10^8 rows.
+
+Welding rows follow the definitive screening design of V1.1: every row is one
+cross section of one of the 18 measured parameter combinations, its measurements
+drawn around the mean/standard deviation of that combination in the real data
+and cracking drawn with the combination's crack rate.
+
+Wage rows follow the CZSO table 110080: every (region, year, gender, statistic)
+cell is one row, with region levels, yearly growth, a gender gap and quantile
+spreads in the range of the published data.
+
+Large files are written chunk by chunk, so memory stays bounded by the chunk size.
+'''
+
+WELDING_TEMPLATE = REPO_ROOT / 'Homework_1_2' / 'datasets' / 'steel_copper_welding' / 'V1.1.csv'
+CROSS_SECTIONS = [8, 16, 24, 32]   # positions on the weld path (mm), 4 cuts per weld
+CHUNK_ROWS = 1_000_000
+
+
+# -----------------------------
+# Welding (DSD)
+# -----------------------------
+class WeldingGenerator:
+
+    def __init__(self, template=WELDING_TEMPLATE, seed=0):
+        self.rng = np.random.default_rng(seed)
+        self.header = list(pd.read_csv(template, nrows=0).columns)   # raw V1.1 headers, in file order
+        real = welding_loader.read_csv(template)
+        self.measures = [c for c in welding_loader.MEASUREMENTS if c in real.columns]
+
+        grouped = real.groupby(welding_schema.FACTORS, sort=True)
+        self.combinations = grouped.size().index.to_frame(index=False)
+        self.means = grouped[self.measures].mean().to_numpy(dtype='float64')
+        self.stds = np.nan_to_num(grouped[self.measures].std().to_numpy(dtype='float64'))
+        self.crack_rate = grouped['Cracking'].apply(lambda s: (s == 'yes').mean()).to_numpy()
+
+    def frame(self, n_rows, start=0):
+        """``n_rows`` canonical rows; ``start`` continues the weld numbering of earlier chunks."""
+        row = np.arange(start, start + n_rows)
+        weld = row // len(CROSS_SECTIONS)
+        # Welds run through the combinations in blocks, like repeated runs of the design
+        combo = weld % len(self.combinations)
+        df = self.combinations.iloc[combo].reset_index(drop=True)
+        df.insert(0, 'Block', (weld // (5 * len(self.combinations)) + 1).astype('int64'))
+        df['WeldNumber'] = weld + 1
+        df['CrossSectionPosition'] = np.asarray(CROSS_SECTIONS)[row % len(CROSS_SECTIONS)]
+        cracked = self.rng.random(n_rows) < self.crack_rate[combo]
+        df['Cracking'] = np.where(cracked, 'yes', 'no')
+
+        values = self.means[combo] + self.stds[combo] * self.rng.standard_normal((n_rows, len(self.measures)))
+        values = np.round(np.clip(values, 0, None))
+        for i, column in enumerate(self.measures):
+            df[column] = values[:, i]
+        # Crack measurements only exist on cracked cross sections
+        for column in ('CrackCount', 'AvgCrackLength'):
+            if column in df.columns:
+                df.loc[~cracked, column] = np.nan
+        return df
+
+    def write_csv(self, path, n_rows, chunk_rows=CHUNK_ROWS):
+        """Write ``n_rows`` rows with the raw V1.1 headers, so the ETL parses them like a real file."""
+        canonical_to_raw = {welding_schema.canonical_name(raw): raw for raw in self.header}
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            for start in range(0, n_rows, chunk_rows):
+                chunk = self.frame(min(chunk_rows, n_rows - start), start)
+                chunk = chunk[list(canonical_to_raw)].rename(columns=canonical_to_raw)
+                chunk.to_csv(f, index=False, header=start == 0)
+        return path
+
+
+# -----------------------------
+# Wages (CZSO 110080)
+# -----------------------------
+GENDERS = [None, 'muž', 'žena']
+GENDER_FACTOR = {None: 1.0, 'muž': 1.09, 'žena': 0.88}
+STATISTICS = [None, 'medián', '1. decil', '1. kvartil', '3. kvartil', '9. decil']
+STATISTIC_FACTOR = {None: 1.0, 'medián': 0.87, '1. decil': 0.5, '1. kvartil': 0.68,
+                    '3. kvartil': 1.13, '9. decil': 1.62}
+FIRST_YEAR = 2000
+YEARS = 25
+ROWS_PER_REGION = YEARS * len(GENDERS) * len(STATISTICS)
+
+
+def wage_frame(n_rows, seed=0, first_region=0):
+    '''
+    Wage rows with the CZSO column layout, ``n_rows`` rounded up to whole regions.
+
+    Rows per region are fixed (years x genders x statistics), so the number of
+    regions grows with ``n_rows``; region 0 is the whole country.
+    '''
+    rng = np.random.default_rng((seed, first_region))
+    per_region = ROWS_PER_REGION
+    n_regions = max(1, -(-n_rows // per_region))
+
+    region = np.repeat(np.arange(first_region, first_region + n_regions), per_region)
+    cell = np.tile(np.arange(per_region), n_regions)
+    year = FIRST_YEAR + cell // (len(GENDERS) * len(STATISTICS))
+    gender = (cell // len(STATISTICS)) % len(GENDERS)
+    stat = cell % len(STATISTICS)
+
+    # Regional level around the national average, ~4 % nominal growth per year
+    level = rng.lognormal(mean=np.log(30000), sigma=0.1, size=n_regions)
+    if first_region == 0:
+        level[0] = 30000
+    gender_factor = np.array([GENDER_FACTOR[g] for g in GENDERS])
+    stat_factor = np.array([STATISTIC_FACTOR[s] for s in STATISTICS])
+    value = (level[region - first_region] * 1.04 ** (year - FIRST_YEAR - 12)
+             * gender_factor[gender] * stat_factor[stat] * rng.normal(1.0, 0.01, len(region)))
+
+    region_names = np.array([f'Region {i:05d}' if i else 'Česká republika'
+                             for i in range(first_region, first_region + n_regions)], dtype=object)
+    gender_names = np.array(GENDERS, dtype=object)
+    stat_names = np.array(STATISTICS, dtype=object)
+    first_id = 700_000_000 + first_region * per_region
+    df = pd.DataFrame({
+        'idhod': np.arange(first_id, first_id + len(region)),
+        'hodnota': np.round(value).astype('int64'),
+        'stapro_kod': 5958,
+        'SPKVANTIL_cis': np.where(stat > 0, 7636.0, np.nan),
+        'SPKVANTIL_kod': np.where(stat > 0, stat.astype('float64'), np.nan),
+        'POHLAVI_cis': np.where(gender > 0, 102.0, np.nan),
+        'POHLAVI_kod': np.where(gender > 0, gender.astype('float64'), np.nan),
+        'rok': year,
+        'uzemi_cis': np.where(region == 0, 97, 100),
+        'uzemi_kod': region + 19,
+        'STAPRO_TXT': 'Průměrná hrubá mzda na zaměstnance',
+        'uzemi_txt': region_names[region - first_region],
+        'SPKVANTIL_txt': stat_names[stat],
+        'POHLAVI_txt': gender_names[gender],
+    })
+    return df
+
+
+def write_wage_csv(path, n_rows, seed=0, chunk_rows=CHUNK_ROWS):
+    regions_per_chunk = max(1, chunk_rows // ROWS_PER_REGION)
+    n_regions = max(1, -(-n_rows // ROWS_PER_REGION))
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        for first in range(0, n_regions, regions_per_chunk):
+            count = min(regions_per_chunk, n_regions - first)
+            wage_frame(count * ROWS_PER_REGION, seed, first).to_csv(f, index=False, header=first == 0)
+    return path
+
+
+# -----------------------------
+# PVWatts responses
+# -----------------------------
+def pvwatts_response(seed=0, hourly=True):
+    """Synthetic PVWatts v8 response for one site (monthly totals plus 8760 hourly values)."""
+    rng = np.random.default_rng(seed)
+    hours = np.arange(8760)
+    day_angle = 2 * np.pi * (hours // 24) / 365
+    sun = np.clip(np.sin(np.pi * ((hours % 24) - 6) / 12), 0, None) * (0.8 + 0.2 * np.cos(day_angle - np.pi))
+    dc = 4000 * sun * rng.uniform(0.6, 1.0, 8760)
+    ac = 0.96 * dc
+    month = pd.date_range('2023-01-01', periods=8760, freq='h').month.to_numpy() - 1
+    outputs = {
+        'ac_monthly': np.bincount(month, weights=ac / 1000, minlength=12).tolist(),
+        'dc_monthly': np.bincount(month, weights=dc / 1000, minlength=12).tolist(),
+    }
+    if hourly:
+        outputs.update({
+            'ac': ac.tolist(),
+            'dc': dc.tolist(),
+            'poa': (1000 * sun).tolist(),
+            'tamb': (15 + 10 * np.cos(day_angle - np.pi) + rng.normal(0, 2, 8760)).tolist(),
+            'tcell': (20 + 25 * sun).tolist(),
+        })
+    return {'outputs': outputs}
@@ -0,0 +1,347 @@
+import os
+import io
+import sys
+import json
+import math
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import contextlib
+import functools
+import subprocess
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import plotly
+import generators
+
+REPO_ROOT = generators.REPO_ROOT
+
+'''
+Benchmarks of the hot paths of the repository on synthetic data.
+
+    etl    transform_data.load_file into a local mongod (batch, stream, incremental)
+    api    /data and /summary of flask_api/app.py (Flask test client, response cache off)
+    dash   CZSODashApp.update_charts callback, full figures and partial (Patch) updates
+    nrel   NRELSolarDataAnalyzer.process_data on hourly PVWatts responses
+
+Examples:
+
+    python benchmarks/run_benchmarks.py --suites dash,nrel --sizes 1e3,1e5 --out results.json
+    MONGO_HOST=localhost MONGO_USER=... MONGO_PASS=... python benchmarks/run_benchmarks.py --suites etl,api
+    python benchmarks/run_benchmarks.py --suites dash --compare results.json
+
+The etl and api suites write to their own database (BENCH_MONGO_DB, default
+"welding_benchmark") and are skipped when no mongod is reachable.
+'''
+
+BENCH_MONGO_DB = os.getenv("BENCH_MONGO_DB", "welding_benchmark")
+SUITES = ['etl', 'api', 'dash', 'nrel']
+
+API_URLS = [
+    '/data?limit=100&format=json',
+    '/data?limit=1000&format=ndjson',
+    '/data?cracking=yes&power>=1200&limit=100&format=json',
+    '/summary?format=json',
+    # Whole collection: row-by-row NDJSON against the columnar export
+    '/data?limit=0&format=ndjson',
+    '/export?format=arrow',
+    '/export?format=parquet',
+]
+
+
+# -----------------------------
+# Helpers
+# -----------------------------
+@contextlib.contextmanager
+def quiet():
+    # The timed code prints progress; keep it out of the benchmark output
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def latency(samples):
+    ms = np.asarray(samples) * 1000
+    return {
+        'calls': len(ms),
+        'mean_ms': float(ms.mean()),
+        'p50_ms': float(np.percentile(ms, 50)),
+        'p99_ms': float(np.percentile(ms, 99)),
+    }
+
+
+def result(suite, case, rows, **metrics):
+    entry = {'suite': suite, 'case': case, 'rows': int(rows), **metrics}
+    shown = ', '.join(f"{k}={v:,.3f}" if isinstance(v, float) else f"{k}={v}" for k, v in metrics.items())
+    print(f"  {suite:<5} {case:<34} {rows:>12,} rows  {shown}", file=sys.stderr)
+    return entry
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=REPO_ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def mongo_db():
+    """Benchmark database, or None when MongoDB is not configured or not reachable."""
+    os.environ['MONGO_DB'] = BENCH_MONGO_DB
+    sys.path.append(str(REPO_ROOT / 'Homework_3' / 'python_container'))
+    import transform_data
+    transform_data.MONGO_DB = BENCH_MONGO_DB
+    try:
+        with quiet():
+            client = transform_data.connect()
+    except SystemExit:
+        return None, transform_data
+    return client[BENCH_MONGO_DB], transform_data
+
+
+def reset_db(db, transform_data):
+    for name in (transform_data.MONGO_COLLECTION, transform_data.MONGO_BUCKET_COLLECTION,
+                 transform_data.MONGO_SUMMARY_COLLECTION, transform_data.MONGO_META_COLLECTION,
+                 transform_data.MONGO_QUARANTINE_COLLECTION):
+        db.drop_collection(name)
+
+
+# -----------------------------
+# Suites
+# -----------------------------
+def bench_etl(sizes, workdir, repeat):
+    db, transform_data = mongo_db()
+    if db is None:
+        print("  etl   skipped: MongoDB not reachable (set MONGO_HOST, MONGO_USER, MONGO_PASS)", file=sys.stderr)
+        return []
+
+    results = []
+    generator = generators.WeldingGenerator()
+    for size in sizes:
+        csv_path = generator.write_csv(Path(workdir) / f"welding_{size}.csv", size)
+        for mode in ('batch', 'stream', 'incremental'):
+            samples = []
+            for _ in range(repeat):
+                reset_db(db, transform_data)
+                start = time.perf_counter()
+                with quiet():
+                    transform_data.load_file(db, str(csv_path), mode)
+                samples.append(time.perf_counter() - start)
+            seconds = min(samples)
+            results.append(result('etl', f'load_{mode}', size, seconds=seconds, rows_per_sec=size / seconds))
+
+        # Unchanged file: the incremental watermark should skip it
+        start = time.perf_counter()
+        with quiet():
+            transform_data.load_file(db, str(csv_path), 'incremental')
+        results.append(result('etl', 'load_incremental_unchanged', size, seconds=time.perf_counter() - start))
+    reset_db(db, transform_data)
+    return results
+
+
+def bench_api(sizes, workdir, repeat):
+    db, transform_data = mongo_db()
+    if db is None:
+        print("  api   skipped: MongoDB not reachable (set MONGO_HOST, MONGO_USER, MONGO_PASS)", file=sys.stderr)
+        return []
+
+    os.environ.setdefault('CACHE_MAX_BYTES', '0')   # measure the query path, not the response cache
+    sys.path.append(str(REPO_ROOT / 'Homework_3' / 'flask_api'))
+    with quiet():
+        import app as api
+    client = api.app.test_client()
+
+    results = []
+    generator = generators.WeldingGenerator()
+    for size in sizes:
+        csv_path = generator.write_csv(Path(workdir) / f"welding_{size}.csv", size)
+        reset_db(db, transform_data)
+        with quiet():
+            transform_data.load_file(db, str(csv_path), 'batch')
+            client.get('/readyz')   # creates the indexes
+
+        for url in API_URLS:
+            samples, payload, errors = [], 0, 0
+            for _ in range(repeat):
+                start = time.perf_counter()
+                response = client.get(url)
+                body = response.get_data()
+                samples.append(time.perf_counter() - start)
+                payload = len(body)
+                errors += response.status_code != 200
+            results.append(result('api', url, size, payload_bytes=payload, errors=errors, **latency(samples)))
+    reset_db(db, transform_data)
+    return results
+
+
+def _dash_app(size, workdir):
+    import homework_2_bonus
+    cache_dir = Path(workdir) / f'czso_{size}'
+    dashboard = homework_2_bonus.CZSODashApp(dataset_ids=['110080'], cache_dir=cache_dir)
+    dataset = homework_2_bonus.CZSODataset('110080', cache_dir)
+    dataset.df = generators.wage_frame(size)
+    with quiet():
+        dataset._prepare()
+        dashboard.catalog.put(dataset)
+        dashboard.create_app()
+    # The registered callback wraps update_charts; call the plain function
+    callback = next(c for key, c in dashboard.app.callback_map.items() if 'time-series-chart' in key)
+    return dataset, functools.partial(callback['callback'].__wrapped__, '110080')
+
+
+def _payload_size(outputs):
+    return len(json.dumps(outputs, cls=plotly.utils.PlotlyJSONEncoder))
+
+
+def bench_dash(sizes, workdir, repeat):
+    sys.path.append(str(REPO_ROOT / 'Homework_1_2' / 'homework'))
+    from homework_2_bonus import ALL_GENDERS, MEAN_STAT
+
+    results = []
+    for size in sizes:
+        dataset, callback = _dash_app(size, workdir)
+        regions = dataset.cube.regions[(ALL_GENDERS, MEAN_STAT)][:5]
+        years = dataset.cube.year_list
+        full_range = [years[0], years[-1]]
+
+        # First call builds the figures, later calls are served from the figure cache
+        start = time.perf_counter()
+        outputs = callback(regions, ALL_GENDERS, MEAN_STAT, full_range, None)
+        results.append(result('dash', 'update_charts_first', size, seconds=time.perf_counter() - start,
+                              payload_bytes=_payload_size(outputs)))
+
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            outputs = callback(regions, ALL_GENDERS, MEAN_STAT, full_range, None)
+            _payload_size(outputs)
+            samples.append(time.perf_counter() - start)
+        results.append(result('dash', 'update_charts_full', size, payload_bytes=_payload_size(outputs),
+                              **latency(samples)))
+
+        # Moving the year slider with the same series sends Patch updates
+        state = outputs[3]
+        samples = []
+        for i in range(repeat):
+            year_range = [full_range[0] + i % 5, full_range[1]]
+            start = time.perf_counter()
+            outputs = callback(regions, ALL_GENDERS, MEAN_STAT, year_range, state)
+            _payload_size(outputs)
+            samples.append(time.perf_counter() - start)
+        results.append(result('dash', 'update_charts_patch', size, payload_bytes=_payload_size(outputs),
+                              **latency(samples)))
+    return results
+
+
+def bench_nrel(sizes, workdir, repeat):
+    sys.path.append(str(REPO_ROOT / 'Homework_1_2' / 'homework'))
+    import homework_2
+
+    response = generators.pvwatts_response()
+    results = []
+    for size in sizes:
+        sites = max(1, math.ceil(size / homework_2.HOURS_PER_YEAR))
+        analyzers = [homework_2.NRELSolarDataAnalyzer(name=f"Site {i}", timeframe='hourly') for i in range(sites)]
+        for analyzer in analyzers:
+            analyzer.data = response
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            with quiet():
+                for analyzer in analyzers:
+                    analyzer.process_data()
+            samples.append(time.perf_counter() - start)
+        seconds = min(samples)
+        rows = sites * homework_2.HOURS_PER_YEAR
+        results.append(result('nrel', 'process_data_hourly', rows, sites=sites, seconds=seconds,
+                              rows_per_sec=rows / seconds))
+    return results
+
+
+BENCHMARKS = {'etl': bench_etl, 'api': bench_api, 'dash': bench_dash, 'nrel': bench_nrel}
+
+
+# -----------------------------
+# Regression check
+# -----------------------------
+def _primary_metric(entry):
+    for metric in ('p50_ms', 'seconds'):
+        if metric in entry:
+            return metric
+    return None
+
+
+def compare(results, baseline_path, threshold):
+    """Print the change against a baseline run; return the entries slower than ``threshold`` x."""
+    with open(baseline_path) as f:
+        baseline = {(r['suite'], r['case'], r['rows']): r for r in json.load(f)['results']}
+
+    regressions = []
+    print(f"\nCompared with {baseline_path}:", file=sys.stderr)
+    for entry in results:
+        old = baseline.get((entry['suite'], entry['case'], entry['rows']))
+        metric = _primary_metric(entry)
+        if old is None or metric is None or not old.get(metric):
+            continue
+        ratio = entry[metric] / old[metric]
+        flag = "REGRESSION" if ratio > threshold else ""
+        print(f"  {entry['suite']:<5} {entry['case']:<34} {entry['rows']:>12,} rows  "
+              f"{metric} {old[metric]:.3f} -> {entry[metric]:.3f} ({ratio:.2f}x) {flag}", file=sys.stderr)
+        if ratio > threshold:
+            regressions.append(entry)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the ETL, API, dashboard and PVWatts analysis")
+    parser.add_argument('--suites', default='dash,nrel', help=f"comma separated, from {','.join(SUITES)}")
+    parser.add_argument('--sizes', default='1e3,1e4,1e5', help='comma separated row counts (1e6 notation works)')
+    parser.add_argument('--repeat', type=int, default=5, help='timed repetitions per case')
+    parser.add_argument('--out', help='write the JSON results to this file (default: stdout)')
+    parser.add_argument('--workdir', help='directory for the generated files (default: a temporary one)')
+    parser.add_argument('--compare', help='baseline JSON results to compare against')
+    parser.add_argument('--threshold', type=float, default=1.2, help='slowdown ratio reported as a regression')
+    args = parser.parse_args()
+
+    suites = [s.strip() for s in args.suites.split(',') if s.strip()]
+    unknown = [s for s in suites if s not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown suites: {', '.join(unknown)}")
+    sizes = [int(float(s)) for s in args.sizes.split(',')]
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix='bench_')
+    results = []
+    try:
+        for suite in suites:
+            print(f"Running {suite} ({', '.join(f'{s:,}' for s in sizes)} rows)", file=sys.stderr)
+            results += BENCHMARKS[suite](sizes, workdir, args.repeat)
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        'commit': git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'repeat': args.repeat,
+        'results': results,
+    }
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to '{args.out}'", file=sys.stderr)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.compare and compare(results, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()